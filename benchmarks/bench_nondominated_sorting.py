@@ -0,0 +1,62 @@
+'''
+Compares the time of tpot2.selectors.nondominated_sorting with the previous pure python implementation
+for increasing population sizes, with two objectives (sweep) and three objectives (numpy domination matrix).
+
+Usage: python benchmarks/bench_nondominated_sorting.py [max_population_size]
+'''
+import sys
+import time
+import numpy as np
+from tpot2.selectors import nondominated_sorting, dominates
+
+
+def python_nondominated_sorting(matrix):
+    #the O(M*N^2) double loop that nondominated_sorting used to be
+    fronts = {0:set()}
+    dominated = [set() for _ in range(len(matrix))]
+    dominating = [0 for _ in range(len(matrix))]
+    for p, p_scores in enumerate(matrix):
+        for q, q_scores in enumerate(matrix):
+            if dominates(p_scores, q_scores):
+                dominated[p].add(q)
+            elif dominates(q_scores, p_scores):
+                dominating[p] += 1
+        if dominating[p] == 0:
+            fronts[0].add(p)
+    i = 0
+    while len(fronts[i]) > 0:
+        H = set()
+        for p in fronts[i]:
+            for q in dominated[p]:
+                dominating[q] -= 1
+                if dominating[q] == 0:
+                    H.add(q)
+        i += 1
+        fronts[i] = H
+    return [fronts[j] for j in range(i)]
+
+
+def time_it(func, matrix, repeats=3):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(matrix)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = np.random.default_rng(0)
+    print(f"{'objectives':>10} {'n':>7} {'python (s)':>12} {'numpy (s)':>12}")
+    for n_objectives in [2, 3]:
+        n = 250
+        while n <= max_size:
+            matrix = rng.random((n, n_objectives))
+            fast = time_it(nondominated_sorting, matrix)
+            #the python version is only timed up to 2000 points, it takes minutes beyond that
+            slow = time_it(python_nondominated_sorting, matrix.tolist(), repeats=1) if n <= 2000 else np.nan
+            if n <= 2000:
+                assert nondominated_sorting(matrix) == python_nondominated_sorting(matrix.tolist())
+            print(f"{n_objectives:>10} {n:>7} {slow:>12.4f} {fast:>12.4f}")
+            n *= 2
@@ -4,9 +4,11 @@
 
 from .graphsklearn import GraphPipeline
 from .population import Population
+from .history_store import HistoryStore
 
 from . import builtin_modules
 from . import utils
+from . import evaluators
 from . import config
 from . import individual_representations
 from . import evolvers
@@ -1,6 +1,8 @@
 from sklearn.base import BaseEstimator, TransformerMixin
 
 class Passthrough(TransformerMixin,BaseEstimator):
+    #GraphPipeline passes sparse input as is
+    accept_sparse = True
 
     def fit(self, X=None, y=None):
         return self
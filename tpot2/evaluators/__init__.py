@@ -0,0 +1,8 @@
+from .base_evaluator import BaseEvaluator
+from .dask_evaluator import DaskEvaluator
+from .process_pool_evaluator import ProcessPoolEvaluator, PreloadedData
+
+
+EVALUATORS =    {"dask":DaskEvaluator,
+                "process_pool":ProcessPoolEvaluator,
+                }
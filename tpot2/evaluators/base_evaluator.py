@@ -0,0 +1,64 @@
+from abc import abstractmethod
+
+
+class BaseEvaluator():
+    '''
+    Interface for the backends that run evaluations in parallel.
+
+    An evaluator submits functions to workers and returns future-like objects. The returned futures must support
+    done(), cancelled(), cancel(), exception() and result(), as both dask and concurrent.futures futures do.
+    '''
+
+    @abstractmethod
+    def submit(self, fn, *args, **kwargs):
+        '''
+        Submits fn(*args, **kwargs) to a worker and returns a future.
+        '''
+        pass
+
+    def submit_to(self, worker, fn, *args, **kwargs):
+        '''
+        Submits fn(*args, **kwargs), preferably to worker (an address from the Worker telemetry column), and returns a future.
+        Backends without worker placement ignore worker.
+        '''
+        return self.submit(fn, *args, **kwargs)
+
+    @abstractmethod
+    def scatter(self, data):
+        '''
+        Sends data to the workers ahead of time. Returns an object that should be passed to the submitted functions in place of data.
+        '''
+        pass
+
+    @abstractmethod
+    def wait(self, futures, timeout=None):
+        '''
+        Waits until all futures are done or until timeout seconds have passed.
+
+        Returns
+        -------
+        bool
+            True if all futures are done, False if the timeout was reached first.
+        '''
+        pass
+
+    @abstractmethod
+    def wait_first(self, futures, timeout=None):
+        '''
+        Waits until at least one of the futures is done or until timeout seconds have passed.
+        '''
+        pass
+
+    @property
+    @abstractmethod
+    def n_workers(self):
+        '''
+        The number of evaluations that can run at the same time.
+        '''
+        pass
+
+    def close(self):
+        '''
+        Releases the workers owned by this evaluator.
+        '''
+        pass
@@ -0,0 +1,56 @@
+import dask
+import distributed
+from .base_evaluator import BaseEvaluator
+
+
+class DaskEvaluator(BaseEvaluator):
+    '''
+    Runs evaluations on a dask.distributed cluster.
+
+    Parameters
+    ----------
+    client : dask.distributed.Client
+        The client used to submit evaluations.
+    cluster : dask.distributed.LocalCluster, default=None
+        If not None, the cluster is closed along with the client when close() is called.
+        Pass this only when the evaluator owns the cluster.
+    '''
+    def __init__(self, client, cluster=None):
+        self.client = client
+        self.cluster = cluster
+
+    def submit(self, fn, *args, **kwargs):
+        return self.client.submit(fn, *args, **kwargs)
+
+    def submit_to(self, worker, fn, *args, **kwargs):
+        #the restriction is loose, so the task still runs elsewhere if worker is gone
+        return self.client.submit(fn, *args, workers=[worker], allow_other_workers=True, **kwargs)
+
+    def scatter(self, data):
+        return self.client.scatter(data)
+
+    def wait(self, futures, timeout=None):
+        try:
+            dask.distributed.wait(futures, timeout=timeout)
+        except dask.distributed.TimeoutError:
+            pass
+        except dask.distributed.CancelledError:
+            pass
+        return all(future.done() for future in futures)
+
+    def wait_first(self, futures, timeout=None):
+        try:
+            dask.distributed.wait(futures, timeout=timeout, return_when="FIRST_COMPLETED")
+        except dask.distributed.TimeoutError:
+            pass
+        except dask.distributed.CancelledError:
+            pass
+
+    @property
+    def n_workers(self):
+        return len(self.client.scheduler_info()['workers'])
+
+    def close(self):
+        self.client.close()
+        if self.cluster is not None:
+            self.cluster.close()
@@ -0,0 +1,106 @@
+import uuid
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import cloudpickle
+from tpot2.utils.shared_data import SharedDataHandle
+from .base_evaluator import BaseEvaluator
+
+
+#data preloaded into this worker process by the pool initializer, keyed by PreloadedData.key
+_preloaded_data = {}
+
+
+def _initialize_worker(preloaded_data):
+    global _preloaded_data
+    _preloaded_data = preloaded_data
+
+
+def _run_pickled_task(payload):
+    #objective functions are often lambdas or closures, which the standard pickle used by concurrent.futures can not handle
+    fn, args, kwargs = cloudpickle.loads(payload)
+    return fn(*args, **kwargs)
+
+
+class PreloadedData(SharedDataHandle):
+    '''
+    Handle to data that was preloaded into the worker processes of a ProcessPoolEvaluator.
+    '''
+    def __init__(self, key):
+        self.key = key
+
+    def get(self):
+        return _preloaded_data[self.key]
+
+
+class ProcessPoolEvaluator(BaseEvaluator):
+    '''
+    Runs evaluations on a concurrent.futures.ProcessPoolExecutor on the local machine.
+    Starting the pool is much cheaper than starting a dask LocalCluster, which makes this backend a good fit for short runs and single machines.
+
+    Data passed to scatter() is handed to the worker processes when they start. With the "fork" start method (the default where available),
+    the workers inherit the data copy-on-write, so it is never pickled or copied.
+
+    Parameters
+    ----------
+    n_jobs : int, default=1
+        Number of worker processes.
+    mp_context : str, default=None
+        The multiprocessing start method used for the workers ("fork", "forkserver" or "spawn").
+        If None, "fork" is used where available, otherwise "spawn". With "forkserver" and "spawn", scattered data is pickled once per worker.
+    '''
+    def __init__(self, n_jobs=1, mp_context=None):
+        if mp_context is None:
+            if "fork" in multiprocessing.get_all_start_methods():
+                mp_context = "fork"
+            else:
+                mp_context = "spawn"
+
+        self.n_jobs = n_jobs
+        self.mp_context = mp_context
+        self._preloaded_data = {}
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.n_jobs,
+                                                                    mp_context=multiprocessing.get_context(self.mp_context),
+                                                                    initializer=_initialize_worker,
+                                                                    initargs=(dict(self._preloaded_data),))
+        return self._executor
+
+    def _shutdown_executor(self, cancel_futures=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=cancel_futures)
+            self._executor = None
+
+    def submit(self, fn, *args, **kwargs):
+        payload = cloudpickle.dumps((fn, args, kwargs))
+        try:
+            return self._get_executor().submit(_run_pickled_task, payload)
+        except BrokenProcessPool:
+            #a worker died (e.g. killed for using too much memory). The futures that were running on the broken pool fail, but we can start a new pool.
+            self._shutdown_executor()
+            return self._get_executor().submit(_run_pickled_task, payload)
+
+    def scatter(self, data):
+        key = uuid.uuid4().hex
+        self._preloaded_data[key] = data
+        #workers that are already running do not have the new data. Tasks already submitted keep running in the old pool.
+        self._shutdown_executor(cancel_futures=False)
+        return PreloadedData(key)
+
+    def wait(self, futures, timeout=None):
+        _, not_done = concurrent.futures.wait(futures, timeout=timeout)
+        return len(not_done) == 0
+
+    def wait_first(self, futures, timeout=None):
+        concurrent.futures.wait(futures, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+
+    @property
+    def n_workers(self):
+        return self.n_jobs
+
+    def close(self):
+        self._shutdown_executor()
+        self._preloaded_data = {}
@@ -10,6 +10,7 @@ import numpy as np
 import copy
 import scipy
 import os
+import warnings
 import pickle
 import statistics
 from tqdm.dask import TqdmCallback
@@ -18,6 +19,7 @@ from dask.distributed import Client
 from dask.distributed import LocalCluster
 from tpot2.selectors import survival_select_NSGA2, tournament_selection_dominated
 import math
+import collections
 from tpot2.utils.utils import get_thresholds, beta_interpolation, remove_items, equalize_list
 
 
@@ -46,6 +48,7 @@ class BaseEvolver():
                     n_jobs=1,
                     memory_limit="4GB",
                     client=None,
+                    evaluator="dask",
                     
                     survival_percentage = 1,
                     crossover_probability=.2,
@@ -69,6 +72,16 @@ class BaseEvolver():
                     selection_evaluation_scaling = .5,
                     evaluation_early_stop_steps = None, 
                     final_score_strategy = "mean",
+                    fold_fanout_steps = None,
+                    batch_eval_time_threshold = None,
+                    max_batch_size = 10,
+                    isolate_evaluations = False,
+                    evaluation_cache = None,
+                    generation_overlap_fraction = None,
+                    runtime_model = None,
+                    runtime_skip_factor = None,
+                    profile_generations = None,
+                    data_local_scheduling = False,
 
                     verbose = 0, 
                     periodic_checkpoint_folder = None,
@@ -121,6 +134,11 @@ class BaseEvolver():
             Memory limit for each job. See Dask [LocalCluster documentation](https://distributed.dask.org/en/stable/api.html#distributed.Client) for more information.
         client : dask.distributed.Client, default=None
             A dask client to use for parallelization. If not None, this will override the n_jobs and memory_limit parameters. If None, will create a new client with num_workers=n_jobs and memory_limit=memory_limit. 
+        evaluator : str or tpot2.evaluators.BaseEvaluator, default="dask"
+            The backend used to run evaluations in parallel. Ignored if client is not None.
+            - "dask" : Creates a dask LocalCluster with n_jobs workers.
+            - "process_pool" : Uses a tpot2.evaluators.ProcessPoolEvaluator with n_jobs processes. Much faster to start than a LocalCluster, but only runs on the local machine.
+            - A tpot2.evaluators.BaseEvaluator instance, which is used as is and not closed at the end of optimize().
         survival_percentage : float, default=1
             Percentage of the population size to utilize for mutation and crossover at the beginning of the generation. The rest are discarded. Individuals are selected with the selector passed into survival_selector. The value of this parameter must be between 0 and 1, inclusive. 
             For example, if the population size is 100 and the survival percentage is .5, 50 individuals will be selected with NSGA2 from the existing population. These will be used for mutation and crossover to generate the next 100 individuals for the next generation. The remainder are discarded from the live population. In the next generation, there will now be the 50 parents + the 100 individuals for a total of 150. Surivival percentage is based of the population size parameter and not the existing population size (current population size when using successive halving). Therefore, in the next generation we will still select 50 individuals from the currently existing 150.
@@ -167,6 +185,50 @@ class BaseEvolver():
             The strategy to use when determining the final score for an individual.
             "mean": The mean of all objective scores
             "last": The score returned by the last call. Currently each objective is evaluated with a clone of the individual.
+        fold_fanout_steps : int, default=None
+            If an int, each individual is evaluated as fold_fanout_steps separate tasks, one per step (e.g., the number of CV folds).
+            The step is passed to the objective functions with the step keyword argument. The step scores are combined on the client with final_score_strategy.
+            This spreads the folds of slow pipelines across workers. Each step is given the full max_eval_time_seconds. 
+            Not used when evaluation_early_stop_steps is set, as that already evaluates one step at a time.
+        batch_eval_time_threshold : float, default=None
+            If not None, evaluations that have been observed to take less than this many seconds (median of recent evaluations) are packed 
+            together into a single task so that each task takes roughly batch_eval_time_threshold seconds. This reduces the scheduling overhead
+            when there are many very fast evaluations. Scores, timeouts and errors are still recorded per individual. If None, each evaluation is its own task.
+        max_batch_size : int, default=10
+            Maximum number of evaluations packed into a single task when batch_eval_time_threshold is set.
+        isolate_evaluations : bool, default=False
+            If True, each evaluation runs in a forked child process. When an evaluation exceeds max_eval_time_seconds, the child is killed with SIGKILL 
+            so that the CPU is freed immediately, even if it is stuck in native code (e.g. xgboost, lightgbm or libsvm fits).
+            If False, timeouts are raised inside the running thread with func_timeout, which can not interrupt native code.
+            Requires os.fork (not available on Windows), otherwise a warning is raised and evaluations run in-process.
+            Forking a process that runs other threads (e.g. a dask worker with several threads) can leave the child deadlocked on a lock
+            that another thread held at the time of the fork. Such a child only stops when it is killed, so max_eval_time_seconds must be set.
+            Workers with a single thread avoid the problem.
+        evaluation_cache : tpot2.utils.evaluation_cache.EvaluationCache, default=None
+            If not None, scores are looked up in this on-disk cache before individuals are submitted for evaluation, and new scores are added to it.
+            This lets repeated runs on the same data skip pipelines that were already evaluated. The individuals' unique_id() must provide a stable_key() (as GraphKey does).
+            Only used for full evaluations (not with evaluation_early_stop_steps).
+        generation_overlap_fraction : float, default=None
+            If not None, a generation only waits until this fraction (between 0 and 1) of its evaluations are done before moving on to selection and variation.
+            The remaining evaluations keep running in the background while the next generation is evaluated, so workers are not left idle waiting for a few slow pipelines.
+            Individuals whose evaluations finish late are added back to the live population of the generation in which they finish.
+            Evaluations that are still running at the end of optimize() are given the remaining time, then marked as "TIMEOUT".
+            The initial population is always fully evaluated. Not used with evaluation_early_stop_steps.
+        runtime_model : tpot2.utils.runtime_model.RuntimeModel, default=None
+            If not None, predicts the evaluation time of each individual from the evaluations observed so far (and from the Submitted/Completed Timestamp
+            history of the population, if any). Individuals are then submitted longest predicted time first, so that slow evaluations do not end up 
+            running alone at the end of a generation.
+        runtime_skip_factor : float, default=None
+            If not None (and runtime_model is set), individuals whose predicted evaluation time is more than runtime_skip_factor*max_eval_time_seconds
+            are not evaluated and are marked as "TIMEOUT".
+        profile_generations : int or list of ints, default=None
+            The wall time of each phase of every generation (selection, variation, dedupe, pandas bookkeeping, checkpointing and evaluation) is always recorded
+            and can be accessed as a DataFrame with phase_times. If not None, a full cProfile capture is also made for these generations
+            and stored as pstats.Stats objects in generation_profiles.
+        data_local_scheduling : bool, default=False
+            If True, each individual is preferably evaluated on the worker that evaluated its parent (from the Parents and Worker columns, see tpot2.utils.telemetry.get_lineage_workers),
+            or on the worker that evaluated its previous CV folds. Offspring share most of their subgraph with their parents, so that worker can reuse the fitted nodes
+            in its cache (e.g. the node_cache of the TPOT estimators). Only used with the dask evaluator.
         verbose : int, default=0
             How much information to print during the optimization process. Higher values include the information from lower values.
             0. nothing
@@ -240,6 +302,25 @@ class BaseEvolver():
         self.selection_evaluation_scaling =  max(0.00001,selection_evaluation_scaling )
         self.evaluation_early_stop_steps = evaluation_early_stop_steps
         self.final_score_strategy = final_score_strategy
+        self.fold_fanout_steps = fold_fanout_steps
+        self.batch_eval_time_threshold = batch_eval_time_threshold
+        self.max_batch_size = max_batch_size
+        self.isolate_evaluations = isolate_evaluations
+        self.evaluation_cache = evaluation_cache
+        self.generation_overlap_fraction = generation_overlap_fraction
+        self.runtime_model = runtime_model
+        self.runtime_skip_factor = runtime_skip_factor
+        self.data_local_scheduling = data_local_scheduling
+        self.profiler = tpot2.utils.profiler.GenerationProfiler(profile_generations=profile_generations)
+        #evaluations that are still running in the background when generation_overlap_fraction is set
+        self._pending_evaluations = {}
+        self._pending_futures = []
+        if self.isolate_evaluations and self.max_eval_time_seconds is None:
+            raise ValueError("isolate_evaluations requires max_eval_time_seconds to be set")
+        if self.isolate_evaluations and not hasattr(os, "fork"):
+            warnings.warn("isolate_evaluations requires os.fork, which is not available on this platform. Evaluations will run in-process and use func_timeout instead.")
+        #recent evaluation times, used to pick the batch size
+        self.eval_time_history = collections.deque(maxlen=100)
 
         self.budget_range = budget_range
         self.budget_scaling = budget_scaling
@@ -249,6 +330,7 @@ class BaseEvolver():
         self.memory_limit = memory_limit
 
         self.client = client
+        self.evaluator = evaluator
 
 
         self.survival_selector=survival_selector
@@ -332,9 +414,11 @@ class BaseEvolver():
 
     def optimize(self, generations=None):
 
-        if self.client is not None: #If user passed in a client manually
-           self._client = self.client
-        else:
+        if isinstance(self.evaluator, tpot2.evaluators.BaseEvaluator): #If user passed in an evaluator manually
+            self._evaluator = self.evaluator
+        elif self.client is not None: #If user passed in a client manually
+            self._evaluator = tpot2.evaluators.DaskEvaluator(self.client)
+        elif self.evaluator == "dask":
 
             if self.verbose >= 4:
                 silence_logs = 30
@@ -342,15 +426,20 @@ class BaseEvolver():
                 silence_logs = 40
             else:
                 silence_logs = 50
-            self._cluster = LocalCluster(n_workers=self.n_jobs, #if no client is passed in and no global client exists, create our own
+            cluster = LocalCluster(n_workers=self.n_jobs, #if no client is passed in and no global client exists, create our own
                     threads_per_worker=1,
                     silence_logs=silence_logs,
                     processes=True,
                     memory_limit=self.memory_limit)
-            self._client = Client(self._cluster)
+            self._evaluator = tpot2.evaluators.DaskEvaluator(Client(cluster), cluster=cluster)
+        else:
+            self._evaluator = tpot2.evaluators.EVALUATORS[self.evaluator](n_jobs=self.n_jobs)
         
 
 
+        if self.runtime_model is not None and len(self.runtime_model) == 0:
+            self.runtime_model.update_from_history(self.population.evaluated_individuals)
+
         if generations is None:
             generations = self.generations
 
@@ -362,7 +451,7 @@ class BaseEvolver():
 
         self.scheduled_timeout_time = time.time() + self.max_time_seconds
 
-
+        self.profiler.activate()
         try: 
             #for gen in tnrange(generations,desc="Generation", disable=self.verbose<1):
             done = False
@@ -374,20 +463,25 @@ class BaseEvolver():
                     pbar = tqdm.tqdm(total=generations)
                 pbar.set_description("Generation")
             while not done:
+                self.profiler.start_generation(self.generation)
                 # Generation 0 is the initial population
                 if self.generation == 0:
                     if self.population_file is not None:
-                        pickle.dump(self.population, open(self.population_file, "wb"))
-                    self.evaluate_population()
+                        with tpot2.utils.profiler.phase("Checkpoint"):
+                            pickle.dump(self.population, open(self.population_file, "wb"))
+                    with tpot2.utils.profiler.phase("Evaluation"):
+                        self.evaluate_population()
                     if self.population_file is not None:
-                        pickle.dump(self.population, open(self.population_file, "wb"))
+                        with tpot2.utils.profiler.phase("Checkpoint"):
+                            pickle.dump(self.population, open(self.population_file, "wb"))
                     
                     attempts = 2
                     while len(self.population.population) == 0 and attempts > 0:
                         new_initial_population = [next(self.individual_generator) for _ in range(self.cur_population_size)]
                         self.population.add_to_population(new_initial_population)
                         attempts -= 1
-                        self.evaluate_population()
+                        with tpot2.utils.profiler.phase("Evaluation"):
+                            self.evaluate_population()
 
                     if len(self.population.population) == 0:
                         raise Exception("No individuals could be evaluated in the initial population. This may indicate a bug in the configuration, included models, or objective functions. Set verbose>=4 to see the errors that caused individuals to fail.")
@@ -433,7 +527,8 @@ class BaseEvolver():
 
                 #save population
                 if self.population_file is not None: # and time.time() - last_save_time > 60*10:
-                    pickle.dump(self.population, open(self.population_file, "wb"))
+                    with tpot2.utils.profiler.phase("Checkpoint"):
+                        pickle.dump(self.population, open(self.population_file, "wb"))
 
                 gen += 1
                 if self.verbose >= 1:
@@ -448,18 +543,38 @@ class BaseEvolver():
             
             self.population.remove_invalid_from_population(column_names=self.objective_names, invalid_value="INVALID")
             self.population.remove_invalid_from_population(column_names=self.objective_names, invalid_value="TIMEOUT")
+        finally:
+            self.profiler.deactivate()
 
-
+        if len(self._pending_futures) > 0:
+            self.finish_pending_evaluations()
         
 
         if self.population_file is not None:
-            pickle.dump(self.population, open(self.population_file, "wb"))
-
-        if self.client is None: #If we created our own client, close it
-            self._client.close()
-            self._cluster.close()
-
-        tpot2.utils.get_pareto_frontier(self.population.evaluated_individuals, column_names=self.objective_names, weights=self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
+            with tpot2.utils.profiler.phase("Checkpoint"):
+                pickle.dump(self.population, open(self.population_file, "wb"))
+
+        if self.client is None and not isinstance(self.evaluator, tpot2.evaluators.BaseEvaluator): #If we created our own evaluator, close it
+            self._evaluator.close()
+
+        evaluated_individuals = self.population.evaluated_individuals
+        tpot2.utils.get_pareto_frontier(evaluated_individuals, column_names=self.objective_names, weights=self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
+        self.population.history.set_column("Pareto_Front", evaluated_individuals["Pareto_Front"])
+
+    @property
+    def phase_times(self):
+        '''
+        A DataFrame with one row per generation and the wall time in seconds spent in each phase of the generation
+        (Selection, Variation, Dedupe, Bookkeeping, Checkpoint, Evaluation, Other and Total). See tpot2.utils.profiler.GenerationProfiler.
+        '''
+        return self.profiler.to_dataframe()
+
+    @property
+    def generation_profiles(self):
+        '''
+        A dictionary that maps each generation in profile_generations to a pstats.Stats object with its cProfile capture.
+        '''
+        return self.profiler.profiles
 
     def step(self,):
         if self.population_size_list is not None:
@@ -490,7 +605,8 @@ class BaseEvolver():
             n_survivors = max(1,int(self.cur_population_size*self.survival_percentage)) #always keep at least one individual
             #Get survivors from current population
             weighted_scores = self.population.get_column(self.population.population, column_names=self.objective_names) * self.objective_function_weights
-            new_population_index = np.ravel(self.survival_selector(weighted_scores, k=n_survivors)) #TODO make it clear that we are concatenating scores...
+            with tpot2.utils.profiler.phase("Selection"):
+                new_population_index = np.ravel(self.survival_selector(weighted_scores, k=n_survivors)) #TODO make it clear that we are concatenating scores...
             self.population.set_population(np.array(self.population.population)[new_population_index])
         weighted_scores = self.population.get_column(self.population.population, column_names=self.objective_names) * self.objective_function_weights
         
@@ -503,7 +619,8 @@ class BaseEvolver():
 
         #get crossover pairs
         if n_total_crossover_pairs > 0:
-            cx_parents_index = self.parent_selector(weighted_scores, k=n_total_crossover_pairs, n_parents=self.n_parents,   ) #TODO make it clear that we are concatenating scores...
+            with tpot2.utils.profiler.phase("Selection"):
+                cx_parents_index = self.parent_selector(weighted_scores, k=n_total_crossover_pairs, n_parents=self.n_parents,   ) #TODO make it clear that we are concatenating scores...
             cx_var_ops = np.concatenate([ np.repeat("crossover",n_crossover),
                                         np.repeat("mutate_then_crossover",n_mutate_then_crossover),
                                         np.repeat("crossover_then_mutate",n_crossover_then_mutate),
@@ -514,7 +631,8 @@ class BaseEvolver():
         
         #get mutation only parents
         if n_mutate_parents > 0:
-            m_parents_index = self.parent_selector(weighted_scores, k=n_mutate_parents, n_parents=1,  ) #TODO make it clear that we are concatenating scores...
+            with tpot2.utils.profiler.phase("Selection"):
+                m_parents_index = self.parent_selector(weighted_scores, k=n_mutate_parents, n_parents=1,  ) #TODO make it clear that we are concatenating scores...
             m_var_ops = np.repeat("mutate",len(m_parents_index))
         else:
             m_parents_index = []
@@ -530,7 +648,8 @@ class BaseEvolver():
         #print("done making offspring")
 
         #print("evaluating")
-        self.evaluate_population()
+        with tpot2.utils.profiler.phase("Evaluation"):
+            self.evaluate_population()
         #print("done evaluating")
 
 
@@ -544,7 +663,8 @@ class BaseEvolver():
         #Update the sliding scales and thresholds 
         # Save population, TODO remove some of these
         if self.population_file is not None: # and time.time() - last_save_time > 60*10:
-            pickle.dump(self.population, open(self.population_file, "wb"))
+            with tpot2.utils.profiler.phase("Checkpoint"):
+                pickle.dump(self.population, open(self.population_file, "wb"))
             last_save_time = time.time()
 
 
@@ -581,17 +701,22 @@ class BaseEvolver():
             else:
                 #parallelize one step at a time. After each step, come together and select the next individuals to run the next step on.
                 self.evaluate_population_selection_early_stop(survival_counts=self.survival_counts, thresholds=self.thresholds, budget=self.budget)
+        elif self.generation_overlap_fraction is not None and self.generation > 0:
+            self.evaluate_population_overlapped(budget=self.budget)
         else:
             self.evaluate_population_full(budget=self.budget)
 
 
         # Save population, TODO remove some of these
         if self.population_file is not None: # and time.time() - last_save_time > 60*10:
-            pickle.dump(self.population, open(self.population_file, "wb"))
+            with tpot2.utils.profiler.phase("Checkpoint"):
+                pickle.dump(self.population, open(self.population_file, "wb"))
             last_save_time = time.time()
 
     def evaluate_population_full(self, budget=None):
         individuals_to_evaluate = self.get_unevaluated_individuals(self.objective_names, budget=budget,)
+        if self.evaluation_cache is not None:
+            individuals_to_evaluate, _, _ = tpot2.utils.evaluation_cache.apply_evaluation_cache(self.population, self.evaluation_cache, individuals_to_evaluate, self.objective_names, budget=budget, verbose=self.verbose)
         
         #print("evaluating this many individuals: ", len(individuals_to_evaluate))
 
@@ -601,7 +726,10 @@ class BaseEvolver():
             return
 
         if self.max_eval_time_seconds is not None:
-            theoretical_timeout = self.max_eval_time_seconds * math.ceil(len(individuals_to_evaluate) / self.n_jobs)
+            n_tasks = len(individuals_to_evaluate)
+            if self.fold_fanout_steps is not None:
+                n_tasks = n_tasks * self.fold_fanout_steps
+            theoretical_timeout = self.max_eval_time_seconds * math.ceil(n_tasks / self.n_jobs)
             theoretical_timeout = theoretical_timeout*2
         else:
             theoretical_timeout = np.inf
@@ -609,38 +737,143 @@ class BaseEvolver():
         parallel_timeout = min(theoretical_timeout, scheduled_timeout_time_left)
         if parallel_timeout < 0:
             parallel_timeout = 10
-        scores = tpot2.utils.eval_utils.parallel_eval_objective_list(individuals_to_evaluate, self.objective_functions, self.n_jobs, verbose=self.verbose, timeout=self.max_eval_time_seconds, budget=budget, n_expected_columns=len(self.objective_names), client=self._client, parallel_timeout=parallel_timeout, **self.objective_kwargs)
+        scores, records = tpot2.utils.eval_utils.parallel_eval_objective_list(individuals_to_evaluate, self.objective_functions, self.n_jobs, verbose=self.verbose, timeout=self.max_eval_time_seconds, budget=budget, n_expected_columns=len(self.objective_names), evaluator=self._evaluator, parallel_timeout=parallel_timeout, fold_fanout_steps=self.fold_fanout_steps, final_score_strategy=self.final_score_strategy, batch_eval_time_threshold=self.batch_eval_time_threshold, max_batch_size=self.max_batch_size, eval_time_history=self.eval_time_history, isolate_evaluations=self.isolate_evaluations, runtime_model=self.runtime_model, runtime_skip_factor=self.runtime_skip_factor, return_telemetry=True, preferred_workers=self.get_preferred_workers(individuals_to_evaluate), **self.objective_kwargs)
 
 
         self.population.update_column(individuals_to_evaluate, column_names=self.objective_names, data=scores)
+        tpot2.utils.telemetry.update_population_telemetry(self.population, individuals_to_evaluate, records)
         if budget is not None:
             self.population.update_column(individuals_to_evaluate, column_names="Budget", data=budget)
+        if self.evaluation_cache is not None:
+            self.evaluation_cache.put(individuals_to_evaluate, scores, budget=budget)
 
         self.population.update_column(individuals_to_evaluate, column_names="Completed Timestamp", data=time.time())
         self.population.remove_invalid_from_population(column_names=self.objective_names)
         self.population.remove_invalid_from_population(column_names=self.objective_names, invalid_value="TIMEOUT")
 
+    def evaluate_population_overlapped(self, budget=None):
+        '''
+        Like evaluate_population_full, but only waits until generation_overlap_fraction of the submitted evaluations are done.
+        Evaluations that are still running are kept in the background and merged into the population by collect_pending_evaluations once they finish.
+        '''
+        individuals_to_evaluate = [ind for ind in self.get_unevaluated_individuals(self.objective_names, budget=budget,) if ind.unique_id() not in self._pending_evaluations]
+        if self.evaluation_cache is not None:
+            individuals_to_evaluate, _, _ = tpot2.utils.evaluation_cache.apply_evaluation_cache(self.population, self.evaluation_cache, individuals_to_evaluate, self.objective_names, budget=budget, verbose=self.verbose)
+
+        futures = []
+        if len(individuals_to_evaluate) > 0:
+            batches, futures, skipped = tpot2.utils.eval_utils.submit_evaluation_tasks(individuals_to_evaluate, self.objective_functions, self._evaluator, n_jobs=self.n_jobs, verbose=self.verbose, timeout=self.max_eval_time_seconds, budget=budget, fold_fanout_steps=self.fold_fanout_steps, batch_eval_time_threshold=self.batch_eval_time_threshold, max_batch_size=self.max_batch_size, eval_time_history=self.eval_time_history, isolate_evaluations=self.isolate_evaluations, runtime_model=self.runtime_model, runtime_skip_factor=self.runtime_skip_factor, preferred_workers=self.get_preferred_workers(individuals_to_evaluate), **self.objective_kwargs)
+            submit_time = time.time()
+            if len(skipped) > 0:
+                self.population.update_column(skipped, column_names=self.objective_names, data=[["TIMEOUT" for _ in self.objective_names] for _ in skipped])
+            skipped_keys = set(ind.unique_id() for ind in skipped)
+            n_steps = 1 if self.fold_fanout_steps is None else self.fold_fanout_steps
+            for ind in individuals_to_evaluate:
+                if ind.unique_id() not in skipped_keys:
+                    self._pending_evaluations[ind.unique_id()] = {"individual": ind, "budget": budget, "n_steps": n_steps, "step_scores": {}, "step_records": []}
+            for batch, future in zip(batches, futures):
+                self._pending_futures.append({"batch": batch, "future": future, "time": submit_time, "budget": budget})
+        elif self.verbose > 3:
+            print("No new individuals to evaluate")
+
+        #wait until enough of this generation is done, or until we run out of time
+        n_required = math.ceil(len(futures) * self.generation_overlap_fraction)
+        deadline = self.scheduled_timeout_time
+        if self.max_eval_time_seconds is not None:
+            deadline = min(deadline, time.time() + self.max_eval_time_seconds * math.ceil(len(futures) / self.n_jobs) * 2)
+        while sum(future.done() for future in futures) < n_required and time.time() < deadline:
+            time_left = deadline - time.time()
+            self._evaluator.wait_first([future for future in futures if not future.done()], timeout=None if math.isinf(time_left) else time_left)
+
+        self.collect_pending_evaluations()
+
+        #individuals that are still being evaluated rejoin the live population when their scores arrive
+        self.population.set_population([ind for ind in self.population.population if ind.unique_id() not in self._pending_evaluations])
+        self.population.remove_invalid_from_population(column_names=self.objective_names)
+        self.population.remove_invalid_from_population(column_names=self.objective_names, invalid_value="TIMEOUT")
+
+    def collect_pending_evaluations(self, force=False):
+        '''
+        Records the scores of the background evaluations that are done and adds their individuals back to the live population.
+        Evaluations that have been running for more than twice max_eval_time_seconds per task are cancelled and marked as "TIMEOUT".
+        If force is True, all evaluations that are not done are cancelled and marked as "TIMEOUT".
+        '''
+        still_running = []
+        for entry in self._pending_futures:
+            if not entry["future"].done() and not force:
+                if self.max_eval_time_seconds is None or time.time() - entry["time"] < self.max_eval_time_seconds*2*len(entry["batch"]):
+                    still_running.append(entry)
+                    continue
+
+            batch_results = tpot2.utils.eval_utils.get_batch_scores(entry["batch"], entry["future"], verbose=self.verbose, eval_time_history=self.eval_time_history, runtime_model=self.runtime_model, budget=entry["budget"])
+            for (individual, step_kwargs), (scores, record) in zip(entry["batch"], batch_results):
+                pending = self._pending_evaluations[individual.unique_id()]
+                pending["step_scores"][step_kwargs.get("step", 0)] = scores
+                pending["step_records"].append(record)
+        self._pending_futures = still_running
+
+        finished_keys = [key for key, pending in self._pending_evaluations.items() if len(pending["step_scores"]) == pending["n_steps"]]
+        if len(finished_keys) == 0:
+            return
+
+        live_keys = set(ind.unique_id() for ind in self.population.population)
+        late_individuals = []
+        for key in finished_keys:
+            pending = self._pending_evaluations.pop(key)
+            step_scores = [pending["step_scores"][step] for step in range(pending["n_steps"])]
+            if self.fold_fanout_steps is None:
+                scores = step_scores[0]
+            else:
+                scores = tpot2.utils.eval_utils.combine_step_scores(step_scores, final_score_strategy=self.final_score_strategy)
+            scores = tpot2.utils.eval_utils.process_scores([scores], len(self.objective_names))
+
+            self.population.update_column([pending["individual"]], column_names=self.objective_names, data=scores)
+            tpot2.utils.telemetry.update_population_telemetry(self.population, [pending["individual"]], [tpot2.utils.telemetry.combine_records(pending["step_records"])])
+            if pending["budget"] is not None:
+                self.population.update_column([pending["individual"]], column_names="Budget", data=pending["budget"])
+            if self.evaluation_cache is not None:
+                self.evaluation_cache.put([pending["individual"]], scores, budget=pending["budget"])
+            self.population.update_column([pending["individual"]], column_names="Completed Timestamp", data=time.time())
+
+            if key not in live_keys:
+                late_individuals.append(pending["individual"])
+
+        if len(late_individuals) > 0:
+            self.population.set_population(list(self.population.population) + late_individuals)
+
+    def finish_pending_evaluations(self):
+        '''
+        Waits for the background evaluations until the end of max_time_seconds, then records all of their scores.
+        Evaluations that are still not done are cancelled and marked as "TIMEOUT".
+        '''
+        time_left = self.scheduled_timeout_time - time.time()
+        if self.max_eval_time_seconds is not None:
+            time_left = min(time_left, self.max_eval_time_seconds*2)
+        if time_left > 0:
+            self._evaluator.wait([entry["future"] for entry in self._pending_futures], timeout=None if math.isinf(time_left) else time_left)
+        self.collect_pending_evaluations(force=True)
+        self.population.remove_invalid_from_population(column_names=self.objective_names)
+        self.population.remove_invalid_from_population(column_names=self.objective_names, invalid_value="TIMEOUT")
+
+    def get_preferred_workers(self, individuals):
+        '''
+        Returns the worker to prefer for each individual if data_local_scheduling is set (see tpot2.utils.telemetry.get_lineage_workers), otherwise None.
+        '''
+        if not self.data_local_scheduling:
+            return None
+        return tpot2.utils.telemetry.get_lineage_workers(self.population, individuals)
+
     def get_unevaluated_individuals(self, column_names, budget=None, individual_list=None):
         if individual_list is not None:
             cur_pop = np.array(individual_list)
         else:
             cur_pop = np.array(self.population.population)
 
-        if all([name_step in self.population.evaluated_individuals.columns for name_step in column_names]):
-            if budget is not None:
-                offspring_scores = self.population.get_column(cur_pop, column_names=column_names+["Budget"], to_numpy=False)
-                #Individuals are unevaluated if we have a higher budget OR if any of the objectives are nan
-                unevaluated_filter = lambda i: any(offspring_scores.loc[offspring_scores.index[i]][column_names].isna()) or (offspring_scores.loc[offspring_scores.index[i]]["Budget"] < budget)
-            else:
-                offspring_scores = self.population.get_column(cur_pop, column_names=column_names, to_numpy=False)
-                unevaluated_filter = lambda i: any(offspring_scores.loc[offspring_scores.index[i]][column_names].isna())
-            unevaluated_individuals_this_step = [i for i in range(len(cur_pop)) if unevaluated_filter(i)]
-            return cur_pop[unevaluated_individuals_this_step]
-        
-        else: #if column names are not in the evaluated_individuals, then we have not evaluated any individuals yet
-            for name_step in column_names:
-                self.population.evaluated_individuals[name_step] = np.nan
-            return cur_pop
+        #create the columns up front so that they are part of evaluated_individuals even before anything is evaluated
+        for name_step in column_names:
+            self.population.history.add_column(name_step)
+        #Individuals are unevaluated if we have a higher budget OR if any of the objectives are nan
+        return cur_pop[self.population.is_unevaluated(cur_pop, column_names, budget=budget)]
 
     def evaluate_population_selection_early_stop(self,survival_counts, thresholds=None, budget=None):
 
@@ -680,7 +913,7 @@ class BaseEvolver():
             if parallel_timeout < 0:
                 parallel_timeout = 10
 
-            scores = tpot2.utils.eval_utils.parallel_eval_objective_list(individual_list=unevaluated_individuals_this_step,
+            scores, records = tpot2.utils.eval_utils.parallel_eval_objective_list(individual_list=unevaluated_individuals_this_step,
                                     objective_list=self.objective_functions,
                                     n_jobs = self.n_jobs,
                                     verbose=self.verbose,
@@ -689,12 +922,22 @@ class BaseEvolver():
                                     budget = self.budget,
                                     generation = self.generation,
                                     n_expected_columns=len(self.objective_names),
-                                    client=self._client,
+                                    evaluator=self._evaluator,
                                     parallel_timeout=parallel_timeout,
+                                    batch_eval_time_threshold=self.batch_eval_time_threshold,
+                                    max_batch_size=self.max_batch_size,
+                                    eval_time_history=self.eval_time_history,
+                                    isolate_evaluations=self.isolate_evaluations,
+                                    runtime_model=self.runtime_model,
+                                    runtime_skip_factor=self.runtime_skip_factor,
+                                    return_telemetry=True,
+                                    preferred_workers=self.get_preferred_workers(unevaluated_individuals_this_step),
                                     **self.objective_kwargs,
                                     )
 
             self.population.update_column(unevaluated_individuals_this_step, column_names=this_step_names, data=scores)
+            #each step evaluates one more fold, so the resource usage of the steps adds up
+            tpot2.utils.telemetry.update_population_telemetry(self.population, unevaluated_individuals_this_step, records, merge=True)
 
             self.population.remove_invalid_from_population(column_names=this_step_names)
             self.population.remove_invalid_from_population(column_names=this_step_names, invalid_value="TIMEOUT")
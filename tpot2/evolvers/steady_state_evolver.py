@@ -21,6 +21,7 @@ import math
 from tpot2.utils.utils import get_thresholds, beta_interpolation, remove_items, equalize_list
 import dask
 import warnings
+import collections
 
 class SteadyStateEvolver():
     def __init__(   self, 
@@ -46,6 +47,7 @@ class SteadyStateEvolver():
                     n_jobs=1,
                     memory_limit="4GB",
                     client=None,
+                    evaluator="dask",
                     
 
                     crossover_probability=.2,
@@ -61,7 +63,14 @@ class SteadyStateEvolver():
                     budget_scaling = .5, 
                     individuals_until_end_budget = 1,                    
                     stepwise_steps = 5,
-                    
+
+                    batch_eval_time_threshold = None,
+                    max_batch_size = 10,
+                    isolate_evaluations = False,
+                    evaluation_cache = None,
+                    runtime_model = None,
+                    runtime_skip_factor = None,
+                    data_local_scheduling = False,
 
                     verbose = 0, 
                     periodic_checkpoint_folder = None,
@@ -69,6 +78,19 @@ class SteadyStateEvolver():
                     ) -> None:
 
         self.max_evaluated_individuals = max_evaluated_individuals
+        self.batch_eval_time_threshold = batch_eval_time_threshold
+        self.max_batch_size = max_batch_size
+        self.isolate_evaluations = isolate_evaluations
+        self.evaluation_cache = evaluation_cache
+        self.runtime_model = runtime_model
+        self.runtime_skip_factor = runtime_skip_factor
+        self.data_local_scheduling = data_local_scheduling
+        if self.isolate_evaluations and (max_eval_time_seconds is None or math.isinf(max_eval_time_seconds)):
+            raise ValueError("isolate_evaluations requires max_eval_time_seconds to be set")
+        if self.isolate_evaluations and not hasattr(os, "fork"):
+            warnings.warn("isolate_evaluations requires os.fork, which is not available on this platform. Evaluations will run in-process and use func_timeout instead.")
+        #recent evaluation times, used to pick the batch size
+        self.eval_time_history = collections.deque(maxlen=100)
         self.individuals_until_end_budget = individuals_until_end_budget
 
         self.individual_generator = individual_generator 
@@ -106,10 +128,12 @@ class SteadyStateEvolver():
         self.memory_limit = memory_limit
 
         self.client = client
+        self.evaluator = evaluator
 
 
         self.survival_selector=survival_selector
         self.parent_selector=parent_selector
+        self.pareto_archive = None
 
         
         total_var_p = crossover_probability + mutate_probability + mutate_then_crossover_probability + crossover_then_mutate_probability
@@ -178,9 +202,11 @@ class SteadyStateEvolver():
     def optimize(self):
 
         #intialize the client
-        if self.client is not None: #If user passed in a client manually
-           self._client = self.client
-        else:
+        if isinstance(self.evaluator, tpot2.evaluators.BaseEvaluator): #If user passed in an evaluator manually
+            self._evaluator = self.evaluator
+        elif self.client is not None: #If user passed in a client manually
+            self._evaluator = tpot2.evaluators.DaskEvaluator(self.client)
+        elif self.evaluator == "dask":
 
             if self.verbose >= 4:
                 silence_logs = 30
@@ -188,15 +214,28 @@ class SteadyStateEvolver():
                 silence_logs = 40
             else:
                 silence_logs = 50
-            self._cluster = LocalCluster(n_workers=self.n_jobs, #if no client is passed in and no global client exists, create our own
+            cluster = LocalCluster(n_workers=self.n_jobs, #if no client is passed in and no global client exists, create our own
                     threads_per_worker=1,
                     silence_logs=silence_logs,
                     processes=False,
                     memory_limit=self.memory_limit)
-            self._client = Client(self._cluster)
+            self._evaluator = tpot2.evaluators.DaskEvaluator(Client(cluster), cluster=cluster)
+        else:
+            self._evaluator = tpot2.evaluators.EVALUATORS[self.evaluator](n_jobs=self.n_jobs)
+
+        if self.runtime_model is not None and len(self.runtime_model) == 0:
+            self.runtime_model.update_from_history(self.population.evaluated_individuals)
+
+        #the nondominated individuals evaluated so far, updated as each evaluation completes
+        self.pareto_archive = tpot2.utils.pareto_archive.ParetoArchive(self.objective_function_weights)
+        history = self.population.history
+        if len(history) > 0:
+            ids = np.arange(len(history))
+            self.pareto_archive.extend(history.keys, np.column_stack([history.get(ids, name) for name in self.objective_names]),
+                                    budgets=history.get_floats(ids, "Budget") if "Budget" in history.columns else None)
         
 
-        self.max_queue_size = len(self._client.cluster.workers)
+        self.max_queue_size = self._evaluator.n_workers
 
         #set up logging params
         evaluated_count = 0
@@ -224,16 +263,7 @@ class SteadyStateEvolver():
             #submit initial population
             individuals_to_evaluate = self.get_unevaluated_individuals(self.objective_names, budget=budget,)
 
-            for individual in individuals_to_evaluate:
-                if len(submitted_futures) >= self.max_queue_size:
-                    break
-                future = self._client.submit(tpot2.utils.eval_utils.eval_objective_list, individual,  self.objective_functions, verbose=self.verbose, timeout=self.max_eval_time_seconds,**self.objective_kwargs)
-                
-                submitted_futures[future] = {"individual": individual,
-                                            "time": time.time(),
-                                            "budget": budget,}
-                submitted_inds.add(individual.unique_id())
-                self.population.update_column(individual, column_names="Submitted Timestamp", data=time.time())
+            self.submit_individuals(individuals_to_evaluate, submitted_futures, submitted_inds, budget=budget)
 
             done = False
             start_time = time.time()
@@ -244,69 +274,78 @@ class SteadyStateEvolver():
                 ###############################
 
                 #wait for at least one future to finish or timeout
-                try:
-                    next(distributed.as_completed(submitted_futures, timeout=self.max_eval_time_seconds))
-                except dask.distributed.TimeoutError:
-                    pass
-                except dask.distributed.CancelledError:
-                    pass
+                self._evaluator.wait_first(list(submitted_futures.keys()), timeout=self.max_eval_time_seconds)
 
                 #Loop through all futures, collect completed and timeout futures.
+                n_completed = 0
                 for completed_future in list(submitted_futures.keys()):
+                    these_individuals = submitted_futures[completed_future]["individuals"]
                 
                     #get scores and update                            
                     if completed_future.done(): #if future is done
                         #If the future is done but threw and error, record the error
-                        if completed_future.exception() or completed_future.status == "error": #if the future is done and threw an error
+                        if completed_future.cancelled(): #if the future is done and was cancelled
+                            print("Cancelled future (likely memory related)")
+                            results = [(["INVALID" for _ in range(len(self.objective_names))], None, None) for _ in these_individuals]
+                        elif completed_future.exception(): #if the future is done and threw an error
                             print("Exception in future")
                             print(completed_future.exception())
-                            scores = ["INVALID" for _ in range(len(self.objective_names))]
-                        elif completed_future.cancelled(): #if the future is done and was cancelled
-                            print("Cancelled future (likely memory related)")
-                            scores = ["INVALID" for _ in range(len(self.objective_names))]
+                            results = [(["INVALID" for _ in range(len(self.objective_names))], None, None) for _ in these_individuals]
                         else: #if the future is done and did not throw an error, get the scores
                             try:
-                                scores = completed_future.result()
+                                results = completed_future.result()
                             except Exception as e:
                                 print("Exception in future, but not caught by dask")
                                 print(e)
                                 print(completed_future.exception())
                                 print(completed_future)
-                                print("status", completed_future.status)
                                 print("done", completed_future.done())
                                 print("cancelld ", completed_future.cancelled())
-                                scores = ["INVALID" for _ in range(len(self.objective_names))]
+                                results = [(["INVALID" for _ in range(len(self.objective_names))], None, None) for _ in these_individuals]
                     else: #if future is not done
                         
                         #check if the future has been running for too long, cancel the future
-                        if time.time() - submitted_futures[completed_future]["time"] > self.max_eval_time_seconds*2:
+                        #each individual in a batch has its own max_eval_time_seconds
+                        if time.time() - submitted_futures[completed_future]["time"] > self.max_eval_time_seconds*2*len(these_individuals):
                             completed_future.cancel()
                             
                             if self.verbose >= 4:
                                 print(f'WARNING AN INDIVIDUAL TIMED OUT (Fallback): \n {submitted_futures[completed_future]} \n')
                             
-                            scores = ["TIMEOUT" for _ in range(len(self.objective_names))]
+                            results = [(["TIMEOUT" for _ in range(len(self.objective_names))], None, None) for _ in these_individuals]
                         else:
                             continue #otherwise, continue to next future
                     
 
 
                     #update population
-                    this_individual = submitted_futures[completed_future]["individual"]
                     this_budget = submitted_futures[completed_future]["budget"]
                     this_time = submitted_futures[completed_future]["time"]
 
-                    if len(scores) < len(self.objective_names):
-                        scores = [scores[0] for _ in range(len(self.objective_names))]
-                    self.population.update_column(this_individual, column_names=self.objective_names, data=scores)
-                    self.population.update_column(this_individual, column_names="Completed Timestamp", data=time.time())
-                    if budget is not None:
-                        self.population.update_column(this_individual, column_names="Budget", data=this_budget)
+                    for this_individual, (scores, eval_time, record) in zip(these_individuals, results):
+                        if len(scores) < len(self.objective_names):
+                            scores = [scores[0] for _ in range(len(self.objective_names))]
+                        self.population.update_column(this_individual, column_names=self.objective_names, data=scores)
+                        tpot2.utils.telemetry.update_population_telemetry(self.population, [this_individual], [record])
+                        self.population.update_column(this_individual, column_names="Completed Timestamp", data=time.time())
+                        if budget is not None:
+                            self.population.update_column(this_individual, column_names="Budget", data=this_budget)
+                        self.pareto_archive.add(this_individual.unique_id(), scores, budget=this_budget)
+
+                        if eval_time is not None and "TIMEOUT" not in list(scores):
+                            self.eval_time_history.append(eval_time)
+                        if self.runtime_model is not None:
+                            self.runtime_model.add(this_individual, eval_time, budget=this_budget)
+
+                        submitted_inds.add(this_individual.unique_id())
+                        if self.verbose >= 1:
+                            pbar.update(1)
+
+                    if self.evaluation_cache is not None:
+                        self.evaluation_cache.put(these_individuals, [scores for scores, _, _ in results], budget=this_budget)
 
                     submitted_futures.pop(completed_future)
-                    submitted_inds.add(this_individual.unique_id())
-                    if self.verbose >= 1:
-                        pbar.update(1)
+                    n_completed += 1
 
                 #now we have a list of completed futures
 
@@ -319,10 +358,7 @@ class SteadyStateEvolver():
                 # Step 2: Early Stopping
                 ###############################
                 if self.verbose >= 3:  
-                    sign = np.sign(self.objective_function_weights)
-                    valid_df = self.population.evaluated_individuals[~self.population.evaluated_individuals[self.objective_names].isin(["TIMEOUT","INVALID"]).any(axis=1)][self.objective_names]*sign
-                    cur_best_scores = valid_df.max(axis=0)*sign
-                    cur_best_scores = cur_best_scores.to_numpy()
+                    cur_best_scores = self.pareto_archive.best_scores()
                     for i, obj in enumerate(self.objective_names):
                         print(f"Best {obj} score: {cur_best_scores[i]}")
 
@@ -330,10 +366,8 @@ class SteadyStateEvolver():
                     if self.budget is None or self.budget>=self.budget_range[-1]: #self.budget>=1:
                         #get sign of objective_function_weights
                         sign = np.sign(self.objective_function_weights)
-                        #get best score for each objective
-                        valid_df = self.population.evaluated_individuals[~self.population.evaluated_individuals[self.objective_names].isin(["TIMEOUT","INVALID"]).any(axis=1)][self.objective_names]*sign
-                        cur_best_scores = valid_df.max(axis=0)
-                        cur_best_scores = cur_best_scores.to_numpy()
+                        #get best score for each objective. The best score of each objective is always on the pareto front.
+                        cur_best_scores = self.pareto_archive.best_scores()*sign
                         #cur_best_scores =  self.population.get_column(self.population.population, column_names=self.objective_names).max(axis=0)*sign #TODO this assumes the current population is the best
                         
                         improved = ( np.array(cur_best_scores) - np.array(best_scores) >= np.array(self.early_stop_tol) )
@@ -365,7 +399,7 @@ class SteadyStateEvolver():
                     done = True
                     break
                 
-                if self.max_evaluated_individuals is not None and len(self.population.evaluated_individuals.dropna(subset=self.objective_names)) >= self.max_evaluated_individuals:
+                if self.max_evaluated_individuals is not None and self.population.count_evaluated(self.objective_names) >= self.max_evaluated_individuals:
                     print("Evaluated enough individuals")
                     done = True
                     break
@@ -375,22 +409,14 @@ class SteadyStateEvolver():
                 ###############################
                 individuals_to_evaluate = self.get_unevaluated_individuals(self.objective_names, budget=budget,)
                 individuals_to_evaluate = [ind for ind in individuals_to_evaluate if ind.unique_id() not in submitted_inds]
-                for individual in individuals_to_evaluate:
-                    if self.max_queue_size > len(submitted_futures):
-                        future = self._client.submit(tpot2.utils.eval_utils.eval_objective_list, individual,  self.objective_functions, verbose=self.verbose, timeout=self.max_eval_time_seconds,**self.objective_kwargs)
-                        
-                        submitted_futures[future] = {"individual": individual,
-                                                    "time": time.time(),
-                                                    "budget": budget,}
-                        submitted_inds.add(individual.unique_id())
-
-                        self.population.update_column(individual, column_names="Submitted Timestamp", data=time.time())
+                self.submit_individuals(individuals_to_evaluate, submitted_futures, submitted_inds, budget=budget)
 
 
                 ###############################
                 # Step 4: Survival Selection
                 ###############################
-                if self.survival_selector is not None:
+                #the live population only changes when evaluations complete
+                if self.survival_selector is not None and n_completed > 0:
                     parents_df = self.population.get_column(self.population.population, column_names=self.objective_names + ["Individual"], to_numpy=False)
                     evaluated = parents_df[~parents_df[self.objective_names].isna().any(axis=1)]
                     if len(evaluated) > self.population_size:
@@ -423,7 +449,8 @@ class SteadyStateEvolver():
                 ###############################
                 # Step 5: Parent Selection and Variation
                 ###############################
-                n_individuals_to_submit = self.max_queue_size - len(submitted_futures)
+                batch_size = tpot2.utils.eval_utils.get_batch_size(self.eval_time_history, batch_eval_time_threshold=self.batch_eval_time_threshold, max_batch_size=self.max_batch_size)
+                n_individuals_to_submit = (self.max_queue_size - len(submitted_futures))*batch_size
                 if n_individuals_to_submit > 0:
                     parents_df = self.population.get_column(self.population.population, column_names=self.objective_names+ ["Individual"], to_numpy=False)
                     parents_df = parents_df[~parents_df[self.objective_names].isin(["TIMEOUT","INVALID"]).any(axis=1)]
@@ -470,15 +497,7 @@ class SteadyStateEvolver():
                 ###############################
                 individuals_to_evaluate = self.get_unevaluated_individuals(self.objective_names, budget=budget,)
                 individuals_to_evaluate = [ind for ind in individuals_to_evaluate if ind.unique_id() not in submitted_inds]
-                for individual in individuals_to_evaluate:
-                    if self.max_queue_size > len(submitted_futures):
-                        future = self._client.submit(tpot2.utils.eval_utils.eval_objective_list, individual,  self.objective_functions, verbose=self.verbose, timeout=self.max_eval_time_seconds,**self.objective_kwargs)
-                        
-                        submitted_futures[future] = {"individual": individual,
-                                                    "time": time.time(),
-                                                    "budget": budget,}
-                        submitted_inds.add(individual.unique_id())
-                        self.population.update_column(individual, column_names="Submitted Timestamp", data=time.time())
+                self.submit_individuals(individuals_to_evaluate, submitted_futures, submitted_inds, budget=budget)
 
 
                 #Checkpointing
@@ -507,11 +526,71 @@ class SteadyStateEvolver():
         if self.population_file is not None:
             pickle.dump(self.population, open(self.population_file, "wb"))
 
-        if self.client is None: #If we created our own client, close it
-            self._client.close()
-            self._cluster.close()
-
-        tpot2.utils.get_pareto_frontier(self.population.evaluated_individuals, column_names=self.objective_names, weights=self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
+        if self.client is None and not isinstance(self.evaluator, tpot2.evaluators.BaseEvaluator): #If we created our own evaluator, close it
+            self._evaluator.close()
+
+        pareto_front = np.full(len(self.population.history), np.nan)
+        pareto_front[self.population.history.get_ids(self.pareto_archive.items)] = 1
+        self.population.history.set_column("Pareto_Front", pareto_front)
+
+
+    def submit_individuals(self, individuals, submitted_futures, submitted_inds, budget=None):
+        '''
+        Submits individuals for evaluation until there are max_queue_size tasks in submitted_futures.
+        Fast evaluations are packed into batches (see tpot2.utils.eval_utils.get_batch_size), so each task may hold several individuals.
+        If evaluation_cache is set, individuals found in the cache get their scores from it and are not submitted.
+        If runtime_model is set, individuals are submitted longest predicted evaluation time first, and those predicted to take more than
+        runtime_skip_factor*max_eval_time_seconds are marked as "TIMEOUT" without being submitted.
+        If data_local_scheduling is set, each batch is preferably submitted to the worker that evaluated the parents of its individuals (see tpot2.utils.telemetry.get_lineage_workers).
+        '''
+        if self.evaluation_cache is not None:
+            individuals, hit_individuals, hit_scores = tpot2.utils.evaluation_cache.apply_evaluation_cache(self.population, self.evaluation_cache, individuals, self.objective_names, budget=budget, verbose=self.verbose)
+            for individual, scores in zip(hit_individuals, hit_scores):
+                self.pareto_archive.add(individual.unique_id(), scores, budget=budget)
+
+        if self.runtime_model is not None and len(individuals) > 0:
+            predicted_times = self.runtime_model.predict(individuals, budget=budget)
+            if predicted_times is not None:
+                order = np.argsort(-predicted_times, kind="stable")
+                if self.runtime_skip_factor is not None and self.max_eval_time_seconds is not None:
+                    too_slow = predicted_times > self.runtime_skip_factor*self.max_eval_time_seconds
+                    skipped = [individuals[i] for i in order if too_slow[i]]
+                    if len(skipped) > 0:
+                        self.population.update_column(skipped, column_names=self.objective_names, data=[["TIMEOUT" for _ in self.objective_names] for _ in skipped])
+                        self.population.update_column(skipped, column_names="Completed Timestamp", data=time.time())
+                        for individual in skipped:
+                            submitted_inds.add(individual.unique_id())
+                    order = [i for i in order if not too_slow[i]]
+                individuals = [individuals[i] for i in order]
+
+        batch_size = tpot2.utils.eval_utils.get_batch_size(self.eval_time_history, batch_eval_time_threshold=self.batch_eval_time_threshold, max_batch_size=self.max_batch_size)
+        individuals = list(individuals)
+        if self.data_local_scheduling:
+            workers = tpot2.utils.telemetry.get_lineage_workers(self.population, individuals)
+        else:
+            workers = [None for _ in individuals]
+        batches, batch_workers = tpot2.utils.eval_utils.group_tasks_by_worker(individuals, workers, batch_size)
+        #the queue holds about one task per worker, so a worker that already has a preferred task waiting is not given another
+        queued_workers = set(entry["worker"] for entry in submitted_futures.values())
+        for batch, worker in zip(batches, batch_workers):
+            if len(submitted_futures) >= self.max_queue_size:
+                break
+            args = (tpot2.utils.eval_utils.eval_objective_list_batch, batch,  self.objective_functions)
+            kwargs = dict(verbose=self.verbose, timeout=self.max_eval_time_seconds, isolate=self.isolate_evaluations, **self.objective_kwargs)
+            if worker is None or worker in queued_workers:
+                worker = None
+                future = self._evaluator.submit(*args, **kwargs)
+            else:
+                queued_workers.add(worker)
+                future = self._evaluator.submit_to(worker, *args, **kwargs)
+
+            submitted_futures[future] = {"individuals": batch,
+                                        "time": time.time(),
+                                        "budget": budget,
+                                        "worker": worker,}
+            for individual in batch:
+                submitted_inds.add(individual.unique_id())
+            self.population.update_column(batch, column_names="Submitted Timestamp", data=time.time())
 
     
 
@@ -521,20 +600,10 @@ class SteadyStateEvolver():
         else:
             cur_pop = np.array(self.population.population)
 
-        if all([name_step in self.population.evaluated_individuals.columns for name_step in column_names]):
-            if budget is not None:
-                offspring_scores = self.population.get_column(cur_pop, column_names=column_names+["Budget"], to_numpy=False)
-                #Individuals are unevaluated if we have a higher budget OR if any of the objectives are nan
-                unevaluated_filter = lambda i: any(offspring_scores.loc[offspring_scores.index[i]][column_names].isna()) or (offspring_scores.loc[offspring_scores.index[i]]["Budget"] < budget)
-            else:
-                offspring_scores = self.population.get_column(cur_pop, column_names=column_names, to_numpy=False)
-                unevaluated_filter = lambda i: any(offspring_scores.loc[offspring_scores.index[i]][column_names].isna())
-            unevaluated_individuals_this_step = [i for i in range(len(cur_pop)) if unevaluated_filter(i)]
-            return cur_pop[unevaluated_individuals_this_step]
-        
-        else: #if column names are not in the evaluated_individuals, then we have not evaluated any individuals yet
-            for name_step in column_names:
-                self.population.evaluated_individuals[name_step] = np.nan
-            return cur_pop
+        #create the columns up front so that they are part of evaluated_individuals even before anything is evaluated
+        for name_step in column_names:
+            self.population.history.add_column(name_step)
+        #Individuals are unevaluated if we have a higher budget OR if any of the objectives are nan
+        return cur_pop[self.population.is_unevaluated(cur_pop, column_names, budget=budget)]
 
     
\ No newline at end of file
@@ -1,11 +1,28 @@
 from functools import partial
+import collections
+import concurrent.futures
+import contextlib
+import os
 import numpy as np
 import networkx as nx
 
 import matplotlib.pyplot as plt
 import sklearn
+import sklearn.decomposition
+import sklearn.ensemble
+import sklearn.feature_selection
+import sklearn.kernel_approximation
+import sklearn.linear_model
+import sklearn.naive_bayes
+import sklearn.neighbors
+import sklearn.neural_network
+import sklearn.svm
+import sklearn.tree
 from sklearn.utils.metaestimators import available_if
 import pandas as pd
+import joblib
+from scipy import sparse
+import tpot2
 
 from sklearn.utils.metaestimators import _BaseComposition
 from sklearn.utils.validation import check_memory
@@ -14,6 +31,26 @@ from sklearn.preprocessing import LabelEncoder
 #labels - str
 #attributes - "instance" -> instance of the type
 
+#estimators that accept scipy sparse input whatever their hyperparameters.
+#other nodes get dense input, unless the graph node or the estimator has an accept_sparse attribute (see _accepts_sparse)
+SPARSE_INPUT_ESTIMATORS = (
+    sklearn.linear_model.LogisticRegression, sklearn.linear_model.SGDClassifier, sklearn.linear_model.SGDRegressor,
+    sklearn.linear_model.Ridge, sklearn.linear_model.RidgeClassifier, sklearn.linear_model.Lasso, sklearn.linear_model.ElasticNet,
+    sklearn.linear_model.LinearRegression, sklearn.linear_model.Perceptron, sklearn.linear_model.PassiveAggressiveClassifier,
+    sklearn.svm.LinearSVC, sklearn.svm.LinearSVR, sklearn.svm.SVC, sklearn.svm.SVR,
+    sklearn.naive_bayes.MultinomialNB, sklearn.naive_bayes.BernoulliNB, sklearn.naive_bayes.ComplementNB,
+    sklearn.tree.DecisionTreeClassifier, sklearn.tree.DecisionTreeRegressor,
+    sklearn.ensemble.RandomForestClassifier, sklearn.ensemble.RandomForestRegressor,
+    sklearn.ensemble.ExtraTreesClassifier, sklearn.ensemble.ExtraTreesRegressor,
+    sklearn.ensemble.GradientBoostingClassifier, sklearn.ensemble.GradientBoostingRegressor,
+    sklearn.neighbors.KNeighborsClassifier, sklearn.neighbors.KNeighborsRegressor,
+    sklearn.neural_network.MLPClassifier, sklearn.neural_network.MLPRegressor,
+    sklearn.decomposition.TruncatedSVD, sklearn.kernel_approximation.Nystroem, sklearn.kernel_approximation.RBFSampler,
+    sklearn.feature_selection.SelectKBest, sklearn.feature_selection.SelectPercentile, sklearn.feature_selection.SelectFwe,
+    sklearn.feature_selection.SelectFpr, sklearn.feature_selection.SelectFdr, sklearn.feature_selection.VarianceThreshold,
+    sklearn.preprocessing.MaxAbsScaler, sklearn.preprocessing.Normalizer, sklearn.preprocessing.Binarizer,
+)
+
 
 def plot(graph: nx.DiGraph):
     G = graph.reverse()
@@ -87,6 +124,10 @@ def estimator_fit_transform_override_cross_val_predict(estimator, X, y, cv=5, me
     return preds, estimator
 
 
+def _cached_result(result):
+    return result
+
+
 # https://github.com/scikit-learn/scikit-learn/blob/7db5b6a98/sklearn/pipeline.py#L883
 def _fit_transform_one(model, X, y, fit_transform=True, subset_indexes=None, **fit_params):
     """Fit and transform one step in a pipeline."""
@@ -106,6 +147,233 @@ def _fit_transform_one(model, X, y, fit_transform=True, subset_indexes=None, **f
 
     return res, model
 
+def _nbytes(X):
+    '''Returns the number of bytes used by the data of a numpy array, scipy sparse matrix or pandas object.'''
+    if isinstance(X, (pd.DataFrame, pd.Series)):
+        return int(np.sum(X.memory_usage(index=False)))
+    if sparse.issparse(X):
+        return sum(getattr(X, attribute).nbytes for attribute in ["data", "indices", "indptr", "row", "col", "offsets"] if hasattr(X, attribute))
+    return getattr(X, "nbytes", 0)
+
+
+def _stack_columns(parts):
+    '''Horizontally stacks the outputs of the children of a node into its input. The input is a CSR matrix if any of the outputs is sparse.'''
+    if len(parts) == 1:
+        return parts[0]
+    if any(sparse.issparse(part) for part in parts):
+        return sparse.hstack([part if sparse.issparse(part) else np.asarray(part) for part in parts], format="csr")
+    return np.hstack(parts)
+
+
+def _accepts_sparse(graph, node):
+    '''
+    Returns True if the node can be given scipy sparse input. Checked in order: the accept_sparse attribute of the graph node,
+    the accept_sparse attribute of the estimator (e.g. sklearn.preprocessing.FunctionTransformer), SPARSE_INPUT_ESTIMATORS, and the sklearn input tags if available.
+    '''
+    if "accept_sparse" in graph.nodes[node]:
+        return bool(graph.nodes[node]["accept_sparse"])
+    instance = graph.nodes[node]["instance"]
+    if hasattr(instance, "accept_sparse"):
+        return bool(instance.accept_sparse)
+    if isinstance(instance, SPARSE_INPUT_ESTIMATORS):
+        return True
+    try:
+        return bool(instance.__sklearn_tags__().input_tags.sparse)
+    except AttributeError:
+        return False
+
+
+def _format_input(graph, node, X):
+    '''Densifies sparse input for nodes that do not accept it. Sparse input is only densified here, so sparse outputs stay sparse between nodes that accept them.'''
+    if sparse.issparse(X) and not _accepts_sparse(graph, node):
+        return X.toarray()
+    return X
+
+
+class _IntermediateOutputs():
+    '''
+    Holds the outputs of the nodes of a graph while it is fit or transformed, and assembles the inputs of the nodes from them.
+
+    The output of a node is freed once every node that uses it as input (its parents) has consumed it, unless the node is in keep.
+    Nodes with a single child use the output of the child as is. Sparse outputs stay sparse, and inputs with any sparse output are CSR matrices. Nodes with several children get one contiguous input array, which is shared by every node
+    with the same ordered children and freed once all of them have run.
+    If n_rows is given and the number of columns and the dtype of the outputs of the children are known from the fit (record_layouts=True),
+    the input array is preallocated when the first child finishes. The output of each child is then copied into its columns as soon as it is produced and freed,
+    instead of all the outputs of the children being held until the last one finishes and then stacked.
+    Also keeps track of the bytes held, and the peak over the whole run.
+    '''
+    def __init__(self, graph, nodes, keep=None, n_rows=None, record_layouts=False):
+        self.graph = graph
+        self.keep = set(keep) if keep is not None else set()
+        self.n_rows = n_rows
+        self.record_layouts = record_layouts
+        self.outputs = {}
+        #assembled (or partially filled) inputs of the nodes with several children, by their ordered children
+        self.inputs = {}
+        self.live_bytes = 0
+        self.peak_bytes = 0
+
+        self.children = {node: tuple(get_ordered_successors(graph, node)) for node in nodes}
+        #number of nodes that have not run yet, for each assembled input
+        self.remaining_input_consumers = collections.Counter(children for children in self.children.values() if len(children) > 1)
+        #children whose output has not been copied into the assembled input yet
+        self.unwritten = {children: set(children) for children in self.remaining_input_consumers}
+        self.input_of = collections.defaultdict(list)
+        #number of consumers (parents with a single child and distinct assembled inputs) that have not consumed the output of each node yet
+        self.remaining_consumers = collections.Counter()
+        for children in self.children.values():
+            if len(children) == 1:
+                self.remaining_consumers[children[0]] += 1
+        for children in self.remaining_input_consumers:
+            for child in children:
+                self.remaining_consumers[child] += 1
+                self.input_of[child].append(children)
+
+    def record_peak(self, extra_bytes=0):
+        self.peak_bytes = max(self.peak_bytes, self.live_bytes + extra_bytes)
+
+    def add(self, node, output):
+        if self.record_layouts:
+            self.graph.nodes[node]["output_layout"] = (output.shape[1], output.dtype) if isinstance(output, np.ndarray) and output.ndim == 2 else None
+
+        output_bytes = _nbytes(output)
+        self.record_peak(output_bytes)
+        if self.remaining_consumers[node] > 0 or node in self.keep:
+            self.outputs[node] = output
+            self.live_bytes += output_bytes
+            for children in self.input_of[node]:
+                self._write(children, node)
+
+    def _write(self, children, child):
+        '''Copies the output of child into its columns of the assembled input of children, if that input can be preallocated.'''
+        layouts = [self.graph.nodes[c].get("output_layout") for c in children]
+        if self.n_rows is None or any(layout is None for layout in layouts):
+            return
+
+        if children not in self.inputs:
+            buffer = np.empty((self.n_rows, sum(width for width, _ in layouts)), dtype=np.result_type(*[dtype for _, dtype in layouts]))
+            self.inputs[children] = buffer
+            self.live_bytes += buffer.nbytes
+            self.record_peak()
+
+        position = children.index(child)
+        start = sum(width for width, _ in layouts[:position])
+        width = layouts[position][0]
+        output = self.outputs[child]
+        buffer = self.inputs[children]
+        #outputs that do not match the fitted layout are stacked with the others when the input is assembled
+        if not isinstance(output, np.ndarray) or output.shape != (self.n_rows, width) or not np.can_cast(output.dtype, buffer.dtype, casting="safe"):
+            return
+        buffer[:, start:start+width] = output
+        self.unwritten[children].discard(child)
+        self._consume(child)
+
+    def _consume(self, node):
+        self.remaining_consumers[node] -= 1
+        if self.remaining_consumers[node] == 0 and node not in self.keep:
+            self.live_bytes -= _nbytes(self.outputs.pop(node))
+
+    def get_input(self, node, X):
+        '''Returns the input of node: X if it has no children, the output of its child if it has one, and the assembled outputs of its children otherwise.'''
+        children = self.children[node]
+        if len(children) == 0:
+            return X
+        if len(children) == 1:
+            return self.outputs[children[0]]
+
+        if len(self.unwritten[children]) > 0:
+            buffer = self.inputs.get(children)
+            parts = []
+            start = 0
+            for child in children:
+                if child in self.unwritten[children]:
+                    parts.append(self.outputs[child])
+                else:
+                    width = self.graph.nodes[child]["output_layout"][0]
+                    parts.append(buffer[:, start:start+width])
+                #written outputs are at the offsets of the fitted layouts, even if an unwritten output has another width
+                layout = self.graph.nodes[child].get("output_layout")
+                start += parts[-1].shape[1] if layout is None else layout[0]
+            assembled = _stack_columns(parts)
+            del parts
+            if buffer is not None:
+                self.live_bytes -= buffer.nbytes
+            self.inputs[children] = assembled
+            self.live_bytes += _nbytes(assembled)
+            self.record_peak()
+            for child in list(self.unwritten[children]):
+                self.unwritten[children].discard(child)
+                self._consume(child)
+        return self.inputs[children]
+
+    def release_inputs(self, node):
+        '''Marks node as done with its input, and frees the outputs and assembled inputs that no other node needs.'''
+        children = self.children[node]
+        if len(children) == 1:
+            self._consume(children[0])
+        elif len(children) > 1:
+            self.remaining_input_consumers[children] -= 1
+            if self.remaining_input_consumers[children] == 0:
+                self.live_bytes -= _nbytes(self.inputs.pop(children))
+
+
+def _run_nodes(graph, nodes, X, intermediates, make_task, finish_task, executor=None):
+    '''
+    Runs the nodes of a graph from the leaves to the root. Nodes without inputs get X, the others get the outputs of their children assembled by intermediates.
+
+    For each node, make_task(node, this_X) returns a (function, args, kwargs) tuple. The function is called in the main thread, or submitted to executor
+    (a concurrent.futures.Executor) if given, in which case every node whose children have all finished runs concurrently with the others.
+    finish_task(node, result) is always called in the main thread with the return value of the function, and returns the output of the node,
+    which is stored in intermediates.
+    '''
+    if executor is None:
+        for node in nodes:
+            function, args, kwargs = make_task(node, _format_input(graph, node, intermediates.get_input(node, X)))
+            _finish_node(node, finish_task(node, function(*args, **kwargs)), intermediates)
+        return
+
+    order = {node: i for i, node in enumerate(nodes)}
+    #number of children of each node that have not finished yet
+    remaining_children = {node: sum(1 for child in get_ordered_successors(graph, node) if child in order) for node in nodes}
+    ready = [node for node in nodes if remaining_children[node] == 0]
+    futures = {}
+    try:
+        while len(ready) > 0 or len(futures) > 0:
+            for node in ready:
+                function, args, kwargs = make_task(node, _format_input(graph, node, intermediates.get_input(node, X)))
+                futures[executor.submit(function, *args, **kwargs)] = node
+            ready = []
+
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in sorted(done, key=lambda future: order[futures[future]]):
+                node = futures.pop(future)
+                _finish_node(node, finish_task(node, future.result()), intermediates)
+                for parent in graph.predecessors(node):
+                    if parent in order:
+                        remaining_children[parent] -= 1
+                        if remaining_children[parent] == 0:
+                            ready.append(parent)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def _finish_node(node, transformed, intermediates):
+    if transformed is None:
+        #e.g. the root taken from a node cache, which does not store outputs that no other node uses
+        intermediates.release_inputs(node)
+        return
+    if sparse.issparse(transformed):
+        #CSR keeps sparse outputs stackable and row indexable
+        transformed = transformed.tocsr()
+    elif len(transformed.shape) == 1:
+        transformed = transformed.reshape(-1, 1)
+    #the input of node is still held while its output is added, as it is during the call
+    intermediates.add(node, transformed)
+    intermediates.release_inputs(node)
+
+
 #TODO: make sure predict proba doesn't return p and 1-p for nclasses=2
 def fit_sklearn_digraph(graph: nx.DiGraph,
         X,
@@ -115,7 +383,21 @@ def fit_sklearn_digraph(graph: nx.DiGraph,
         cross_val_predict_cv = 0, #func(est,X,y) -> transformed_X
         memory = None,
         topo_sort = None,
+        report_peak_bytes = False,
+        executor = None,
+        node_cache = None,
         ):
+    '''
+    Fits every node of the graph, from the leaves to the root. The output of each node is kept only until all the nodes that use it as input have been fit.
+
+    If node_cache (a tpot2.utils.node_cache.NodeFitCache) is given, the fitted estimator and output of each node are looked up by the content address of the node
+    (see tpot2.utils.node_cache.node_key) before fitting it, and stored after. The data is identified by tpot2.utils.node_cache.get_data_fingerprint if it is set, otherwise by a hash of X and y.
+
+    If executor (a concurrent.futures.Executor) is given, independent branches of the graph are fit concurrently in it.
+    With a process pool, the fitted copies of the estimators are put back into the graph.
+
+    If report_peak_bytes is True, returns the largest number of bytes held by intermediate node outputs and assembled inputs at any point during the fit.
+    '''
 
     memory = check_memory(memory)
 
@@ -127,16 +409,14 @@ def fit_sklearn_digraph(graph: nx.DiGraph,
         topo_sort = list(nx.topological_sort(graph))
         topo_sort.reverse()
 
-    transformed_steps =  {}
+    intermediates = _IntermediateOutputs(graph, topo_sort, record_layouts=True)
+    #content addresses of the nodes, and whether they were found in node_cache
+    node_keys = {}
+    cache_hits = set()
+    data_fingerprint = []
 
-    for i in range(len(topo_sort)):
-        node = topo_sort[i]
+    def make_task(node, this_X):
         instance = graph.nodes[node]["instance"]
-        if len(list(get_ordered_successors(graph, node))) == 0: #If this node had no inputs use X
-            this_X = X
-        else: #in node has inputs, get those
-            this_X = np.hstack([transformed_steps[child] for child in get_ordered_successors(graph, node)])
-
 
         subset_indexes = None
         if subset_col is not None and "subset_values" in graph.nodes[node]:
@@ -147,30 +427,74 @@ def fit_sklearn_digraph(graph: nx.DiGraph,
         # Removed so that the cache is the same for all models. Not including transform would index it seperately 
         #if i == len(topo_sort)-1: #last method doesn't need transformed.
         #    instance.fit(this_X, y)
-        
 
         if issubclass(type(instance), sklearn.base.RegressorMixin) or issubclass(type(instance), sklearn.base.ClassifierMixin):
-            transformed, instance = estimator_fit_transform_override_cross_val_predict_cached(instance, this_X, y, cv=cross_val_predict_cv, method=method,subset_indexes=subset_indexes)
+            fit_function = estimator_fit_transform_override_cross_val_predict_cached
+            fit_settings = dict(cv=cross_val_predict_cv, method=method, subset_indexes=subset_indexes)
         else:
-            transformed, instance = fit_transform_one_cached(instance, this_X, y, subset_indexes=subset_indexes)#instance.fit_transform(this_X,y)
-        
+            fit_function = fit_transform_one_cached #instance.fit_transform(this_X,y)
+            fit_settings = dict(subset_indexes=subset_indexes)
+
+        if node_cache is not None:
+            children = get_ordered_successors(graph, node)
+            if len(children) == 0 and len(data_fingerprint) == 0:
+                #set by the objective functions for each fold, so the data is only hashed once per fold
+                fingerprint = tpot2.utils.node_cache.get_data_fingerprint()
+                data_fingerprint.append(joblib.hash((X, y)) if fingerprint is None else fingerprint)
+            node_keys[node] = tpot2.utils.node_cache.node_key(instance,
+                                                            child_keys=[node_keys[child] for child in children],
+                                                            data_fingerprint=data_fingerprint[0] if len(children) == 0 else None,
+                                                            **fit_settings)
+            cached = node_cache.get(node_keys[node])
+            if cached is not None:
+                cache_hits.add(node)
+                fitted_instance, transformed = cached
+                return _cached_result, ((transformed, fitted_instance),), {}
+
+        return fit_function, (instance, this_X, y), fit_settings
+
+    def finish_task(node, result):
+        transformed, instance = result
         graph.nodes[node]["instance"] = instance
+        if node_cache is not None and node not in cache_hits:
+            #the fit output of the root is not used by other nodes
+            node_cache.put(node_keys[node], instance, transformed if len(list(graph.predecessors(node))) > 0 else None)
+        return transformed
+
+    _run_nodes(graph, topo_sort, X, intermediates, make_task, finish_task, executor=executor)
 
-        if len(transformed.shape) == 1:
-            transformed = transformed.reshape(-1, 1)
+    if report_peak_bytes:
+        return intermediates.peak_bytes
 
-        transformed_steps[node] = transformed
 
+def get_required_nodes(graph: nx.DiGraph, output_nodes, topo_sort = None):
+    '''
+    Returns the nodes that must run to compute the outputs of output_nodes: the output nodes and all the nodes they take input from, directly or not.
+    The nodes are ordered from the leaves to the roots, in the order of topo_sort if it is given.
+    '''
+    if topo_sort is None:
+        topo_sort = list(nx.topological_sort(graph))
+        topo_sort.reverse()
+    required = set(output_nodes)
+    for node in output_nodes:
+        required.update(nx.descendants(graph, node))
+    return [node for node in topo_sort if node in required]
 
 
 #TODO add attribute to decide 'method' for each node
-#TODO make more memory efficient. Free memory when a transformation is no longer needed
 #TODO better handle multiple roots
 def transform_sklearn_digraph(graph: nx.DiGraph,
                     X, 
                     method = 'auto',
                     output_nodes = None,
-                    topo_sort = None,):
+                    topo_sort = None,
+                    executor = None,):
+    '''
+    Transforms X through every node of the graph and returns a dictionary with the output of each node.
+    If output_nodes is given, only those nodes and the nodes they take input from are run (see get_required_nodes). Only the outputs of output_nodes are returned,
+    and every other output is freed as soon as the nodes that use it have run.
+    If executor (a concurrent.futures.Executor) is given, independent branches of the graph run concurrently in it.
+    '''
 
     if graph.number_of_nodes() == 1: #TODO make this better...
         return X
@@ -179,31 +503,25 @@ def transform_sklearn_digraph(graph: nx.DiGraph,
         topo_sort = list(nx.topological_sort(graph))
         topo_sort.reverse()
 
-    transformed_steps = {}
+    if output_nodes is not None:
+        topo_sort = get_required_nodes(graph, output_nodes, topo_sort=topo_sort)
+
+    intermediates = _IntermediateOutputs(graph, topo_sort, keep=topo_sort if output_nodes is None else output_nodes, n_rows=getattr(X, "shape", (None,))[0])
 
-    for i in range(len(topo_sort)):
-        node = topo_sort[i]
+    def make_task(node, this_X):
         instance = graph.nodes[node]["instance"]
-        if len(list(get_ordered_successors(graph, node))) == 0:
-            this_X = X
-        else:
-            this_X = np.hstack([transformed_steps[child] for child in get_ordered_successors(graph, node)])
-            
         if issubclass(type(instance), sklearn.base.RegressorMixin) or issubclass(type(instance), sklearn.base.ClassifierMixin):
             this_method = _method_name(instance.__class__.__name__, instance, method)
-            transformed = getattr(instance, this_method)(this_X)
+            return getattr(instance, this_method), (this_X,), {}
         else:
-            transformed = instance.transform(this_X)
+            return instance.transform, (this_X,), {}
 
-        if len(transformed.shape) == 1:
-            transformed = transformed.reshape(-1, 1)
-
-        transformed_steps[node] = transformed
+    _run_nodes(graph, topo_sort, X, intermediates, make_task, lambda node, result: result, executor=executor)
 
     if output_nodes is None:
-        return transformed_steps
+        return intermediates.outputs
     else:
-        return {n: transformed_steps[n] for n in output_nodes}
+        return {n: intermediates.outputs[n] for n in output_nodes}
 
 
 def get_inputs_to_node(graph: nx.DiGraph,
@@ -211,22 +529,116 @@ def get_inputs_to_node(graph: nx.DiGraph,
                     node,
                     method = 'auto',
                     topo_sort = None,
+                    executor = None,
                     ):
-    
+    '''
+    Returns the input of node for X. Only the nodes that node takes input from are run, so node itself and the nodes using its output are not.
+    '''
     if len(list(get_ordered_successors(graph, node))) == 0:
         this_X = X
     else:
         transformed_steps = transform_sklearn_digraph(graph,
                                         X, 
                                         method,
+                                        output_nodes = get_ordered_successors(graph, node),
                                         topo_sort = topo_sort,
+                                        executor = executor,
                                         )
 
-        this_X = np.hstack([transformed_steps[child] for child in get_ordered_successors(graph, node)])
-    return this_X
+        this_X = _stack_columns([transformed_steps[child] for child in get_ordered_successors(graph, node)])
+    return _format_input(graph, node, this_X)
     
 
 
+class ExecutionPlan():
+    '''
+    A flat list of steps that computes the input of the root of a fitted graph, so that inference does not look anything up in the graph.
+
+    Every node output, assembled input and X get an integer slot. Each step is either a bound method (the prediction method of inner
+    classifiers and regressors resolved with _method_name, or transform) applied to one slot, or the stacking of several slots into the input shared by the nodes
+    with the same children. Slots are cleared after their last use. Only the nodes the root takes input from are part of the plan (see get_required_nodes).
+
+    Parameters
+    ----------
+    graph : networkx.DiGraph
+        A fitted graph, with the ordered successors set up (see setup_ordered_successors).
+    root : node
+        The node whose input the plan computes.
+    topo_sort : list, optional
+        The nodes of the graph from the leaves to the root.
+    method : str, optional
+        The prediction method of inner classifiers and regressors, as in GraphPipeline.
+    '''
+    def __init__(self, graph, root, topo_sort=None, method='auto'):
+        if topo_sort is None:
+            topo_sort = list(nx.topological_sort(graph))
+            topo_sort.reverse()
+        nodes = get_required_nodes(graph, get_ordered_successors(graph, root), topo_sort=topo_sort)
+
+        slots = {} #node or tuple of children -> slot, X is slot 0
+        steps = []
+        def input_slot(children):
+            if len(children) == 0:
+                return 0
+            if len(children) == 1:
+                return slots[children[0]]
+            if children not in slots:
+                slots[children] = len(slots) + 1
+                steps.append((None, tuple(slots[child] for child in children), slots[children], False))
+            return slots[children]
+
+        for node in nodes:
+            instance = graph.nodes[node]["instance"]
+            this_input = input_slot(tuple(get_ordered_successors(graph, node)))
+            if issubclass(type(instance), sklearn.base.RegressorMixin) or issubclass(type(instance), sklearn.base.ClassifierMixin):
+                function = getattr(instance, _method_name(instance.__class__.__name__, instance, method))
+            else:
+                function = instance.transform
+            slots[node] = len(slots) + 1
+            steps.append((function, (this_input,), slots[node], not _accepts_sparse(graph, node)))
+
+        self.output_slot = input_slot(tuple(get_ordered_successors(graph, root)))
+        self.densify_output = not _accepts_sparse(graph, root)
+        self.root_instance = graph.nodes[root]["instance"]
+        self.n_slots = len(slots) + 1
+        self.steps = steps
+
+        #slots that can be cleared after each step
+        last_use = {}
+        for i, (_, input_slots, _, _) in enumerate(steps):
+            for slot in input_slots:
+                last_use[slot] = i
+        self.free_after = [[] for _ in steps]
+        for slot, i in last_use.items():
+            if slot != 0 and slot != self.output_slot:
+                self.free_after[i].append(slot)
+
+    def run(self, X):
+        '''Returns the input of the root for X.'''
+        values = [None]*self.n_slots
+        values[0] = X
+        for (function, input_slots, output_slot, densify), free in zip(self.steps, self.free_after):
+            if function is None:
+                output = _stack_columns([values[slot] for slot in input_slots])
+            else:
+                this_X = values[input_slots[0]]
+                if densify and sparse.issparse(this_X):
+                    this_X = this_X.toarray()
+                output = function(this_X)
+                if sparse.issparse(output):
+                    output = output.tocsr()
+                elif len(output.shape) == 1:
+                    output = output.reshape(-1, 1)
+            values[output_slot] = output
+            for slot in free:
+                values[slot] = None
+
+        this_X = values[self.output_slot]
+        if self.densify_output and sparse.issparse(this_X):
+            this_X = this_X.toarray()
+        return this_X
+
+
 def _estimator_has(attr):
     '''Check if we can delegate a method to the underlying estimator.
     First, we check the first fitted final estimator if available, otherwise we
@@ -256,6 +668,10 @@ class GraphPipeline(_BaseComposition):
                 subset_column = None,
                 drop_subset_column = True,
                 use_label_encoder=False,
+                report_peak_bytes=False,
+                n_jobs=1,
+                executor_type='thread',
+                node_cache=None,
                 **kwargs,
                 ):
         super().__init__(**kwargs)
@@ -290,6 +706,21 @@ class GraphPipeline(_BaseComposition):
 
             Can also be a sklearn.preprocessing.LabelEncoder object. If so, that label encoder is used.
 
+        report_peak_bytes: bool, optional
+            If True, fit stores in peak_intermediate_bytes_ the largest number of bytes held by intermediate node outputs at any point during the fit.
+            Intermediate outputs are always freed once every node that uses them has been fit.
+
+        n_jobs: int, optional
+            Number of independent branches of the graph that are fit or transformed concurrently. -1 uses all cores. If 1, the nodes run one at a time in the calling thread.
+
+        executor_type: str, optional
+            'thread' runs the branches in a concurrent.futures.ThreadPoolExecutor, 'process' in a concurrent.futures.ProcessPoolExecutor.
+            Threads suit estimators that release the GIL (most numpy, scipy and sklearn estimators). With processes, the estimators and their inputs are pickled for every node.
+
+        node_cache: tpot2.utils.node_cache.NodeFitCache, optional
+            A content-addressed cache of fitted nodes. Nodes whose subgraph, hyperparameters and data were already fit (by this or another pipeline using the same cache)
+            are taken from the cache instead of being fit again.
+
         '''
 
         self.graph = graph
@@ -299,6 +730,10 @@ class GraphPipeline(_BaseComposition):
         self.subset_column = subset_column
         self.drop_subset_column = drop_subset_column
         self.use_label_encoder = use_label_encoder
+        self.report_peak_bytes = report_peak_bytes
+        self.n_jobs = n_jobs
+        self.executor_type = executor_type
+        self.node_cache = node_cache
 
         setup_ordered_successors(graph)
 
@@ -351,18 +786,72 @@ class GraphPipeline(_BaseComposition):
             if self.drop_subset_column:
                 X = np.delete(X, self.subset_column, axis=1)
 
-        fit_sklearn_digraph(   graph=self.graph,
-                                X=X,
-                                y=y,
-                                method=self.method,
-                                cross_val_predict_cv = self.cross_val_predict_cv,
-                                memory = self.memory,
-                                topo_sort = self.topo_sorted_nodes,
-                                subset_col = subset_col,
-                                )
+        with self._executor() as executor:
+            peak_bytes = fit_sklearn_digraph(   graph=self.graph,
+                                    X=X,
+                                    y=y,
+                                    method=self.method,
+                                    cross_val_predict_cv = self.cross_val_predict_cv,
+                                    memory = self.memory,
+                                    topo_sort = self.topo_sorted_nodes,
+                                    subset_col = subset_col,
+                                    report_peak_bytes = self.report_peak_bytes,
+                                    executor = executor,
+                                    node_cache = self.node_cache,
+                                    )
+        if self.report_peak_bytes:
+            self.peak_intermediate_bytes_ = peak_bytes
+        self.execution_plan_ = None
         
         return self
 
+    @contextlib.contextmanager
+    def _executor(self):
+        '''Yields the executor that independent branches run in, or None if they run one at a time.'''
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        if n_jobs is None or n_jobs <= 1 or self.graph.number_of_nodes() == 1:
+            yield None
+            return
+
+        if self.executor_type == 'thread':
+            executor_class = concurrent.futures.ThreadPoolExecutor
+        elif self.executor_type == 'process':
+            executor_class = concurrent.futures.ProcessPoolExecutor
+        else:
+            raise ValueError(f"executor_type must be 'thread' or 'process', got {self.executor_type}")
+
+        with executor_class(max_workers=n_jobs) as executor:
+            yield executor
+
+    def compile(self):
+        '''
+        Precomputes an ExecutionPlan of the fitted pipeline, which predict, predict_proba, decision_function and transform then run without graph lookups.
+        The plan is dropped when the pipeline is fit again. It should be recompiled if the estimators in the graph are replaced.
+        The plan runs the nodes one at a time, so n_jobs is not used while a plan is set.
+        '''
+        self.execution_plan_ = ExecutionPlan(self.graph, self.root, topo_sort=self.topo_sorted_nodes, method=self.method)
+        return self
+
+    def _get_root_input(self, X):
+        execution_plan = getattr(self, "execution_plan_", None)
+        if execution_plan is not None:
+            return execution_plan.run(X)
+
+        with self._executor() as executor:
+            return get_inputs_to_node(self.graph,
+                        X, 
+                        self.root,
+                        method = self.method,
+                        topo_sort = self.topo_sorted_nodes,
+                        executor = executor,
+                        )
+
+    def _get_root_instance(self):
+        execution_plan = getattr(self, "execution_plan_", None)
+        if execution_plan is not None:
+            return execution_plan.root_instance
+        return self.graph.nodes[self.root]["instance"]
+
     def plot(self, ):
         plot(graph = self.graph)
 
@@ -379,21 +868,18 @@ class GraphPipeline(_BaseComposition):
             return False
 
     @available_if(_estimator_has('predict'))
-    def predict(self, X, **predict_params):
+    def predict(self, X, chunk_size=None, memory_budget=None, **predict_params):
+        if chunk_size is not None or memory_budget is not None:
+            return tpot2.utils.inference.predict_in_chunks(self, X, "predict", chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
         if self.subset_column is not None:
             subset_col = X[:,self.subset_column]
 
             if self.drop_subset_column:
                 X = np.delete(X, self.subset_column, axis=1)
 
-        this_X = get_inputs_to_node(self.graph,
-                    X, 
-                    self.root,
-                    method = self.method,
-                    topo_sort = self.topo_sorted_nodes,
-                    )
+        this_X = self._get_root_input(X)
 
-        preds = self.graph.nodes[self.root]["instance"].predict(this_X, **predict_params)
+        preds = self._get_root_instance().predict(this_X, **predict_params)
 
         if self.use_label_encoder:
             preds = self.label_encoder.inverse_transform(preds)
@@ -401,46 +887,44 @@ class GraphPipeline(_BaseComposition):
         return preds
     
     @available_if(_estimator_has('predict_proba'))
-    def predict_proba(self, X, **predict_params):
+    def predict_proba(self, X, chunk_size=None, memory_budget=None, **predict_params):
+        if chunk_size is not None or memory_budget is not None:
+            return tpot2.utils.inference.predict_in_chunks(self, X, "predict_proba", chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
         if self.subset_column is not None:
             if self.drop_subset_column:
                 X = np.delete(X, self.subset_column, axis=1)
 
-        this_X = get_inputs_to_node(self.graph,
-                    X, 
-                    self.root,
-                    method = self.method,
-                    topo_sort = self.topo_sorted_nodes,
-                    )
-        return self.graph.nodes[self.root]["instance"].predict_proba(this_X, **predict_params)
+        this_X = self._get_root_input(X)
+        return self._get_root_instance().predict_proba(this_X, **predict_params)
     
     @available_if(_estimator_has('decision_function'))
-    def decision_function(self, X, **predict_params):
+    def decision_function(self, X, chunk_size=None, memory_budget=None, **predict_params):
+        if chunk_size is not None or memory_budget is not None:
+            return tpot2.utils.inference.predict_in_chunks(self, X, "decision_function", chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
         if self.subset_column is not None:
             if self.drop_subset_column:
                 X = np.delete(X, self.subset_column, axis=1)
-        this_X = get_inputs_to_node(self.graph,
-                    X, 
-                    self.root,
-                    method = self.method,
-                    topo_sort = self.topo_sorted_nodes,
-                    )
-        return self.graph.nodes[self.root]["instance"].decision_function(this_X, **predict_params)
+        this_X = self._get_root_input(X)
+        return self._get_root_instance().decision_function(this_X, **predict_params)
     
     @available_if(_estimator_has('transform'))
-    def transform(self, X, **predict_params):
+    def transform(self, X, chunk_size=None, memory_budget=None, **predict_params):
+        if chunk_size is not None or memory_budget is not None:
+            return tpot2.utils.inference.predict_in_chunks(self, X, "transform", chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
 
         if self.subset_column is not None:
             if self.drop_subset_column:
                 X = np.delete(X, self.subset_column, axis=1)
                 
-        this_X = get_inputs_to_node(self.graph,
-                    X, 
-                    self.root,
-                    method = self.method,
-                    topo_sort = self.topo_sorted_nodes,
-                    )
-        return self.graph.nodes[self.root]["instance"].transform(this_X, **predict_params)
+        this_X = self._get_root_input(X)
+        return self._get_root_instance().transform(this_X, **predict_params)
+
+    def iter_predict(self, batches, method="predict", chunk_size=None, memory_budget=None, **predict_params):
+        '''
+        Yields the output of the given method (e.g. "predict" or "predict_proba") for each batch from an iterable of batches.
+        Batches are split into blocks of chunk_size rows, or of the size that fits in memory_budget bytes (see tpot2.utils.inference.iter_predict).
+        '''
+        return tpot2.utils.inference.iter_predict(self, batches, method=method, chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
 
     @property
     def classes_(self):
@@ -0,0 +1,313 @@
+import numbers
+import numpy as np
+import pandas as pd
+
+#status codes stored alongside the values of numeric columns
+VALID = 0
+INVALID = 1
+TIMEOUT = 2
+STATUS_NAMES = {INVALID: "INVALID", TIMEOUT: "TIMEOUT"}
+STATUS_CODES = {name: code for code, name in STATUS_NAMES.items()}
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, (float, np.floating)) and np.isnan(value))
+
+
+def _to_numeric(values):
+    '''
+    Converts a 1d object array to (floats, statuses). Returns None if any value is not a number, None/NaN, "INVALID" or "TIMEOUT".
+    '''
+    floats = np.full(len(values), np.nan)
+    statuses = np.zeros(len(values), dtype=np.int8)
+    for i, value in enumerate(values):
+        if isinstance(value, str):
+            if value not in STATUS_CODES:
+                return None
+            statuses[i] = STATUS_CODES[value]
+        elif isinstance(value, (numbers.Number, np.number, np.bool_)) and not isinstance(value, complex):
+            floats[i] = value
+        elif not _is_missing(value):
+            return None
+    return floats, statuses
+
+
+class _NumericColumn():
+    '''
+    A column of floats with a separate status code per row, so that "INVALID" and "TIMEOUT" results do not turn the column into python objects.
+    '''
+    def __init__(self, capacity):
+        self.values = np.full(capacity, np.nan)
+        self.statuses = np.zeros(capacity, dtype=np.int8)
+
+    def grow(self, capacity):
+        values = np.full(capacity, np.nan)
+        values[:len(self.values)] = self.values
+        statuses = np.zeros(capacity, dtype=np.int8)
+        statuses[:len(self.statuses)] = self.statuses
+        self.values, self.statuses = values, statuses
+
+    def get(self, ids):
+        '''
+        Returns the values as floats if none of them has a status, otherwise as objects with the status names in place of the values.
+        '''
+        values = self.values[ids]
+        statuses = self.statuses[ids]
+        if not statuses.any():
+            return values
+        values = values.astype(object)
+        for code, name in STATUS_NAMES.items():
+            values[statuses == code] = name
+        return values
+
+    def missing(self, ids):
+        return np.isnan(self.values[ids]) & (self.statuses[ids] == VALID)
+
+
+class _ObjectColumn():
+    '''
+    A column of arbitrary python objects (e.g. the Individual, Parents or Variation_Function columns). Missing values are np.nan.
+    '''
+    def __init__(self, capacity):
+        self.values = np.full(capacity, np.nan, dtype=object)
+
+    def grow(self, capacity):
+        values = np.full(capacity, np.nan, dtype=object)
+        values[:len(self.values)] = self.values
+        self.values = values
+
+    def get(self, ids):
+        return self.values[ids]
+
+    def missing(self, ids):
+        return np.array([_is_missing(value) for value in self.values[ids]], dtype=bool)
+
+
+class HistoryStore():
+    '''
+    Columnar store of the evaluation history of a Population.
+
+    Each key (the unique_id() of an individual) is assigned an integer row id when it is added. Columns are preallocated NumPy arrays
+    that double in size when full, so appends are amortized O(1) and all reads and writes are integer indexing.
+    Numeric columns (scores, budgets, timestamps, ...) are stored as floats with a separate status code per row,
+    instead of mixing the "INVALID" and "TIMEOUT" strings into object columns. Other values are stored in object columns.
+    A column is numeric as long as all of its values are numbers, missing, "INVALID" or "TIMEOUT", and is converted to an object column otherwise.
+
+    The pandas DataFrame view (to_dataframe) is built on demand and cached until the next write.
+
+    Parameters
+    ----------
+    column_names : list of str, default=None
+        Columns to create up front.
+    object_column_names : list of str, default=None
+        Columns to create up front as object columns.
+    capacity : int, default=1024
+        The initial number of rows allocated.
+    '''
+    def __init__(self, column_names=None, object_column_names=None, capacity=1024):
+        self._capacity = max(1, capacity)
+        self._n_rows = 0
+        self._ids = {}
+        self._keys = np.empty(self._capacity, dtype=object)
+        self._columns = {}
+        self._frame = None
+
+        for name in column_names or []:
+            self.add_column(name)
+        for name in object_column_names or []:
+            self.add_column(name, numeric=False)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_frame"] = None
+        return state
+
+    def __len__(self):
+        return self._n_rows
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    @property
+    def columns(self):
+        return list(self._columns.keys())
+
+    @property
+    def keys(self):
+        return self._keys[:self._n_rows]
+
+    def add_column(self, name, numeric=True):
+        '''
+        Adds an empty column if it does not exist yet.
+        '''
+        if name not in self._columns:
+            self._columns[name] = _NumericColumn(self._capacity) if numeric else _ObjectColumn(self._capacity)
+            self._frame = None
+
+    def add(self, key):
+        '''
+        Adds a row for key and returns its id. If key is already in the store, returns its existing id.
+        '''
+        if key in self._ids:
+            return self._ids[key]
+
+        if self._n_rows == self._capacity:
+            self._capacity *= 2
+            keys = np.empty(self._capacity, dtype=object)
+            keys[:self._n_rows] = self._keys[:self._n_rows]
+            self._keys = keys
+            for column in self._columns.values():
+                column.grow(self._capacity)
+
+        row_id = self._n_rows
+        self._ids[key] = row_id
+        self._keys[row_id] = key
+        self._n_rows += 1
+        self._frame = None
+        return row_id
+
+    def get_id(self, key):
+        return self._ids[key]
+
+    def get_ids(self, keys):
+        return np.array([self._ids[key] for key in keys], dtype=np.intp)
+
+    def _to_object_column(self, name):
+        column = self._columns[name]
+        if isinstance(column, _NumericColumn):
+            object_column = _ObjectColumn(self._capacity)
+            values = column.get(np.arange(self._capacity))
+            object_column.values = np.asarray(values, dtype=object)
+            self._columns[name] = object_column
+
+    def set(self, ids, name, values):
+        '''
+        Sets the values of column name for the rows in ids. values must have the same length as ids.
+        '''
+        values = np.empty(len(ids), dtype=object) if len(ids) == 0 else values
+        if name not in self._columns:
+            self.add_column(name, numeric=_to_numeric(values) is not None)
+
+        column = self._columns[name]
+        if isinstance(column, _NumericColumn):
+            converted = _to_numeric(values)
+            if converted is None:
+                self._to_object_column(name)
+                column = self._columns[name]
+            else:
+                column.values[ids], column.statuses[ids] = converted
+
+        if isinstance(column, _ObjectColumn):
+            for row_id, value in zip(ids, values):
+                column.values[row_id] = value
+        self._frame = None
+
+    def update(self, ids, column_names, data, single_value=False):
+        '''
+        Sets the column_names columns of the rows in ids, following the broadcasting of DataFrame.loc.
+
+        If column_names is a string, data is either a single value for all rows or a list with one value per row.
+        If column_names is a list, data is either a single value, a list with one value per column (for all rows)
+        or a two dimensional array of shape (len(ids), len(column_names)).
+        If single_value is True, data is stored as is (e.g. a tuple in a single cell).
+        '''
+        if isinstance(column_names, str):
+            column_names = [column_names]
+        n_rows, n_columns = len(ids), len(column_names)
+
+        if single_value:
+            values = np.empty((n_rows, n_columns), dtype=object)
+            values.fill(None)
+            for i in range(n_rows):
+                for j in range(n_columns):
+                    values[i, j] = data
+        else:
+            if isinstance(data, (pd.DataFrame, pd.Series)):
+                data = data.to_numpy()
+            if isinstance(data, (list, tuple, np.ndarray)):
+                values = np.asarray(data, dtype=object)
+                if values.ndim == 1 and n_columns == 1 and len(values) == n_rows:
+                    values = values.reshape(n_rows, 1)
+                elif values.ndim == 1:
+                    values = np.broadcast_to(values, (n_rows, n_columns))
+            else:
+                values = np.empty((n_rows, n_columns), dtype=object)
+                values.fill(data)
+            if values.shape != (n_rows, n_columns):
+                raise ValueError(f"data of shape {values.shape} can not be set to {n_rows} rows and {n_columns} columns")
+
+        for j, name in enumerate(column_names):
+            self.set(ids, name, values[:, j])
+
+    def set_column(self, name, values):
+        '''
+        Sets all the values of column name, in row order.
+        '''
+        self.set(np.arange(self._n_rows), name, list(values))
+
+    def get(self, ids, name):
+        '''
+        Returns the values of column name for the rows in ids. Numeric columns are returned as floats unless some of the rows
+        have a status, in which case they are returned as objects with "INVALID" or "TIMEOUT" in place of the values.
+        Columns that do not exist are all np.nan.
+        '''
+        if name not in self._columns:
+            return np.full(len(ids), np.nan)
+        return self._columns[name].get(ids)
+
+    def get_floats(self, ids, name):
+        '''
+        Returns the values of column name for the rows in ids as floats. Rows with a status or a non-numeric value are np.nan.
+        '''
+        column = self._columns.get(name, None)
+        if isinstance(column, _NumericColumn):
+            return column.values[ids].copy()
+        floats = np.full(len(ids), np.nan)
+        if column is not None:
+            for i, value in enumerate(column.values[ids]):
+                if isinstance(value, (numbers.Real, np.number)):
+                    floats[i] = value
+        return floats
+
+    def get_statuses(self, ids, name):
+        '''
+        Returns the status codes (VALID, INVALID or TIMEOUT) of column name for the rows in ids.
+        '''
+        column = self._columns.get(name, None)
+        if isinstance(column, _NumericColumn):
+            return column.statuses[ids]
+        statuses = np.zeros(len(ids), dtype=np.int8)
+        if column is not None:
+            values = column.values[ids]
+            for code, status_name in STATUS_NAMES.items():
+                statuses[np.array([isinstance(v, str) and v == status_name for v in values], dtype=bool)] = code
+        return statuses
+
+    def is_missing(self, ids, name):
+        '''
+        Returns a boolean array that is True for the rows in ids that have no value (and no status) in column name.
+        '''
+        if name not in self._columns:
+            return np.ones(len(ids), dtype=bool)
+        return self._columns[name].missing(ids)
+
+    def to_dataframe(self):
+        '''
+        Returns a pandas DataFrame view of the store, indexed by key. The DataFrame is cached until the next write and should be treated as read-only.
+        '''
+        if self._frame is None:
+            ids = np.arange(self._n_rows)
+            data = {name: self.get(ids, name) for name in self._columns}
+            self._frame = pd.DataFrame(data, index=pd.Index(self._keys[:self._n_rows], dtype=object), columns=list(self._columns.keys()))
+        return self._frame
+
+    @classmethod
+    def from_dataframe(cls, df):
+        '''
+        Builds a store from a DataFrame indexed by key, e.g. the evaluated_individuals of a Population saved by an older version.
+        '''
+        store = cls(capacity=max(1024, len(df)))
+        ids = np.array([store.add(key) for key in df.index], dtype=np.intp)
+        for name in df.columns:
+            store.set(ids, name, df[name].to_numpy(dtype=object))
+        return store
@@ -14,7 +14,14 @@ from .graph_utils import graph_utils
 import itertools
 import baikal
 import copy
+import hashlib
+import collections
+import inspect
+import re
+import functools
+import sklearn.metrics._scorer
 from .. import BaseIndividual
+from tpot2.utils.profiler import timed
 
 class NodeLabel():
     def __init__(self, *,
@@ -37,6 +44,9 @@ class GraphKey():
     '''
     A class that can be used as a key for a graph.
 
+    Two keys are equal if their graphs are isomorphic with the same node labels. This is decided by comparing the canonical
+    forms of the graphs (see canonical_form), so __eq__ and __hash__ are a single bytes comparison and hash.
+
     Parameters
     ----------
     graph : (nx.Graph)
@@ -50,23 +60,208 @@ class GraphKey():
 
         self.graph = graph
         self.matched_label = matched_label
-        self.node_match = partial(node_match, matched_labels=[matched_label])
-        self.key = int(nx.weisfeiler_lehman_graph_hash(self.graph, node_attr=self.matched_label),16) #hash(tuple(sorted([val for (node, val) in self.graph.degree()])))
-
+        self.canonical_form = canonical_form(self.graph, node_attr=self.matched_label)
+        self.digest = hashlib.sha256(self.canonical_form).digest()
+        self.key = int.from_bytes(self.digest[:8], "big")
+        self.persistent = is_persistent_repr(self.canonical_form.decode())
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        #keys pickled before canonical forms were added
+        if "canonical_form" not in state:
+            self.canonical_form = canonical_form(self.graph, node_attr=self.matched_label)
+            self.digest = hashlib.sha256(self.canonical_form).digest()
+            self.key = int.from_bytes(self.digest[:8], "big")
+        if "persistent" not in state:
+            self.persistent = is_persistent_repr(self.canonical_form.decode())
 
-    #If hash is different, node is definitely different
-    # https://arxiv.org/pdf/2002.06653.pdf
     def __hash__(self) -> int:
 
         return self.key
 
-    #If hash is same, use __eq__ to know if they are actually different
+    @timed("Dedupe")
     def __eq__(self, other):
-        return nx.is_isomorphic(self.graph, other.graph, node_match=self.node_match)
+        if not isinstance(other, GraphKey):
+            return NotImplemented
+        return self.key == other.key and self.canonical_form == other.canonical_form
+
+    def stable_key(self):
+        '''
+        Returns a string that identifies the graph across python sessions, so it can be stored on disk (e.g. in tpot2.utils.evaluation_cache.EvaluationCache).
+        This is the sha256 of the canonical form, so equal keys always have the same stable key.
+        Returns None if a node label holds an object that is only identified within this session (e.g. a lambda, see stable_repr).
+        '''
+        if not self.persistent:
+            return None
+        return self.digest.hex()
 
 def node_match(n1,n2, matched_labels):
     return all( [ n1[m] == n2[m] for m in matched_labels])
 
+#the default repr of objects that are only identified by their memory address
+_ADDRESS_PATTERN = re.compile(r" at 0x[0-9a-fA-F]+")
+
+def is_persistent_repr(text):
+    '''
+    Returns False if text (e.g. from stable_repr) holds a memory address, so it only identifies its objects within the current python session.
+    '''
+    return _ADDRESS_PATTERN.search(text) is None
+
+@functools.lru_cache(maxsize=None)
+def _code_digest(code):
+    #the bytecode, names and constants of the function and of the functions nested in it
+    constants = [_code_digest(c) if inspect.iscode(c) else stable_repr(c) for c in code.co_consts]
+    content = "|".join([code.co_code.hex(), stable_repr(code.co_names), stable_repr(constants)])
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+def stable_repr(value):
+    '''
+    Returns a string representation of value that is the same across python sessions.
+    Classes and functions are represented by their import path (functions also by a hash of their code, so that an edited function is not confused
+    with its earlier version), dicts are sorted by key, and numpy values are converted to python values.
+    Classes and functions that can not be imported by their path (lambdas and local definitions) are represented by their memory address instead,
+    so that different ones are never confused. Such representations are only valid within the session (see is_persistent_repr).
+    '''
+    if isinstance(value, dict):
+        items = sorted(f"{stable_repr(k)}:{stable_repr(v)}" for k,v in value.items())
+        return "{" + ",".join(items) + "}"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [stable_repr(v) for v in value]
+        if isinstance(value, (set, frozenset)):
+            items = sorted(items)
+        return type(value).__name__ + "(" + ",".join(items) + ")"
+    if inspect.isclass(value) or inspect.isfunction(value) or inspect.isbuiltin(value):
+        name = f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', repr(value))}"
+        if "<lambda>" in name or "<locals>" in name:
+            return f"<{name} at 0x{id(value):x}>"
+        if inspect.isfunction(value):
+            return f"{name}#{_code_digest(value.__code__)}"
+        return name
+    if isinstance(value, np.generic):
+        return stable_repr(value.item())
+    if isinstance(value, float) and value.is_integer():
+        return repr(int(value)) #1.0 == 1, so they are represented the same way
+    if isinstance(value, np.ndarray):
+        return f"ndarray({value.dtype},{value.shape},{stable_repr(value.tolist())})"
+    if isinstance(value, sklearn.base.BaseEstimator):
+        return stable_repr(type(value)) + stable_repr(value.get_params(deep=False))
+    if isinstance(value, sklearn.metrics._scorer._BaseScorer):
+        return stable_repr(type(value)) + stable_repr(vars(value))
+    if isinstance(value, partial):
+        return f"partial({stable_repr(value.func)},{stable_repr(value.args)},{stable_repr(value.keywords)})"
+    return repr(value)
+
+
+def canonical_form(graph, node_attr='label'):
+    '''
+    Returns a bytes serialization of a directed graph with labeled nodes that is the same for all isomorphic graphs
+    (with equal node labels, as compared by stable_repr) and different for all non-isomorphic graphs.
+
+    Nodes are ordered by a canonical labeling: node colors are refined from the node labels and the colors of
+    the successors and predecessors of each node until they are stable. If some nodes still share a color, each of them is
+    individualized in turn, and the ordering with the smallest serialization is used. Branches that are images of already
+    explored branches under automorphisms found along the way are skipped, so graphs with many identical branches stay cheap.
+    '''
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    labels = [stable_repr(graph.nodes[node][node_attr]) for node in nodes]
+    successors = [[index[s] for s in graph.successors(node)] for node in nodes]
+    predecessors = [[index[p] for p in graph.predecessors(node)] for node in nodes]
+    return _CanonicalLabeling(labels, successors, predecessors).run()
+
+
+class _CanonicalLabeling():
+    def __init__(self, labels, successors, predecessors):
+        self.labels = labels
+        self.successors = successors
+        self.predecessors = predecessors
+        self.first_leaf = None #(form, positions, path)
+        self.best_leaf = None #(form, positions)
+        self.automorphisms = []
+
+    def run(self):
+        if len(self.labels) == 0:
+            return b""
+        sorted_labels = sorted(set(self.labels))
+        rank = {label: i for i, label in enumerate(sorted_labels)}
+        self._search([rank[label] for label in self.labels], [])
+        return self.best_leaf[0]
+
+    def _refine(self, colors):
+        n_colors = len(set(colors))
+        while True:
+            signatures = [(colors[i], tuple(sorted(colors[s] for s in self.successors[i])), tuple(sorted(colors[p] for p in self.predecessors[i])))
+                          for i in range(len(colors))]
+            rank = {signature: i for i, signature in enumerate(sorted(set(signatures)))}
+            colors = [rank[signature] for signature in signatures]
+            if len(rank) == n_colors:
+                return colors
+            n_colors = len(rank)
+
+    def _serialize(self, positions):
+        order = sorted(range(len(positions)), key=lambda i: positions[i])
+        edges = sorted((positions[u], positions[v]) for u in range(len(positions)) for v in self.successors[u])
+        return ("\n".join(self.labels[i] for i in order) + "\n#" + ";".join(f"{u}>{v}" for u, v in edges)).encode()
+
+    def _orbit_representatives(self, cell, path):
+        #orbits of the cell under the automorphisms found so far that fix every node of the path
+        parent = {v: v for v in cell}
+        def find(v):
+            while parent[v] != v:
+                v = parent[v]
+            return v
+        for automorphism in self.automorphisms:
+            if all(automorphism[v] == v for v in path):
+                for v in cell:
+                    if automorphism[v] in parent:
+                        parent[find(v)] = find(automorphism[v])
+        return parent, find
+
+    def _leaf(self, positions, path):
+        form = self._serialize(positions)
+        if self.first_leaf is None:
+            self.first_leaf = (form, positions, path)
+            self.best_leaf = (form, positions)
+            return None
+
+        for reference_form, reference_positions in [self.first_leaf[:2], self.best_leaf]:
+            if form == reference_form:
+                node_at = {position: v for v, position in enumerate(reference_positions)}
+                self.automorphisms.append([node_at[position] for position in positions])
+                if reference_form is self.first_leaf[0]:
+                    #this subtree is an image of the subtree of the first path, so go back to where the paths diverged
+                    first_path = self.first_leaf[2]
+                    level = 0
+                    while level < min(len(path), len(first_path)) and path[level] == first_path[level]:
+                        level += 1
+                    return level
+                return None
+
+        if form < self.best_leaf[0]:
+            self.best_leaf = (form, positions)
+        return None
+
+    def _search(self, colors, path):
+        colors = self._refine(colors)
+        counts = collections.Counter(colors)
+        if len(counts) == len(colors):
+            return self._leaf(colors, path)
+
+        target = min(color for color, count in counts.items() if count > 1)
+        cell = [v for v in range(len(colors)) if colors[v] == target]
+        explored = []
+        for v in cell:
+            parent, find = self._orbit_representatives(cell, path)
+            if any(find(v) == find(u) for u in explored):
+                continue
+            explored.append(v)
+            individualized = [2*c+1 for c in colors]
+            individualized[v] -= 1
+            level = self._search(individualized, path + [v])
+            if level is not None and level < len(path):
+                return level
+        return None
+
 
 class GraphIndividual(BaseIndividual):
     '''
@@ -1080,20 +1275,20 @@ class GraphIndividual(BaseIndividual):
 
     def unique_id(self) -> GraphKey:
         if self.key is None:
-            g = self.flatten_pipeline()
-            for n in g.nodes:
-                if "subset_values" in g.nodes[n]:
-                    g.nodes[n]['label'] = {n.method_class: n.hyperparameters, "subset_values":g.nodes[n]["subset_values"]}
-                else:
-                    g.nodes[n]['label'] = {n.method_class: n.hyperparameters}
-                
-                g.nodes[n]['method_class'] = n.method_class #TODO making this transformation doesn't feel very clean? 
-                g.nodes[n]['hyperparameters'] = n.hyperparameters
+            self.key = self._make_unique_id()
+        return self.key
 
-            g = nx.convert_node_labels_to_integers(g)
-            self.key = GraphKey(graph=g)
+    @timed("Dedupe")
+    def _make_unique_id(self):
+        g = self.flatten_pipeline()
+        for n in g.nodes:
+            if "subset_values" in g.nodes[n]:
+                g.nodes[n]['label'] = {n.method_class: n.hyperparameters, "subset_values":g.nodes[n]["subset_values"]}
+            else:
+                g.nodes[n]['label'] = {n.method_class: n.hyperparameters}
 
-        return self.key
+        g = nx.convert_node_labels_to_integers(g)
+        return GraphKey(graph=g)
 
     def full_node_list(self):
         node_list = list(self.graph.nodes)
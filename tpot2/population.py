@@ -11,6 +11,9 @@ from joblib import Parallel, delayed
 import copy
 import pickle
 import dask
+from tpot2.utils.profiler import timed
+from tpot2 import history_store
+from tpot2.history_store import HistoryStore
 
 def mutate(individual):
     if isinstance(individual, collections.abc.Iterable):
@@ -64,9 +67,11 @@ class Population():
     ----------
     population : {list of BaseIndividuals}
         The current population of individuals. Contains the live instances of BaseIndividuals.
-    evaluated_individuals : {dict}
-        A dictionary of dictionaries. The keys are the unique_id() or self of each BaseIndividual.
-        Can be thought of as a table with the unique_id() as the row index and the inner dictionary keys as the columns.
+    evaluated_individuals : {pandas.DataFrame}
+        A table with the unique_id() (or self) of each BaseIndividual as the row index and the evaluation results as the columns.
+        This is a read-only view of history that is rebuilt on demand after it changes; use update_column to write to it.
+    history : {HistoryStore}
+        The columnar store that holds the data of evaluated_individuals.
     '''
     def __init__(   self,
                     column_names: typing.List[str] = None,
@@ -74,23 +79,40 @@ class Population():
                     callback=None,
                     ) -> None:
 
-        if column_names is not None:
-            
-            column_names = column_names+["Parents", "Variation_Function"]
-        else:
-            column_names = ["Parents", "Variation_Function"]
-        self.evaluated_individuals = pd.DataFrame(columns=column_names)
-        self.evaluated_individuals["Parents"] = self.evaluated_individuals["Parents"].astype('object')
+        if column_names is None:
+            column_names = []
+        self.history = HistoryStore(column_names=column_names, object_column_names=["Parents", "Variation_Function", "Individual"])
         self.use_unique_id = True #Todo clean this up. perhaps pull unique_id() out of baseestimator and have it be supplied as a function
         self.n_jobs = n_jobs
         self.callback=callback
         self.population = []
 
+    def __setstate__(self, state):
+        #populations saved before the HistoryStore was added keep their history in an evaluated_individuals DataFrame
+        if "evaluated_individuals" in state:
+            state["history"] = HistoryStore.from_dataframe(state.pop("evaluated_individuals"))
+        self.__dict__.update(state)
+
+    @property
+    def evaluated_individuals(self):
+        return self.history.to_dataframe()
+
+    @evaluated_individuals.setter
+    def evaluated_individuals(self, df):
+        self.history = HistoryStore.from_dataframe(df)
+
+    def _get_key(self, individual):
+        return individual.unique_id() if self.use_unique_id else individual
 
+    def _get_ids(self, individual):
+        if isinstance(individual, collections.abc.Iterable):
+            return self.history.get_ids([self._get_key(ind) for ind in individual])
+        return self.history.get_ids([self._get_key(individual)])
 
     #remove individuals that either do not have a column_name value or a nan in that value
     #TODO take into account when the value is not a list/tuple?
     #TODO make invalid a global variable?
+    @timed("Bookkeeping")
     def remove_invalid_from_population(self, column_names, invalid_value = "INVALID"):
         '''
         Remove individuals from the live population if either do not have a value in the column_name column or if the value contains np.nan.
@@ -106,9 +128,20 @@ class Population():
         '''
         if isinstance(column_names, str): #TODO check this
             column_names = [column_names]
-        new_pop = []
-        is_valid = lambda ind: ind.unique_id() not in self.evaluated_individuals.index or invalid_value not in self.evaluated_individuals.loc[ind.unique_id(),column_names].to_list()
-        self.population = [ind for ind in self.population if is_valid(ind)]
+        keys = [self._get_key(ind) for ind in self.population]
+        in_history = np.array([key in self.history for key in keys], dtype=bool)
+        ids = self.history.get_ids([key for key, found in zip(keys, in_history) if found])
+
+        invalid = np.zeros(len(ids), dtype=bool)
+        for column_name in column_names:
+            if invalid_value in history_store.STATUS_CODES:
+                invalid |= self.history.get_statuses(ids, column_name) == history_store.STATUS_CODES[invalid_value]
+            else:
+                invalid |= np.array([isinstance(value, type(invalid_value)) and value == invalid_value for value in self.history.get(ids, column_name)], dtype=bool)
+
+        is_valid = np.ones(len(keys), dtype=bool)
+        is_valid[np.flatnonzero(in_history)[invalid]] = False
+        self.population = [ind for ind, valid in zip(self.population, is_valid) if valid]
 
         
 
@@ -117,6 +150,7 @@ class Population():
     # returns a list of individuals added to the live population  
     #TODO make keep repeats allow for previously evaluated individuals,
     #but make sure that the live population only includes one of each, no repeats
+    @timed("Bookkeeping")
     def add_to_population(self, individuals: typing.List[BaseIndividual], keep_repeats=False, mutate_until_unique=True):
         '''
         Add individuals to the live population. Add individuals to the evaluated_individuals if they are not already there.
@@ -137,9 +171,8 @@ class Population():
         for individual in individuals:
             key = individual.unique_id()
 
-            if key not in self.evaluated_individuals.index: #If its new, we always add it
-                self.evaluated_individuals.loc[key] = np.nan
-                self.evaluated_individuals.loc[key,"Individual"] = copy.deepcopy(individual)
+            if key not in self.history: #If its new, we always add it
+                self.history.set([self.history.add(key)], "Individual", [copy.deepcopy(individual)])
                 self.population.append(individual)
                 new_individuals.append(individual)
 
@@ -152,9 +185,8 @@ class Population():
                         individual = copy.deepcopy(individual)
                         individual.mutate()
                         key = individual.unique_id()
-                        if key not in self.evaluated_individuals.index:
-                            self.evaluated_individuals.loc[key] = np.nan
-                            self.evaluated_individuals.loc[key,"Individual"] = copy.deepcopy(individual)
+                        if key not in self.history:
+                            self.history.set([self.history.add(key)], "Individual", [copy.deepcopy(individual)])
                             self.population.append(individual)
                             new_individuals.append(individual)
                             break
@@ -162,66 +194,75 @@ class Population():
         return new_individuals
 
 
+    @timed("Bookkeeping")
     def update_column(self, individual, column_names, data):
         '''
         Update the column_name column in the evaluated_individuals with the data.
         If the data is a list, it must be the same length as the evaluated_individuals.
         If the data is a single value, it will be applied to all individuals in the evaluated_individuals.
+        A single individual with a single column name is set to data as is, even if data is a list or tuple (e.g. the Parents column).
         '''
-        if isinstance(individual, collections.abc.Iterable):
-            if self.use_unique_id:
-                key = [ind.unique_id() for ind in individual]
-            else:
-                key = individual
-        else:
-            if self.use_unique_id:
-                key = individual.unique_id()
-            else:
-                key = individual
-
-        self.evaluated_individuals.loc[key,column_names] = data
+        single_value = isinstance(column_names, str) and not isinstance(individual, collections.abc.Iterable)
+        self.history.update(self._get_ids(individual), column_names, data, single_value=single_value)
 
     
+    @timed("Bookkeeping")
     def get_column(self, individual, column_names=None, to_numpy=True):
         '''
-        Update the column_name column in the evaluated_individuals with the data.
-        If the data is a list, it must be the same length as the evaluated_individuals.
-        If the data is a single value, it will be applied to all individuals in the evaluated_individuals.
+        Returns the values of the column_names columns of the evaluated_individuals for the given individual(s).
+        If to_numpy is True, returns a numpy array (one dimensional if column_names is a string), otherwise a DataFrame indexed by unique_id().
+        If column_names is None, all columns are returned.
         '''
-        if isinstance(individual, collections.abc.Iterable):
-            if self.use_unique_id:
-                key = [ind.unique_id() for ind in individual]
-            else:
-                key = individual
-        else:
-            if self.use_unique_id:
-                key = individual.unique_id()
-            else:
-                key = individual
+        ids = self._get_ids(individual)
+        single_column = isinstance(column_names, str)
+        if column_names is None:
+            column_names = self.history.columns
+        elif single_column:
+            column_names = [column_names]
+
+        columns = [self.history.get(ids, name) for name in column_names]
+        if not to_numpy:
+            return pd.DataFrame(dict(zip(column_names, columns)), index=pd.Index(self.history.keys[ids], dtype=object), columns=column_names)
+        if single_column:
+            return columns[0]
+        if len(columns) == 0:
+            return np.empty((len(ids), 0))
+        return np.column_stack(columns)
+
+
+    def is_unevaluated(self, individual_list, column_names, budget=None):
+        '''
+        Returns a boolean array that is True for the individuals that are missing a value in any of the column_names columns,
+        or that were evaluated with a lower Budget than budget (if budget is not None).
+        '''
+        ids = self._get_ids(individual_list)
+        unevaluated = np.zeros(len(ids), dtype=bool)
+        for name in column_names:
+            unevaluated |= self.history.is_missing(ids, name)
+        if budget is not None:
+            unevaluated |= self.history.get_floats(ids, "Budget") < budget
+        return unevaluated
+
 
-        if column_names is not None:
-            slice = self.evaluated_individuals.loc[key,column_names]
-        else:
-            slice = self.evaluated_individuals.loc[key]
-        if to_numpy:
-            slice.reset_index(drop=True, inplace=True)
-            return slice.to_numpy()
-        else:
-            return slice
+    def count_evaluated(self, column_names):
+        '''
+        Returns the number of individuals in evaluated_individuals that have a value (or "INVALID"/"TIMEOUT") in all of the column_names columns.
+        '''
+        ids = np.arange(len(self.history))
+        evaluated = np.ones(len(ids), dtype=bool)
+        for name in column_names:
+            evaluated &= ~self.history.is_missing(ids, name)
+        return int(np.count_nonzero(evaluated))
 
 
     #returns the individuals without a 'column' as a key in geneology
     #TODO make sure not to get repeats in this list even if repeats are in the "live" population
-    def get_unevaluated_individuals(self, column_names, individual_list=None):
+    def get_unevaluated_individuals(self, column_names, individual_list=None, budget=None):
         if individual_list is None:
             individual_list = self.population
-        
-        if self.use_unique_id:
-            unevaluated_filter = lambda individual: individual.unique_id() not in self.evaluated_individuals.index or any(self.evaluated_individuals.loc[individual.unique_id(), column_names].isna())
-        else:
-            unevaluated_filter = lambda individual: individual not in self.evaluated_individuals.index or any(self.evaluated_individuals.loc[individual.unique_id(), column_names].isna())
-        
-        return [individual for individual in individual_list if unevaluated_filter(individual)]    
+
+        unevaluated = self.is_unevaluated(individual_list, column_names, budget=budget)
+        return [individual for individual, is_unevaluated in zip(individual_list, unevaluated) if is_unevaluated]
 
     # def get_valid_evaluated_individuals_df(self, column_names_to_check, invalid_values=["TIMEOUT","INVALID"]):
     #     '''
@@ -230,6 +271,7 @@ class Population():
     #     return self.evaluated_individuals[~self.evaluated_individuals[column_names_to_check].isin(invalid_values).any(axis=1)]
 
     #the live population empied and is set to new_population
+    @timed("Bookkeeping")
     def set_population(self,  new_population, keep_repeats=True):
         '''
         sets population to new population
@@ -239,6 +281,7 @@ class Population():
         self.add_to_population(new_population, keep_repeats=keep_repeats)
 
     #TODO should we just generate one offspring per crossover? 
+    @timed("Variation")
     def create_offspring(self, parents_list, var_op_list, add_to_population=True, keep_repeats=False, mutate_until_unique=True, n_jobs=1):
         '''
         parents_list: a list of lists of parents. 
@@ -275,15 +318,13 @@ class Population():
                 if len(added) > 0:
                     for new_child in added:
                         parent_keys = [parent.unique_id() for parent in parents]
-                        if not pd.api.types.is_object_dtype(self.evaluated_individuals["Parents"]): #TODO Is there a cleaner way of doing this? Not required for some python environments?
-                            self.evaluated_individuals["Parents"] = self.evaluated_individuals["Parents"].astype('object')
-                        self.evaluated_individuals.at[new_child.unique_id(),"Parents"] = tuple(parent_keys)
+                        self.update_column(new_child, column_names="Parents", data=tuple(parent_keys))
                         
                         #if var_op is a function
                         if hasattr(var_op, '__call__'):
-                            self.evaluated_individuals.at[new_child.unique_id(),"Variation_Function"] = var_op.__name__
+                            self.update_column(new_child, column_names="Variation_Function", data=var_op.__name__)
                         else:
-                            self.evaluated_individuals.at[new_child.unique_id(),"Variation_Function"] = var_op
+                            self.update_column(new_child, column_names="Variation_Function", data=var_op)
                         
                         
                         new_offspring.append(new_child)
@@ -1,24 +1,78 @@
 import numpy as np
-import random
 
 def lexicase_selection(scores, k, n_parents=1,):
-    """Select the best individual according to Lexicase Selection, *k* times. 
+    """Select the best individual according to Lexicase Selection, *k* times.
     The returned list contains the indices of the chosen *individuals*.
     :param scores: The score matrix, where rows the individulas and the columns are the corresponds to scores on different objectives.
     :returns: A list of indices of selected individuals.
-    This function uses the :func:`~random.choice` function from the python base
-    :mod:`random` module.
+    This function uses batched_lexicase_selection, which draws its random numbers from :mod:`numpy.random`.
     """
-    chosen =[]
-    for i in range(k*n_parents):
-        candidates = list(range(len(scores)))
-        cases = list(range(len(scores[0])))
-        random.shuffle(cases)
-        
-        while len(cases) > 0 and len(candidates) > 1:
-            best_val_for_case = max(scores[candidates,cases[0]])
-            candidates = [x for x in candidates if scores[x, cases[0]] == best_val_for_case]
-            cases.pop(0)
-        chosen.append(random.choice(candidates))
-
-    return np.reshape(chosen, (k, n_parents))
\ No newline at end of file
+    return batched_lexicase_selection(scores, k, n_parents=n_parents, epsilon=0)
+
+
+def epsilon_lexicase_selection(scores, k, n_parents=1, epsilon="auto"):
+    """Select individuals according to epsilon-lexicase selection, *k* times.
+    On each case, the candidates within epsilon of the best candidate survive, which suits continuous scores (e.g. per-fold or per-sample errors).
+    :param scores: The score matrix, where rows the individulas and the columns are the corresponds to scores on different cases.
+    :param epsilon: A number, an array with one value per case, or "auto" to use the median absolute deviation of each case over all individuals.
+    :returns: An array of shape (k, n_parents) with the indices of the selected individuals.
+    """
+    return batched_lexicase_selection(scores, k, n_parents=n_parents, epsilon=epsilon)
+
+
+def batched_lexicase_selection(scores, k, n_parents=1, epsilon=0, batch_size=None):
+    """Lexicase and epsilon-lexicase selection for many selections at once.
+    The shuffled case orders of all k*n_parents selections are drawn at once, and the candidates of all selections are filtered
+    case by case with boolean masks. Selections stop being filtered once they have a single candidate left.
+    bigger is better
+    :param scores: The score matrix, where rows the individulas and the columns are the corresponds to scores on different cases.
+    :param k: The number of selections.
+    :param n_parents: The number of individuals per selection.
+    :param epsilon: Candidates within epsilon of the best candidate on a case survive. A number, an array with one value per case,
+        or "auto" to use the median absolute deviation of each case over all individuals. 0 is plain lexicase selection.
+    :param batch_size: The number of selections filtered together. If None, chosen so that the masks have about 4 million entries.
+    :returns: An array of shape (k, n_parents) with the indices of the selected individuals.
+    """
+    scores = np.asarray(scores, dtype=float)
+    if scores.ndim == 1:
+        scores = scores.reshape(-1, 1)
+    n_individuals, n_cases = scores.shape
+
+    if isinstance(epsilon, str) and epsilon == "auto":
+        epsilon = np.nanmedian(np.abs(scores - np.nanmedian(scores, axis=0)), axis=0)
+        epsilon = np.nan_to_num(epsilon)
+    epsilon = np.broadcast_to(np.asarray(epsilon, dtype=float), (n_cases,))
+
+    n_selections = k*n_parents
+    if batch_size is None:
+        batch_size = max(1, 2**22 // max(1, n_individuals))
+
+    chosen = np.empty(n_selections, dtype=int)
+    for start in range(0, n_selections, batch_size):
+        n_batch = min(batch_size, n_selections-start)
+        case_orders = np.argsort(np.random.random((n_batch, n_cases)), axis=1)
+        candidates = np.ones((n_batch, n_individuals), dtype=bool)
+
+        #selections that still have more than one candidate
+        active = np.arange(n_batch) if n_individuals > 1 else np.zeros(0, dtype=int)
+        for step in range(n_cases):
+            if len(active) == 0:
+                break
+            cases = case_orders[active, step]
+            case_scores = scores[:, cases].T
+            active_candidates = candidates[active]
+
+            best = np.where(active_candidates & ~np.isnan(case_scores), case_scores, -np.inf).max(axis=1)
+            survivors = active_candidates & (case_scores >= (best - epsilon[cases])[:, None])
+            #cases without a valid score for any candidate do not filter
+            no_best = np.isneginf(best)
+            survivors[no_best] = active_candidates[no_best]
+
+            candidates[active] = survivors
+            active = active[survivors.sum(axis=1) > 1]
+
+        #pick uniformly among the remaining candidates of each selection
+        picks = (np.random.random(n_batch) * candidates.sum(axis=1)).astype(int)
+        chosen[start:start+n_batch] = np.argmax(candidates.cumsum(axis=1) > picks[:, None], axis=1)
+
+    return np.reshape(chosen, (k, n_parents))
@@ -8,49 +8,94 @@ def nondominated_sorting(matrix):
     """
     Returns the indexes of the matrix 
     bigger is better
-    """
-    # Initialize the front list and the rank list
-
-    # Initialize the current front
-    fronts = {0:set()}
-
-    # Initialize the list of dominated points
-    dominated = [set() for _ in range(len(matrix))] #si the set of solutions which solution i dominates
 
-    # Initialize the list of points that dominate the current point
-    dominating = [0 for _ in range(len(matrix))] #ni the number of solutions that denominate solution i
-
-    
-    # Iterate over all points
-    for p, p_scores in enumerate(matrix):
-        # Iterate over all other points
-        for q, q_scores in enumerate(matrix):
-            # If the current point dominates the other point, increment the count of points dominated by the current point
-            if dominates(p_scores, q_scores):
-                dominated[p].add(q)
-            # If the current point is dominated by the other point, add it to the list of dominated points
-            elif dominates(q_scores, p_scores):
-                dominating[p] += 1
-        
-        if dominating[p] == 0:
-            fronts[0].add(p)
-
-    i=0
+    Returns a list of sets, one per front, with the row indexes in each front (see nondominated_ranks).
+    """
+    ranks = nondominated_ranks(matrix)
+    if len(ranks) == 0:
+        return []
 
-    # Iterate until all points have been added to a front
-    while len(fronts[i]) > 0:
-        H = set()
-        for p in fronts[i]:
-            for q in dominated[p]:
-                dominating[q] -= 1
-                if dominating[q] == 0:
-                    H.add(q)
+    order = np.argsort(ranks, kind="stable")
+    boundaries = np.flatnonzero(np.diff(ranks[order])) + 1
+    return [set(front.tolist()) for front in np.split(order, boundaries)]
 
-        i += 1
-        fronts[i] = H
 
+def nondominated_ranks(matrix):
+    """
+    Returns an array with the index of the front of each row of the matrix (0 for the nondominated rows).
+    bigger is better
 
-    return [fronts[j] for j in range(i)]
+    With two objectives (and no nan values), the fronts are found with an O(N log N) sweep.
+    Otherwise the domination matrix is computed with numpy in blocks of rows and the fronts are peeled off one at a time.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if len(matrix) == 0:
+        return np.zeros(0, dtype=int)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(-1, 1)
+
+    if matrix.shape[1] == 2 and not np.isnan(matrix).any():
+        return _nondominated_ranks_2d(matrix)
+    return _nondominated_ranks_nd(matrix)
+
+
+def _nondominated_ranks_2d(matrix):
+    #sort by the first objective then the second, best first. A point can only be dominated by points before it.
+    order = np.lexsort((-matrix[:, 1], -matrix[:, 0]))
+    ranks = np.zeros(len(matrix), dtype=int)
+    #best value of the second objective in each front so far. It is non-increasing from one front to the next,
+    #so the front of a point is the first front whose best second objective is worse than the point's.
+    front_best = []
+    previous = None
+    for i in order:
+        x, y = matrix[i]
+        if previous is not None and x == matrix[previous, 0] and y == matrix[previous, 1]:
+            ranks[i] = ranks[previous] #equal points do not dominate each other
+        else:
+            lo, hi = 0, len(front_best)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if front_best[mid] >= y:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == len(front_best):
+                front_best.append(y)
+            else:
+                front_best[lo] = y
+            ranks[i] = lo
+        previous = i
+    return ranks
+
+
+def _nondominated_ranks_nd(matrix, block_size=None):
+    n, n_objectives = matrix.shape
+    if block_size is None:
+        block_size = max(1, 2**24 // n)
+
+    #dominated_by[p, q] is True if p dominates q
+    dominated_by = np.empty((n, n), dtype=bool)
+    for start in range(0, n, block_size):
+        block = matrix[start:start+block_size]
+        all_greater_equal = np.ones((len(block), n), dtype=bool)
+        any_greater = np.zeros((len(block), n), dtype=bool)
+        for objective_i in range(n_objectives):
+            all_greater_equal &= block[:, objective_i, None] >= matrix[None, :, objective_i]
+            any_greater |= block[:, objective_i, None] > matrix[None, :, objective_i]
+        dominated_by[start:start+block_size] = all_greater_equal & any_greater
+
+    n_dominating = np.count_nonzero(dominated_by, axis=0)
+    ranks = np.full(n, -1, dtype=int)
+    front = np.flatnonzero(n_dominating == 0)
+    rank = 0
+    while len(front) > 0:
+        ranks[front] = rank
+        n_dominating -= np.count_nonzero(dominated_by[front], axis=0)
+        n_dominating[front] = -1
+        front = np.flatnonzero(n_dominating == 0)
+        rank += 1
+
+    return ranks
 
 
 def dominates(list1, list2):
@@ -62,25 +107,31 @@ def dominates(list1, list2):
 #adapted from deap + gtp
 #bigger is better
 def crowding_distance(matrix):
-    matrix = np.array(matrix)
+    """
+    Returns an array with the crowding distance of each row of the matrix (the points of one front).
+    The points at the extremes of each objective have an infinite distance.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if len(matrix) == 0:
+        return np.zeros(0)
     # Initialize the crowding distance for each point to zero
-    crowding_distances = [0 for _ in range(len(matrix))]
+    crowding_distances = np.zeros(len(matrix))
     
     # Iterate over each objective
     for objective_i in range(matrix.shape[1]):
         # Sort the points according to the current objective
         sorted_i = matrix[:, objective_i].argsort()
+        sorted_values = matrix[sorted_i, objective_i]
         
         # Set the crowding distance of the first and last points to infinity
         crowding_distances[sorted_i[0]] = float("inf")
         crowding_distances[sorted_i[-1]] = float("inf")
         
-        if matrix[sorted_i[0]][objective_i] == matrix[sorted_i[-1]][objective_i]: # https://github.com/DEAP/deap/blob/f2a570567fa3dce156d7cfb0c50bc72f133258a1/deap/tools/emo.py#L135
+        if sorted_values[0] == sorted_values[-1]: # https://github.com/DEAP/deap/blob/f2a570567fa3dce156d7cfb0c50bc72f133258a1/deap/tools/emo.py#L135
             continue
 
-        norm = matrix.shape[1] * float(matrix[sorted_i[0]][objective_i] - matrix[sorted_i[-1]][objective_i])
-        for prev, cur, following in zip(sorted_i[:-2], sorted_i[1:-1], sorted_i[2:]):
-            crowding_distances[cur] += (matrix[following][objective_i] - matrix[prev][objective_i]) / norm
+        norm = matrix.shape[1] * float(sorted_values[0] - sorted_values[-1])
+        crowding_distances[sorted_i[1:-1]] += (sorted_values[2:] - sorted_values[:-2]) / norm
 
 
     return crowding_distances
@@ -89,25 +140,28 @@ def crowding_distance(matrix):
 
 
 def survival_select_NSGA2(scores, k,):
-
-    pareto_fronts = nondominated_sorting(scores)
-
-    # chosen = list(itertools.chain.from_iterable(fronts))
-    # if len(chosen) >= k:
-    #     return chosen[0:k]
-
-    chosen = []
-    current_front_number = 0
-    while len(chosen) < k and current_front_number < len(pareto_fronts):
-
-        current_front = np.array(list(pareto_fronts[current_front_number]))
-        front_scores = [scores[i] for i in current_front]
-        crowding_distances = crowding_distance(front_scores)
-
+    """
+    Returns the indexes of the k rows of scores chosen by NSGA-II survival selection: whole fronts in order of rank,
+    and the points with the largest crowding distance from the first front that does not fit.
+    """
+    ranks = nondominated_ranks(scores)
+    if len(ranks) == 0:
+        return []
+    scores = np.asarray(scores, dtype=float)
+
+    #the rows of each front, in index order
+    order = np.argsort(ranks, kind="stable")
+    front_ends = np.cumsum(np.bincount(ranks))
+
+    #fronts that fit entirely into k are chosen without computing their crowding distances
+    n_full_fronts = np.searchsorted(front_ends, k, side="right")
+    n_chosen = front_ends[n_full_fronts-1] if n_full_fronts > 0 else 0
+    chosen = order[:n_chosen]
+
+    if n_chosen < k and n_full_fronts < len(front_ends):
+        current_front = order[n_chosen:front_ends[n_full_fronts]]
+        crowding_distances = crowding_distance(scores[current_front])
         sorted_indeces = current_front[np.argsort(crowding_distances)[::-1]]
-
-        chosen.extend(sorted_indeces[0:(k-len(chosen))])
-
-        current_front_number += 1
+        chosen = np.concatenate([chosen, sorted_indeces[0:(k-n_chosen)]])
     
-    return chosen
\ No newline at end of file
+    return chosen.tolist()
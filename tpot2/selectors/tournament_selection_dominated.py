@@ -1,7 +1,7 @@
 import numpy as np
 import random
 
-from.nsgaii import nondominated_sorting, crowding_distance, dominates
+from.nsgaii import nondominated_ranks, crowding_distance, dominates
 
 #based on deap
 def tournament_selection_dominated(scores, k, n_parents=2):
@@ -15,24 +15,14 @@ def tournament_selection_dominated(scores, k, n_parents=2):
     This function uses the :func:`~random.choice` function from the python base
     :mod:`random` module.
     """
-    pareto_fronts = nondominated_sorting(scores)
+    ranks = nondominated_ranks(scores)
+    score_matrix = np.asarray(scores, dtype=float)
 
-    # chosen = list(itertools.chain.from_iterable(fronts))
-    # if len(chosen) >= k:
-    #     return chosen[0:k]
-
-    crowding_dict = {}
-    chosen = []
-    current_front_number = 0
-    while current_front_number < len(pareto_fronts):
-
-        current_front = np.array(list(pareto_fronts[current_front_number]))
-        front_scores = [scores[i] for i in current_front]
-        crowding_distances = crowding_distance(front_scores)
-        for i, crowding in zip(current_front,crowding_distances):
-            crowding_dict[i] = crowding
-
-        current_front_number += 1
+    #crowding distance of each individual within its front
+    crowding = np.zeros(len(ranks))
+    order = np.argsort(ranks, kind="stable")
+    for current_front in np.split(order, np.cumsum(np.bincount(ranks))[:-1]):
+        crowding[current_front] = crowding_distance(score_matrix[current_front])
 
 
     chosen = []
@@ -45,9 +35,9 @@ def tournament_selection_dominated(scores, k, n_parents=2):
         elif dominates(scores[asp2], scores[asp1]):
             chosen.append(asp2)
         
-        elif crowding_dict[asp1] > crowding_dict[asp2]:
+        elif crowding[asp1] > crowding[asp2]:
             chosen.append(asp1)
-        elif crowding_dict[asp1] < crowding_dict[asp2]:
+        elif crowding[asp1] < crowding[asp2]:
             chosen.append(asp2)
 
         else:
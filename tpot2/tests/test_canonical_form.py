@@ -0,0 +1,68 @@
+import random
+import networkx as nx
+from tpot2.individual_representations.graph_pipeline_individual import canonical_form, GraphKey
+
+
+def random_dag(n_nodes, labels, rng):
+    graph = nx.DiGraph()
+    for i in range(n_nodes):
+        graph.add_node(i, label=rng.choice(labels))
+    for i in range(n_nodes):
+        for j in range(i+1, n_nodes):
+            if rng.random() < 0.3:
+                graph.add_edge(i, j)
+    return graph
+
+
+def relabeled(graph, rng):
+    nodes = list(graph.nodes)
+    mapping = dict(zip(nodes, rng.sample(nodes, len(nodes))))
+    return nx.relabel_nodes(graph, mapping)
+
+
+def test_canonical_form_matches_isomorphism():
+    rng = random.Random(0)
+    node_match = lambda n1, n2: n1["label"] == n2["label"]
+    for _ in range(300):
+        n_nodes = rng.randint(1, 7)
+        labels = [{"A": {"x": 1}}, {"A": {"x": 1.0}}, {"B": {}}][:rng.randint(1, 3)]
+        graph = random_dag(n_nodes, labels, rng)
+        other = random_dag(n_nodes, labels, rng)
+
+        assert canonical_form(graph) == canonical_form(relabeled(graph, rng))
+        assert (canonical_form(graph) == canonical_form(other)) == nx.is_isomorphic(graph, other, node_match=node_match)
+
+
+def test_graph_key_identical_branches():
+    graph = nx.DiGraph()
+    graph.add_node("root", label={"root": {}})
+    for i in range(15):
+        graph.add_edge("root", ("inner", i))
+        graph.add_edge(("inner", i), ("leaf", i))
+        graph.nodes[("inner", i)]["label"] = {"inner": {"C": 1.0}}
+        graph.nodes[("leaf", i)]["label"] = {"leaf": {}}
+
+    key = GraphKey(nx.convert_node_labels_to_integers(graph))
+    other = GraphKey(relabeled(graph, random.Random(1)))
+    assert key == other
+    assert hash(key) == hash(other)
+    assert key.stable_key() == other.stable_key()
+
+    graph.nodes[("leaf", 3)]["label"] = {"leaf": {"k": 2}}
+    assert GraphKey(graph) != key
+
+
+def test_graph_key_local_callables():
+    from sklearn.preprocessing import FunctionTransformer
+    def make_graph(func):
+        graph = nx.DiGraph()
+        graph.add_node("root", label={FunctionTransformer: {"func": func}})
+        return graph
+
+    funcs = [lambda X: X, lambda X: X + 1]
+    #different lambdas are different pipelines, the same lambda is the same pipeline
+    assert GraphKey(make_graph(funcs[0])) != GraphKey(make_graph(funcs[1]))
+    assert GraphKey(make_graph(funcs[0])) == GraphKey(make_graph(funcs[0]))
+    #but they can not be identified in another session
+    assert GraphKey(make_graph(funcs[0])).stable_key() is None
+    assert GraphKey(make_graph(random.random)).stable_key() is not None
@@ -0,0 +1,225 @@
+import os
+import time
+import functools
+import pytest
+import numpy as np
+import tpot2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_isolated_evaluation_is_killed_on_timeout():
+    def sleeps(ind):
+        time.sleep(30)
+        return 1
+
+    start = time.time()
+    assert tpot2.utils.eval_utils.objective_nan_wrapper(0, sleeps, timeout=1, isolate=True) == ["TIMEOUT"]
+    assert time.time() - start < 10
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_isolated_evaluation_results():
+    def fails(ind):
+        raise ValueError()
+
+    assert list(tpot2.utils.eval_utils.objective_nan_wrapper(2, lambda ind: ind*2, timeout=5, isolate=True)) == [4]
+    assert tpot2.utils.eval_utils.objective_nan_wrapper(2, fails, timeout=5, isolate=True) == ["INVALID"]
+
+
+@pytest.mark.parametrize("isolate", [False, True])
+def test_eval_objective_list_telemetry(isolate):
+    if isolate and not hasattr(os, "fork"):
+        pytest.skip("requires os.fork")
+
+    from sklearn.datasets import load_iris
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import KFold
+    from tpot2.tpot_estimator.cross_val_utils import cross_val_score_objective
+    X, y = load_iris(return_X_y=True)
+
+    def objective(ind):
+        return cross_val_score_objective(ind, X, y, scorers=["accuracy"], cv=KFold(n_splits=3))
+
+    scores, record = tpot2.utils.eval_utils.eval_objective_list(LogisticRegression(max_iter=10), [objective], timeout=60, isolate=isolate, return_telemetry=True)
+    assert len(scores) == 1
+    assert len(record["Fold Durations"]) == 3
+    assert record["Fit Time"] > 0
+    assert record["Score Time"] > 0
+    assert record["Peak RSS"] > 0
+    assert record["Worker"] is not None
+
+
+def test_peak_rss_is_not_recorded_for_concurrent_evaluations():
+    import threading
+    if tpot2.utils.telemetry.get_peak_rss() is None:
+        pytest.skip("peak RSS is not available on this platform")
+
+    with tpot2.utils.telemetry.measure_peak_rss() as measurement:
+        pass
+    assert measurement["Peak RSS"] > 0
+
+    #both evaluations run in this process at the same time, so the peak of the process can not be attributed to either of them
+    started = threading.Barrier(2)
+    def objective(ind):
+        started.wait(timeout=30)
+        return ind
+    results = [None, None]
+    def evaluate(i):
+        results[i] = tpot2.utils.eval_utils.eval_objective_list(i, [objective], return_telemetry=True)
+    threads = [threading.Thread(target=evaluate, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [list(scores) for scores, _ in results] == [[0], [1]]
+    assert all("Peak RSS" not in record for _, record in results)
+
+
+def test_combine_step_scores():
+    combine = tpot2.utils.eval_utils.combine_step_scores
+    np.testing.assert_allclose(combine([[1, 10], [3, 20]]), [2, 15])
+    np.testing.assert_allclose(combine([[1, 10], [3, 20]], final_score_strategy="last"), [3, 20])
+    #objectives that are only computed on one of the steps are taken from that step
+    np.testing.assert_allclose(combine([[1, 10], [3, np.nan], [5, np.nan]]), [3, 10])
+    np.testing.assert_allclose(combine([[1, 10], [3, np.nan]], final_score_strategy="last"), [3, 10])
+    assert combine([[1, 10], ["TIMEOUT"], ["INVALID"]]) == ["TIMEOUT"]
+    assert combine([[1, 10], ["INVALID"]]) == ["INVALID"]
+
+
+class FixedPipelineIndividual():
+    def __init__(self, estimator):
+        self.estimator = estimator
+
+    def export_pipeline(self, **kwargs):
+        return self.estimator
+
+
+def constant_objective(est):
+    return 7
+
+
+def fold_objective(ind, step=None, fail_step=None, slow_step=None, **kwargs):
+    from sklearn.datasets import load_iris
+    from sklearn.model_selection import KFold
+    if step is not None and step == fail_step:
+        raise ValueError()
+    if step is not None and step == slow_step:
+        time.sleep(6)
+    X, y = load_iris(return_X_y=True)
+    return tpot2.tpot_estimator.estimator_utils.objective_function_generator(ind, X, y, scorers=["accuracy", "neg_log_loss"], cv=KFold(n_splits=3, shuffle=True, random_state=0),
+                                                                            other_objective_functions=[constant_objective], step=step, other_objectives_step=0)
+
+
+def test_other_objectives_are_computed_on_one_step():
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import KFold
+    calls = []
+    def counting_objective(est):
+        calls.append(est)
+        return 7
+    X = np.random.random((30, 2))
+    y = np.arange(30) % 2
+    ind = FixedPipelineIndividual(LogisticRegression())
+    objective_function_generator = tpot2.tpot_estimator.estimator_utils.objective_function_generator
+    scores = [objective_function_generator(ind, X, y, scorers=["accuracy"], cv=KFold(n_splits=3), other_objective_functions=[counting_objective], step=step, other_objectives_step=0) for step in range(3)]
+    assert len(calls) == 1
+    assert [s[1] for s in scores[:1]] == [7] and all(np.isnan(s[1]) for s in scores[1:])
+    #without fold fan-out every step computes them
+    objective_function_generator(ind, X, y, scorers=["accuracy"], cv=KFold(n_splits=3), other_objective_functions=[counting_objective], step=1)
+    assert len(calls) == 2
+
+
+def test_fold_fanout_matches_unfanned_evaluation():
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+    individuals = [FixedPipelineIndividual(LogisticRegression(max_iter=500)), FixedPipelineIndividual(DecisionTreeClassifier(random_state=0))]
+    evaluator = tpot2.evaluators.ProcessPoolEvaluator(n_jobs=2)
+    try:
+        unfanned = tpot2.utils.eval_utils.parallel_eval_objective_list(individuals, [fold_objective], n_jobs=2, n_expected_columns=3, evaluator=evaluator, timeout=60)
+        fanned = tpot2.utils.eval_utils.parallel_eval_objective_list(individuals, [fold_objective], n_jobs=2, n_expected_columns=3, evaluator=evaluator, timeout=60, fold_fanout_steps=3)
+        np.testing.assert_allclose(np.array(fanned, dtype=float), np.array(unfanned, dtype=float))
+        assert all(s[2] == 7 for s in fanned)
+
+        #a failing or timed out fold marks the whole individual
+        failing = tpot2.utils.eval_utils.parallel_eval_objective_list(individuals, [functools.partial(fold_objective, fail_step=1)], n_jobs=2, n_expected_columns=3,
+                                                                    evaluator=evaluator, timeout=60, fold_fanout_steps=3)
+        assert [list(s) for s in failing] == [["INVALID"]*3]*2
+        timed_out = tpot2.utils.eval_utils.parallel_eval_objective_list(individuals, [functools.partial(fold_objective, slow_step=2)], n_jobs=2, n_expected_columns=3,
+                                                                    evaluator=evaluator, timeout=1, fold_fanout_steps=3)
+        assert [list(s) for s in timed_out] == [["TIMEOUT"]*3]*2
+    finally:
+        evaluator.close()
+
+
+@pytest.mark.parametrize("eval_time_history, batch_eval_time_threshold, max_batch_size, expected", [
+    ([0.1], None, 10, 1),
+    ([0.1], 1, 1, 1),
+    ([0.1], 1, None, 1),
+    (None, 1, 10, 1),
+    ([], 1, 10, 1),
+    ([0.1], 1, 20, 10),
+    ([0.1, 0.1, 5], 1, 20, 10),
+    ([0.3], 1, 20, 3),
+    ([0.001], 1, 20, 20),
+    ([0], 1, 20, 20),
+    ([1], 1, 20, 1),
+    ([2, 2, 0.1], 1, 20, 1),
+])
+def test_get_batch_size(eval_time_history, batch_eval_time_threshold, max_batch_size, expected):
+    assert tpot2.utils.eval_utils.get_batch_size(eval_time_history, batch_eval_time_threshold=batch_eval_time_threshold, max_batch_size=max_batch_size) == expected
+
+
+def batch_objective(ind, offset=0, step=None):
+    if ind == "fails":
+        raise ValueError()
+    if ind == "hangs":
+        time.sleep(3)
+    return ind + offset + (0 if step is None else step)
+
+
+def test_eval_objective_list_batch_keeps_order():
+    results = tpot2.utils.eval_utils.eval_objective_list_batch([1, "fails", "hangs", 4], [batch_objective], timeout=1, offset=10)
+    assert [list(scores) for scores, _, _ in results] == [[11], ["INVALID"], ["TIMEOUT"], [14]]
+    assert all(eval_time >= 0 for _, eval_time, _ in results)
+    assert all(record is not None for _, _, record in results)
+
+    results = tpot2.utils.eval_utils.eval_objective_list_batch([1, 1, 2], [batch_objective], step_kwargs_list=[{"step": 0}, {"step": 1}, {"step": 0}])
+    assert [list(scores) for scores, _, _ in results] == [[1], [2], [2]]
+
+
+def test_batched_parallel_eval():
+    evaluator = tpot2.evaluators.ProcessPoolEvaluator(n_jobs=2)
+    individuals = [0, 1, "fails", 3, "hangs", 5, 6, 7]
+    eval_time_history = [0.01]*5
+    try:
+        batches, futures, _ = tpot2.utils.eval_utils.submit_evaluation_tasks(individuals, [batch_objective], evaluator, n_jobs=2, timeout=1,
+                                                                            batch_eval_time_threshold=1, max_batch_size=10, eval_time_history=eval_time_history)
+        #the batches are capped so that both workers get tasks
+        assert [[ind for ind, _ in batch] for batch in batches] == [individuals[:4], individuals[4:]]
+        assert evaluator.wait(futures, timeout=60)
+
+        scores = tpot2.utils.eval_utils.parallel_eval_objective_list(individuals, [batch_objective], n_jobs=2, n_expected_columns=1, evaluator=evaluator, timeout=1,
+                                                                    batch_eval_time_threshold=1, max_batch_size=10, eval_time_history=eval_time_history)
+        assert [s[0] for s in scores] == [0, 1, "INVALID", 3, "TIMEOUT", 5, 6, 7]
+        #timed out evaluations are not added to the history
+        assert len(eval_time_history) == 5 + 7
+    finally:
+        evaluator.close()
+
+
+def test_isolated_evaluations_require_timeout():
+    evaluator = tpot2.evaluators.ProcessPoolEvaluator(n_jobs=1)
+    try:
+        with pytest.raises(ValueError, match="isolate_evaluations"):
+            tpot2.utils.eval_utils.parallel_eval_objective_list([0], [lambda ind: ind], evaluator=evaluator, timeout=None, isolate_evaluations=True)
+    finally:
+        evaluator.close()
+
+    with pytest.raises(ValueError, match="isolate_evaluations"):
+        tpot2.evolvers.BaseEvolver(individual_generator=iter([]), objective_functions=[lambda ind: ind], objective_function_weights=[1], max_eval_time_seconds=None, isolate_evaluations=True)
+    with pytest.raises(ValueError, match="isolate_evaluations"):
+        tpot2.evolvers.SteadyStateEvolver(individual_generator=iter([]), objective_functions=[lambda ind: ind], objective_function_weights=[1], max_eval_time_seconds=float("inf"), isolate_evaluations=True)
+    for estimator_class in [tpot2.TPOTEstimator, tpot2.TPOTEstimatorSteadyState]:
+        est = estimator_class(scorers=["roc_auc"], scorers_weights=[1], classification=True, max_eval_time_seconds=None, isolate_evaluations=True)
+        with pytest.raises(ValueError, match="isolate_evaluations"):
+            est.fit(np.random.random((20, 2)), np.arange(20) % 2)
@@ -0,0 +1,122 @@
+import pytest
+import tpot2
+from tpot2.utils.evaluation_cache import EvaluationCache
+
+
+class _Key():
+    def __init__(self, key):
+        self.key = key
+
+    def stable_key(self):
+        return self.key
+
+
+class _Individual():
+    def __init__(self, key):
+        self.key = _Key(key)
+
+    def unique_id(self):
+        return self.key
+
+
+def test_evaluation_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    individuals = [_Individual(str(i)) for i in range(4)]
+
+    cache = EvaluationCache(path, context="a", max_entries=3)
+    cache.put(individuals[:3], [[1.0], ["INVALID"], [3.0]])
+    assert cache.get(individuals) == [[1.0], None, [3.0], None]
+    assert cache.get(individuals, budget=0.5) == [None, None, None, None]
+    cache.close()
+
+    #a new run with the same context reuses the scores, a different context does not
+    assert EvaluationCache(path, context="a").get(individuals[:1]) == [[1.0]]
+    assert EvaluationCache(path, context="b").get(individuals[:1]) == [None]
+
+    cache = EvaluationCache(path, context="a", max_entries=3)
+    cache.get(individuals[2:3]) #individual 2 is now more recently used than individual 0
+    cache.put(individuals[1:2] + individuals[3:], [[2.0], [4.0]])
+    assert len(cache) == 3
+    assert cache.get(individuals)[0] is None
+
+
+def test_apply_evaluation_cache(tmp_path):
+    individuals = [_Individual(str(i)) for i in range(4)]
+    population = tpot2.Population(column_names=["score"])
+    population.add_to_population(individuals)
+    cache = EvaluationCache(str(tmp_path / "cache.db"))
+    cache.put(individuals[1:3] + individuals[3:], [[1.0], [2.0], [3.0, 4.0]], budget=0.5)
+
+    remaining, hit_individuals, hit_scores = tpot2.utils.evaluation_cache.apply_evaluation_cache(population, cache, individuals, ["score"], budget=0.5)
+    #cached scores with the wrong number of objectives are re-evaluated
+    assert remaining == [individuals[0], individuals[3]]
+    assert hit_individuals == individuals[1:3]
+    assert hit_scores == [[1.0], [2.0]]
+    assert list(population.get_column(individuals[1:3], column_names="score")) == [1.0, 2.0]
+    assert list(population.get_column(individuals[1:3], column_names="Budget")) == [0.5, 0.5]
+
+    assert tpot2.utils.evaluation_cache.apply_evaluation_cache(population, cache, individuals, ["score"]) == (individuals, [], [])
+    cache.close()
+
+
+def test_evaluation_cache_skips_keys_that_are_not_stable(tmp_path):
+    individuals = [_Individual(None), _Individual("1")]
+    cache = EvaluationCache(str(tmp_path / "cache.db"))
+    cache.put(individuals, [[1.0], [2.0]])
+    assert len(cache) == 1
+    assert cache.get(individuals) == [None, [2.0]]
+    cache.close()
+
+
+def complexity_objective(est):
+    return 1
+
+
+def test_evaluation_cache_context_of_objectives(tmp_path):
+    import types
+    import numpy as np
+    from tpot2.tpot_estimator.estimator_utils import create_evaluation_cache
+    path = str(tmp_path / "cache.db")
+    X = np.ones((4, 2))
+    y = np.arange(4)
+
+    #different lambdas would get the same name, so a setup with a lambda is not cached
+    objectives = [lambda est: 1, lambda est: 2]
+    for objective in objectives:
+        with pytest.warns(UserWarning, match="evaluation_cache is disabled"):
+            assert create_evaluation_cache(path, X, y, other_objective_functions=[objective]) is None
+
+    #a module level function with the same name but different code does not share the entries
+    edited_objective = types.FunctionType((lambda est: 2).__code__, globals(), "complexity_objective")
+    edited_objective.__qualname__ = complexity_objective.__qualname__
+    cache = create_evaluation_cache(path, X, y, other_objective_functions=[complexity_objective])
+    edited_cache = create_evaluation_cache(path, X, y, other_objective_functions=[edited_objective])
+    same_cache = create_evaluation_cache(path, X, y, other_objective_functions=[complexity_objective])
+    assert cache.context == same_cache.context
+    assert cache.context != edited_cache.context
+    individual = _Individual("0")
+    cache.put([individual], [[1.0]])
+    assert edited_cache.get([individual]) == [None]
+    for c in [cache, same_cache, edited_cache]:
+        c.close()
+
+
+@pytest.mark.parametrize("estimator_class", [tpot2.TPOTEstimator, tpot2.TPOTEstimatorSteadyState])
+def test_evaluation_cache_is_closed_when_fit_raises(monkeypatch, tmp_path, estimator_class):
+    import numpy as np
+    closed = []
+    def fails(self):
+        raise RuntimeError("optimize failed")
+    monkeypatch.setattr(tpot2.evolvers.BaseEvolver, "optimize", fails)
+    monkeypatch.setattr(tpot2.evolvers.SteadyStateEvolver, "optimize", fails)
+    monkeypatch.setattr(EvaluationCache, "close", lambda self: closed.append(self))
+
+    evaluator = tpot2.evaluators.ProcessPoolEvaluator(n_jobs=1)
+    est = estimator_class(scorers=["roc_auc"], scorers_weights=[1], classification=True, population_size=2, evaluator=evaluator,
+                          evaluation_cache=str(tmp_path / "cache.db"), verbose=0)
+    try:
+        with pytest.raises(RuntimeError):
+            est.fit(np.random.random((40, 3)), np.arange(40) % 2)
+    finally:
+        evaluator.close()
+    assert len(closed) == 1
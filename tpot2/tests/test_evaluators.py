@@ -0,0 +1,64 @@
+import pytest
+import numpy as np
+import tpot2
+
+
+@pytest.fixture
+def process_pool_evaluator():
+    evaluator = tpot2.evaluators.ProcessPoolEvaluator(n_jobs=2)
+    yield evaluator
+    evaluator.close()
+
+
+def test_process_pool_preloaded_data(process_pool_evaluator):
+    X = np.arange(10)
+    X_handle = process_pool_evaluator.scatter(X)
+    future = process_pool_evaluator.submit(lambda data: tpot2.utils.shared_data.resolve_shared_data(data).sum(), X_handle)
+    assert process_pool_evaluator.wait([future], timeout=60)
+    assert future.result() == 45
+
+
+def test_process_pool_parallel_eval(process_pool_evaluator):
+    def objective(ind, X):
+        if ind == 2:
+            raise ValueError()
+        return ind * X.sum()
+
+    X_handle = process_pool_evaluator.scatter(np.ones(3))
+    scores = tpot2.utils.eval_utils.parallel_eval_objective_list([0, 1, 2, 3], [objective], n_jobs=2, n_expected_columns=1, evaluator=process_pool_evaluator, X=X_handle)
+    assert [s[0] for s in scores] == [0, 3, "INVALID", 9]
+
+
+class KeyedIndividual():
+    def __init__(self, key):
+        self.key = key
+
+    def unique_id(self):
+        return self.key
+
+
+def test_lineage_workers():
+    parent, unevaluated_parent, child, orphan = [KeyedIndividual(key) for key in ["parent", "unevaluated_parent", "child", "orphan"]]
+    population = tpot2.Population(column_names=["score"])
+    population.add_to_population([parent, unevaluated_parent, child, orphan])
+    tpot2.utils.telemetry.update_population_telemetry(population, [parent], [{"Worker": "tcp://a:1,tcp://b:2"}])
+    population.update_column(child, column_names="Parents", data=("unevaluated_parent", "parent"))
+    population.update_column(orphan, column_names="Parents", data=("unevaluated_parent", "removed"))
+
+    assert tpot2.utils.telemetry.get_lineage_workers(population, [parent, child, orphan, unevaluated_parent]) == ["tcp://a:1", "tcp://a:1", None, None]
+
+    tasks = list(range(6))
+    batches, batch_workers = tpot2.utils.eval_utils.group_tasks_by_worker(tasks, ["a", None, "a", "a", "b", "a"], batch_size=2, max_tasks_per_worker=3)
+    assert batches == [[0, 2], [1, 5], [3], [4]]
+    assert batch_workers == ["a", None, "a", "b"]
+
+
+def test_dask_preferred_workers():
+    import dask.distributed
+    with dask.distributed.LocalCluster(n_workers=2, threads_per_worker=1, processes=False) as cluster, dask.distributed.Client(cluster) as client:
+        workers = sorted(client.scheduler_info()["workers"])
+        preferred = [workers[0], workers[1], workers[1], None]
+        scores, records = tpot2.utils.eval_utils.parallel_eval_objective_list([0, 1, 2, 3], [lambda ind: ind], n_jobs=2, n_expected_columns=1,
+                                                                                client=client, return_telemetry=True, preferred_workers=preferred)
+        assert [s[0] for s in scores] == [0, 1, 2, 3]
+        assert [record["Worker"] for record in records[:3]] == preferred[:3]
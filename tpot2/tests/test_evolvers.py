@@ -0,0 +1,76 @@
+import time
+import pytest
+import numpy as np
+import tpot2
+
+
+class SleepyIndividual():
+    def __init__(self, key, value, sleep=0, slow_step=None):
+        self.key = key
+        self.value = value
+        self.sleep = sleep
+        self.slow_step = slow_step
+
+    def unique_id(self):
+        return self.key
+
+
+def sleepy_objective(ind, step=None, **kwargs):
+    if step is None or step == ind.slow_step:
+        time.sleep(ind.sleep)
+    return ind.value if step is None else ind.value + step
+
+
+@pytest.fixture
+def process_pool_evaluator():
+    evaluator = tpot2.evaluators.ProcessPoolEvaluator(n_jobs=2)
+    yield evaluator
+    evaluator.close()
+
+
+def make_evolver(individuals, evaluator, **kwargs):
+    evolver = tpot2.evolvers.BaseEvolver(individual_generator=iter(individuals), objective_functions=[sleepy_objective], objective_function_weights=[1],
+                                        population_size=len(individuals), n_jobs=2, evaluator=evaluator, max_eval_time_seconds=30, **kwargs)
+    evolver._evaluator = evaluator
+    evolver.scheduled_timeout_time = time.time() + 120
+    return evolver
+
+
+def get_scores(evolver, individuals):
+    return list(evolver.population.get_column(individuals, column_names="objective0"))
+
+
+def test_overlapped_evaluation_merges_late_and_times_out_hung(process_pool_evaluator):
+    fast = [SleepyIndividual(f"fast{i}", i) for i in range(3)]
+    late = SleepyIndividual("late", 10, sleep=1)
+    hung = SleepyIndividual("hung", 20, sleep=8)
+    evolver = make_evolver(fast + [late, hung], process_pool_evaluator, generation_overlap_fraction=0.5)
+
+    evolver.evaluate_population_overlapped()
+    #the generation moves on once half of the evaluations are done
+    assert set(evolver._pending_evaluations) <= {"late", "hung"}
+    assert "hung" in evolver._pending_evaluations
+    assert all(ind.unique_id() not in evolver._pending_evaluations for ind in evolver.population.population)
+
+    deadline = time.time() + 20
+    while "late" in evolver._pending_evaluations and time.time() < deadline:
+        time.sleep(0.1)
+        evolver.collect_pending_evaluations()
+    assert "late" in [ind.unique_id() for ind in evolver.population.population]
+
+    evolver.collect_pending_evaluations(force=True)
+    assert len(evolver._pending_evaluations) == 0
+    assert get_scores(evolver, fast + [late, hung]) == [0, 1, 2, 10, "TIMEOUT"]
+
+
+def test_overlapped_fold_fanout_steps_are_merged(process_pool_evaluator):
+    fast = [SleepyIndividual(f"fast{i}", i) for i in range(3)]
+    late = SleepyIndividual("late", 10, sleep=1, slow_step=2)
+    evolver = make_evolver(fast + [late], process_pool_evaluator, generation_overlap_fraction=0.5, fold_fanout_steps=3, final_score_strategy="mean")
+
+    evolver.evaluate_population_overlapped()
+    evolver.finish_pending_evaluations()
+    assert len(evolver._pending_evaluations) == 0
+    #the mean of value+step over the steps 0, 1 and 2
+    np.testing.assert_allclose(np.asarray(get_scores(evolver, fast + [late]), dtype=float), [1, 2, 3, 11])
+    assert "late" in [ind.unique_id() for ind in evolver.population.population]
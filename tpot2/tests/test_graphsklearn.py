@@ -0,0 +1,246 @@
+import os
+import networkx as nx
+import tpot2
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.decomposition import PCA
+from sklearn.linear_model import LogisticRegression
+from scipy import sparse
+from sklearn.preprocessing import OneHotEncoder, PolynomialFeatures, StandardScaler
+from tpot2.graphsklearn import GraphPipeline, fit_sklearn_digraph, transform_sklearn_digraph, setup_ordered_successors, get_inputs_to_node, get_required_nodes, _nbytes, _IntermediateOutputs, _format_input, _stack_columns
+from tpot2.utils.node_cache import NodeFitCache
+
+
+class CountingLogisticRegression(LogisticRegression):
+    def predict_proba(self, X):
+        self.n_predict_proba_calls = getattr(self, "n_predict_proba_calls", 0) + 1
+        return super().predict_proba(X)
+
+
+def diamond_graph():
+    #root <- (pca, poly) <- scaler
+    graph = nx.DiGraph()
+    graph.add_node("root", instance=LogisticRegression())
+    graph.add_node("pca", instance=PCA(n_components=3))
+    graph.add_node("poly", instance=PolynomialFeatures(degree=2))
+    graph.add_node("scaler", instance=StandardScaler())
+    graph.add_edges_from([("root", "pca"), ("root", "poly"), ("pca", "scaler"), ("poly", "scaler")])
+    return graph
+
+
+def test_intermediate_outputs_are_freed():
+    X, y = make_classification(n_samples=200, n_features=6, random_state=0)
+    est = GraphPipeline(diamond_graph(), report_peak_bytes=True).fit(X, y)
+
+    scaled = StandardScaler().fit_transform(X)
+    poly = PolynomialFeatures(degree=2).fit_transform(scaled)
+    pca = PCA(n_components=3).fit_transform(scaled)
+    expected = LogisticRegression().fit(np.hstack([pca, poly]), y).predict_proba(np.hstack([pca, poly]))
+    np.testing.assert_allclose(est.predict_proba(X), expected)
+
+    #the output of the scaler is freed before the input of the root is assembled
+    assert 0 < est.peak_intermediate_bytes_ < 2*(scaled.nbytes + poly.nbytes + pca.nbytes)
+    assert est.peak_intermediate_bytes_ >= 2*(poly.nbytes + pca.nbytes)
+
+    all_outputs = transform_sklearn_digraph(est.graph, X, topo_sort=est.topo_sorted_nodes)
+    assert set(all_outputs) == {"root", "pca", "poly", "scaler"}
+    outputs = transform_sklearn_digraph(est.graph, X, output_nodes=["poly"], topo_sort=est.topo_sorted_nodes)
+    assert list(outputs) == ["poly"]
+    np.testing.assert_allclose(outputs["poly"], all_outputs["poly"])
+    graph = diamond_graph()
+    setup_ordered_successors(graph)
+    assert fit_sklearn_digraph(graph, X, y) is None
+    assert _nbytes(X) == X.nbytes
+
+
+def test_parallel_branches_match_sequential():
+    X, y = make_classification(n_samples=200, n_features=6, random_state=0)
+    sequential = GraphPipeline(diamond_graph()).fit(X, y)
+    for executor_type in ["thread", "process"]:
+        parallel = GraphPipeline(diamond_graph(), n_jobs=2, executor_type=executor_type, report_peak_bytes=True).fit(X, y)
+        np.testing.assert_allclose(parallel.predict_proba(X), sequential.predict_proba(X))
+        assert parallel.peak_intermediate_bytes_ > 0
+
+
+def test_inputs_are_assembled_once_per_combination():
+    #a and b both use (s1, s2) as input, root uses (a, b)
+    graph = nx.DiGraph()
+    graph.add_edges_from([("root", "a"), ("root", "b"), ("a", "s1"), ("a", "s2"), ("b", "s1"), ("b", "s2")])
+    setup_ordered_successors(graph)
+    nodes = ["s1", "s2", "a", "b", "root"]
+    X = np.arange(12.0).reshape(4, 3)
+    outputs = {"s1": X[:, :1]*2, "s2": X[:, 1:]*3}
+
+    for record_layouts in [True, False]:
+        #the first run records the layouts, so that the second one writes the outputs of s1 and s2 into a preallocated input
+        intermediates = _IntermediateOutputs(graph, nodes, n_rows=4, record_layouts=record_layouts)
+        intermediates.add("s1", outputs["s1"])
+        intermediates.release_inputs("s1")
+        if not record_layouts:
+            assert "s1" not in intermediates.outputs
+        intermediates.add("s2", outputs["s2"])
+        intermediates.release_inputs("s2")
+
+        a_input = intermediates.get_input("a", X)
+        np.testing.assert_array_equal(a_input, np.hstack([outputs["s1"], outputs["s2"]]))
+        assert intermediates.get_input("b", X) is a_input
+        assert len(intermediates.outputs) == 0
+        intermediates.add("a", a_input[:, :2])
+        intermediates.release_inputs("a")
+        intermediates.add("b", a_input[:, 2:])
+        intermediates.release_inputs("b")
+        assert ("s1", "s2") not in intermediates.inputs
+        np.testing.assert_array_equal(intermediates.get_input("root", X), a_input)
+
+
+def test_assembled_input_when_transform_width_differs_from_fit():
+    #s1 has one column when fit but two when transforming, so it is not written into the preallocated input of root
+    graph = nx.DiGraph()
+    graph.add_edges_from([("root", "s1"), ("root", "s2")])
+    setup_ordered_successors(graph)
+    nodes = ["s1", "s2", "root"]
+    X = np.arange(12.0).reshape(4, 3)
+
+    fitting = _IntermediateOutputs(graph, nodes, record_layouts=True)
+    fitting.add("s1", X[:, :1])
+    fitting.add("s2", X[:, 1:])
+
+    outputs = {"s1": X[:, :2]*2, "s2": X[:, 1:]*3}
+    intermediates = _IntermediateOutputs(graph, nodes, n_rows=4)
+    for node in ["s1", "s2"]:
+        intermediates.add(node, outputs[node])
+        intermediates.release_inputs(node)
+    np.testing.assert_array_equal(intermediates.get_input("root", X), np.hstack([outputs["s1"], outputs["s2"]]))
+
+
+def test_sparse_outputs_stay_sparse():
+    #root <- (encoder, pca <- encoder), the encoder output is sparse and PCA needs dense input
+    graph = nx.DiGraph()
+    graph.add_node("root", instance=LogisticRegression())
+    graph.add_node("pca", instance=PCA(n_components=2))
+    graph.add_node("encoder", instance=OneHotEncoder(sparse_output=True))
+    graph.add_edges_from([("root", "encoder"), ("root", "pca"), ("pca", "encoder")])
+    X = np.random.default_rng(0).integers(0, 5, size=(100, 3))
+    y = X[:, 0] > 2
+    est = GraphPipeline(graph).fit(X, y)
+
+    outputs = transform_sklearn_digraph(est.graph, X, topo_sort=est.topo_sorted_nodes)
+    assert sparse.issparse(outputs["encoder"]) and outputs["encoder"].format == "csr"
+    assert not sparse.issparse(_format_input(est.graph, "pca", outputs["encoder"]))
+    root_input = _stack_columns([outputs["encoder"], outputs["pca"]])
+    assert sparse.issparse(_format_input(est.graph, "root", root_input))
+
+    encoded = OneHotEncoder().fit_transform(X)
+    expected_input = sparse.hstack([encoded, PCA(n_components=2).fit_transform(encoded.toarray())], format="csr")
+    expected = LogisticRegression().fit(expected_input, y).predict_proba(expected_input)
+    np.testing.assert_allclose(est.predict_proba(X), expected)
+    assert _nbytes(encoded) < _nbytes(encoded.toarray())
+
+
+def test_chunked_prediction():
+    X, y = make_classification(n_samples=300, n_features=6, random_state=0)
+    est = GraphPipeline(diamond_graph()).fit(X, y)
+    expected = est.predict_proba(X)
+
+    np.testing.assert_allclose(est.predict_proba(X, chunk_size=64), expected)
+    np.testing.assert_allclose(est.predict_proba(X, memory_budget=10**6), expected)
+    np.testing.assert_array_equal(est.predict(X, chunk_size=1000), est.predict(X))
+
+    batches = (X[start:start+100] for start in range(0, len(X), 100))
+    outputs = list(est.iter_predict(batches, method="predict_proba", chunk_size=30))
+    assert [len(output) for output in outputs] == [100, 100, 100]
+    np.testing.assert_allclose(np.concatenate(outputs), expected)
+
+
+def test_compiled_plan_matches_graph():
+    X, y = make_classification(n_samples=200, n_features=6, random_state=0)
+    est = GraphPipeline(diamond_graph()).fit(X, y)
+    expected = est.predict_proba(X)
+    expected_input = get_inputs_to_node(est.graph, X, est.root, topo_sort=est.topo_sorted_nodes)
+
+    est.compile()
+    #scaler, pca, poly and the assembled input of the root
+    assert len(est.execution_plan_.steps) == 4
+    np.testing.assert_array_equal(est.execution_plan_.run(X), expected_input)
+    np.testing.assert_allclose(est.predict_proba(X), expected)
+    np.testing.assert_allclose(est.predict_proba(X[:1]), expected[:1])
+
+    est.fit(X, y)
+    assert est.execution_plan_ is None
+
+
+def test_only_required_nodes_run():
+    X, y = make_classification(n_samples=200, n_features=6, random_state=0)
+    graph = diamond_graph()
+    graph.nodes["root"]["instance"] = CountingLogisticRegression()
+    est = GraphPipeline(graph).fit(X, y)
+    assert get_required_nodes(est.graph, ["pca"], topo_sort=est.topo_sorted_nodes) == ["scaler", "pca"]
+    assert get_required_nodes(est.graph, ["root"])[-1] == "root"
+
+    root = est.graph.nodes["root"]["instance"]
+    root.n_predict_proba_calls = 0
+    est.predict(X)
+    est.predict_proba(X)
+    #the root only runs for the requested method, not while computing its input
+    assert root.n_predict_proba_calls == 1
+    transform_sklearn_digraph(est.graph, X, output_nodes=["pca", "poly"], topo_sort=est.topo_sorted_nodes)
+    assert root.n_predict_proba_calls == 1
+    est.compile().predict(X)
+    assert root.n_predict_proba_calls == 1
+
+
+def test_node_cache_reuses_shared_subgraphs(tmp_path):
+    X, y = make_classification(n_samples=200, n_features=6, random_state=0)
+    cache = NodeFitCache(path=str(tmp_path))
+    first = GraphPipeline(diamond_graph(), node_cache=cache).fit(X, y)
+    assert cache.stats()["misses"] == 4
+
+    #same scaler -> pca prefix, different poly and root
+    graph = diamond_graph()
+    graph.nodes["poly"]["instance"] = PolynomialFeatures(degree=3)
+    graph.nodes["root"]["instance"] = LogisticRegression(C=0.5)
+    GraphPipeline(graph, node_cache=cache).fit(X, y)
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 6
+
+    #a new process only has the disk tier
+    cache.memory.clear()
+    second = GraphPipeline(diamond_graph(), node_cache=cache).fit(X, y)
+    assert cache.stats()["disk_hits"] == 4
+    np.testing.assert_allclose(second.predict_proba(X), first.predict_proba(X))
+
+    #different data is a different address
+    GraphPipeline(diamond_graph(), node_cache=cache).fit(X[:100], y[:100])
+    assert cache.stats()["misses"] == 10
+
+    cache.max_disk_bytes = 0
+    cache.evict()
+    assert len(os.listdir(tmp_path)) == 0
+
+
+def test_node_cache_tiers_fingerprints_and_eviction(tmp_path, monkeypatch):
+    X, y = make_classification(n_samples=200, n_features=6, random_state=0)
+    cache = NodeFitCache(path=str(tmp_path))
+
+    #the fingerprint of the fold is used instead of hashing the data
+    with tpot2.utils.node_cache.data_fingerprint("fold-0"):
+        GraphPipeline(diamond_graph(), node_cache=cache).fit(X, y)
+        GraphPipeline(diamond_graph(), node_cache=cache).fit(X + 1, y)
+    assert cache.stats()["hits"] == 4
+
+    #the disk folder is only scanned once its size may exceed max_disk_bytes
+    n_evictions = []
+    monkeypatch.setattr(NodeFitCache, "evict", lambda self: n_evictions.append(1) or setattr(self.memory, "disk_bytes", 0))
+    cache.memory.disk_bytes = 0
+    GraphPipeline(diamond_graph(), node_cache=cache).fit(X[:100], y[:100])
+    assert len(n_evictions) == 0
+    cache.max_disk_bytes = cache.memory.disk_bytes + 100
+    GraphPipeline(diamond_graph(), node_cache=cache).fit(X[:50], y[:50])
+    assert len(n_evictions) > 0
+
+    cache.close()
+    assert cache.cache_id not in tpot2.utils.node_cache._memory_tiers
+    caches = [NodeFitCache() for _ in range(tpot2.utils.node_cache._MAX_MEMORY_TIERS + 2)]
+    for other in caches:
+        other.memory
+    assert len(tpot2.utils.node_cache._memory_tiers) <= tpot2.utils.node_cache._MAX_MEMORY_TIERS
@@ -0,0 +1,33 @@
+import pickle
+import numpy as np
+import pandas as pd
+from tpot2.history_store import HistoryStore, VALID, INVALID, TIMEOUT
+
+
+def test_history_store_statuses_and_growth():
+    store = HistoryStore(column_names=["score"], object_column_names=["Parents"], capacity=2)
+    ids = [store.add(key) for key in ["a", "b", "c", "d"]]
+    assert store.add("b") == ids[1]
+
+    store.update(ids[:3], "score", [0.5, "INVALID", "TIMEOUT"])
+    store.update([ids[3]], "Parents", ("a", "b"), single_value=True)
+
+    assert list(store.get_statuses(ids, "score")) == [VALID, INVALID, TIMEOUT, VALID]
+    assert list(store.is_missing(ids, "score")) == [False, False, False, True]
+    assert np.isnan(store.get_floats(ids, "score")[1:]).all()
+
+    df = store.to_dataframe()
+    assert list(df.index) == ["a", "b", "c", "d"]
+    assert list(df["score"].iloc[:3]) == [0.5, "INVALID", "TIMEOUT"]
+    assert df.loc["d", "Parents"] == ("a", "b")
+
+
+def test_history_store_round_trip():
+    store = HistoryStore(column_names=["score"])
+    ids = [store.add(key) for key in range(5)]
+    store.update(ids, ["score", "Worker"], [[i, f"worker{i}"] for i in range(5)])
+
+    df = store.to_dataframe()
+    assert df["score"].dtype == float
+    pd.testing.assert_frame_equal(pickle.loads(pickle.dumps(store)).to_dataframe(), df)
+    pd.testing.assert_frame_equal(HistoryStore.from_dataframe(df).to_dataframe(), df)
@@ -0,0 +1,30 @@
+import itertools
+import numpy as np
+from tpot2.selectors import lexicase_selection, epsilon_lexicase_selection
+
+
+def possible_lexicase_winners(scores):
+    winners = set()
+    for cases in itertools.permutations(range(scores.shape[1])):
+        candidates = np.arange(len(scores))
+        for case in cases:
+            candidates = candidates[scores[candidates, case] == scores[candidates, case].max()]
+        winners.update(candidates.tolist())
+    return winners
+
+
+def test_lexicase_selects_only_possible_winners():
+    np.random.seed(0)
+    scores = np.random.randint(0, 3, size=(30, 4)).astype(float)
+    chosen = lexicase_selection(scores, k=500, n_parents=2)
+    assert chosen.shape == (500, 2)
+    assert set(chosen.ravel().tolist()) == possible_lexicase_winners(scores)
+
+
+def test_epsilon_lexicase():
+    np.random.seed(0)
+    scores = np.array([[1.0, 0.0], [0.99, 0.99], [0.0, 1.0], [0.5, 0.5]])
+    assert set(lexicase_selection(scores, k=200).ravel().tolist()) == {0, 2}
+    #within 0.05 of the best on either case, only the generalist survives both cases
+    assert set(epsilon_lexicase_selection(scores, k=200, epsilon=0.05).ravel().tolist()) == {1}
+    assert set(epsilon_lexicase_selection(scores, k=200).ravel().tolist()) <= {0, 1, 2, 3}
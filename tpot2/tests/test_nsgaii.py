@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from tpot2.selectors import nondominated_sorting, dominates, crowding_distance, survival_select_NSGA2
+
+
+def reference_fronts(matrix):
+    remaining = set(range(len(matrix)))
+    fronts = []
+    while remaining:
+        front = {p for p in remaining if not any(dominates(matrix[q], matrix[p]) for q in remaining)}
+        fronts.append(front)
+        remaining -= front
+    return fronts
+
+
+@pytest.mark.parametrize("n_objectives", [1, 2, 3])
+def test_nondominated_sorting_matches_reference(n_objectives):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        #few distinct values so that there are many ties and duplicates
+        matrix = rng.integers(0, 5, size=(rng.integers(1, 60), n_objectives)).astype(float)
+        if n_objectives == 2 and rng.random() < 0.3:
+            matrix[rng.integers(len(matrix))] = np.nan
+        assert nondominated_sorting(matrix) == reference_fronts(matrix.tolist())
+
+
+def test_nondominated_sorting_empty():
+    assert nondominated_sorting(np.zeros((0, 2))) == []
+
+
+def reference_survival_select(scores, k):
+    #the front by front selection without the fast path
+    chosen = []
+    for front in reference_fronts(scores.tolist()):
+        if len(chosen) >= k:
+            break
+        front = np.array(sorted(front))
+        crowding = crowding_distance(scores[front])
+        chosen.extend(front[np.argsort(crowding)[::-1]][:k-len(chosen)])
+    return chosen
+
+
+def test_survival_select_NSGA2_matches_reference():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        scores = rng.integers(0, 6, size=(rng.integers(1, 50), rng.integers(2, 4))).astype(float)
+        k = int(rng.integers(1, len(scores)+2))
+        chosen = survival_select_NSGA2(scores, k)
+        assert len(chosen) == min(k, len(scores))
+        assert sorted(chosen) == sorted(reference_survival_select(scores, k))
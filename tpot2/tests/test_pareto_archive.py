@@ -0,0 +1,31 @@
+import numpy as np
+from tpot2.utils import is_pareto_efficient
+from tpot2.utils.pareto_archive import ParetoArchive
+
+
+def test_pareto_archive_matches_nondominated_sorting():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 10, size=(200, 3)).astype(float)
+    weights = [1, -1, 1]
+
+    archive = ParetoArchive(weights)
+    for i, row in enumerate(scores):
+        archive.add(i, row)
+    archive.add(200, ["INVALID", "INVALID", "INVALID"])
+
+    expected = np.flatnonzero(is_pareto_efficient(scores*weights))
+    assert sorted(archive.items) == expected.tolist()
+    assert np.array_equal(archive.best_scores(), [scores[:, 0].max(), scores[:, 1].min(), scores[:, 2].max()])
+    assert len(archive.crowding) == len(archive)
+
+    rebuilt = ParetoArchive(weights)
+    rebuilt.extend(list(range(200)), scores)
+    assert sorted(rebuilt.items) == expected.tolist()
+
+
+def test_pareto_archive_budget():
+    archive = ParetoArchive([1, 1])
+    archive.add("a", [1, 1], budget=0.5)
+    archive.add("b", [0, 0], budget=1.0)
+    archive.add("c", [5, 5], budget=0.5)
+    assert archive.items == ["b"]
@@ -0,0 +1,27 @@
+import time
+import tpot2
+from tpot2.utils.profiler import GenerationProfiler, phase
+
+
+def test_nested_phases_are_exclusive():
+    profiler = GenerationProfiler(profile_generations=0)
+    profiler.activate()
+    try:
+        profiler.start_generation(0)
+        with phase("Variation"):
+            time.sleep(0.05)
+            with phase("Dedupe"):
+                time.sleep(0.1)
+    finally:
+        profiler.deactivate()
+
+    df = profiler.to_dataframe()
+    assert 0.04 < df.loc[0, "Variation"] < 0.1
+    assert df.loc[0, "Dedupe"] >= 0.1
+    assert df.loc[0, "Total"] >= df.loc[0, "Variation"] + df.loc[0, "Dedupe"]
+    assert 0 in profiler.profiles
+
+
+def test_phase_without_active_profiler():
+    with phase("Selection"):
+        pass
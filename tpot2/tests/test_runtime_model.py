@@ -0,0 +1,42 @@
+import pytest
+import numpy as np
+import tpot2
+from tpot2.utils.runtime_model import RuntimeModel
+
+
+class FakeIndividual():
+    def __init__(self, cost):
+        self.cost = cost
+
+
+class CostRuntimeModel(RuntimeModel):
+    def get_features(self, individual, budget=None):
+        return {"cost": individual.cost}
+
+
+def test_runtime_model_predicts_after_min_observations():
+    model = CostRuntimeModel(min_observations=5)
+    assert model.predict([FakeIndividual(1)]) is None
+
+    for cost in range(1, 10):
+        model.add(FakeIndividual(cost), np.exp(cost))
+
+    predicted = model.predict([FakeIndividual(2), FakeIndividual(8)])
+    assert predicted[0] < predicted[1]
+
+
+def test_parallel_eval_with_runtime_model():
+    model = CostRuntimeModel(min_observations=5)
+    for cost in range(1, 10):
+        model.add(FakeIndividual(cost), cost)
+
+    individuals = [FakeIndividual(1), FakeIndividual(100), FakeIndividual(3)]
+    evaluator = tpot2.evaluators.ProcessPoolEvaluator(n_jobs=1)
+    try:
+        scores = tpot2.utils.eval_utils.parallel_eval_objective_list(individuals, [lambda ind: ind.cost], n_jobs=1, timeout=20, n_expected_columns=1,
+                                                                    evaluator=evaluator, runtime_model=model, runtime_skip_factor=2)
+    finally:
+        evaluator.close()
+
+    #scores are returned in the original order, and the individual predicted to take far longer than the timeout is skipped
+    assert [s[0] for s in scores] == [1, "TIMEOUT", 3]
@@ -0,0 +1,102 @@
+import os
+import sys
+import pickle
+import subprocess
+import pytest
+import numpy as np
+import pandas as pd
+import tpot2
+from tpot2.utils.shared_data import share_data, resolve_shared_data
+from tpot2.tpot_estimator.estimator_utils import send_data_to_workers
+
+
+@pytest.mark.parametrize("method", ["memmap", "shared_memory"])
+def test_shared_array_round_trip(method):
+    df = pd.DataFrame(np.arange(12.).reshape(4, 3), columns=["a", "b", "c"], index=[3, 2, 1, 0])
+    for data in [df.to_numpy(), df, df["b"]]:
+        shared = share_data(data, method=method)
+        #workers only get the pickled handle
+        handle = pickle.loads(pickle.dumps(shared))
+        view = resolve_shared_data(handle)
+        if isinstance(data, np.ndarray):
+            np.testing.assert_array_equal(view, data)
+        elif isinstance(data, pd.DataFrame):
+            pd.testing.assert_frame_equal(view, data)
+        else:
+            pd.testing.assert_series_equal(view, data)
+        assert not np.asarray(view).flags.writeable
+
+        #only the creator releases the data
+        handle.close()
+        np.testing.assert_array_equal(np.asarray(resolve_shared_data(pickle.loads(pickle.dumps(shared)))), np.asarray(data))
+        shared.close()
+        if method == "memmap":
+            assert not os.path.exists(shared.location)
+        else:
+            with pytest.raises(FileNotFoundError):
+                tpot2.utils.shared_data._attach_shared_memory(shared.location)
+
+
+def test_shared_memory_attach_keeps_creator_registration():
+    #the resource tracker reports an error on stderr if the registration of the creator was removed by an attach
+    script = (
+        "import pickle, numpy as np, pandas as pd\n"
+        "from tpot2.utils.shared_data import share_data\n"
+        "shared = share_data(pd.DataFrame(np.ones((4, 3))), 'shared_memory')\n"
+        "pickle.loads(pickle.dumps(shared)).get()\n"
+        "shared.close()\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.dirname(os.path.dirname(os.path.dirname(tpot2.__file__)))] + sys.path))
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert "KeyError" not in result.stderr
+    assert "leaked" not in result.stderr
+
+
+class ScatterEvaluator():
+    def scatter(self, data):
+        return ("scattered", data)
+
+
+def test_send_data_to_workers_falls_back_to_scatter():
+    shared_data_list = []
+    numeric = np.ones((5, 2))
+    handle = send_data_to_workers(numeric, ScatterEvaluator(), data_transport="memmap", shared_data_list=shared_data_list)
+    assert shared_data_list == [handle]
+    np.testing.assert_array_equal(resolve_shared_data(handle), numeric)
+    handle.close()
+
+    #object columns can not be shared
+    mixed = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    scattered = send_data_to_workers(mixed, ScatterEvaluator(), data_transport="shared_memory", shared_data_list=shared_data_list)
+    assert scattered[0] == "scattered" and scattered[1] is mixed
+    assert len(shared_data_list) == 1
+    assert send_data_to_workers(mixed, ScatterEvaluator(), scatter=False, data_transport="memmap") is mixed
+
+    with pytest.raises(ValueError):
+        send_data_to_workers(numeric, ScatterEvaluator(), data_transport="pickle")
+
+
+@pytest.mark.parametrize("estimator_class", [tpot2.TPOTEstimator, tpot2.TPOTEstimatorSteadyState])
+def test_shared_data_is_released_when_fit_raises(monkeypatch, estimator_class):
+    created = []
+    def recording_share_data(*args, **kwargs):
+        created.append(share_data(*args, **kwargs))
+        return created[-1]
+    def fails(self):
+        raise RuntimeError("optimize failed")
+    monkeypatch.setattr(tpot2.utils.shared_data, "share_data", recording_share_data)
+    monkeypatch.setattr(tpot2.evolvers.BaseEvolver, "optimize", fails)
+    monkeypatch.setattr(tpot2.evolvers.SteadyStateEvolver, "optimize", fails)
+
+    X = np.random.random((40, 3))
+    y = np.arange(40) % 2
+    evaluator = tpot2.evaluators.ProcessPoolEvaluator(n_jobs=1)
+    est = estimator_class(scorers=["roc_auc"], scorers_weights=[1], classification=True, population_size=2, evaluator=evaluator, data_transport="memmap", verbose=0)
+    try:
+        with pytest.raises(RuntimeError):
+            est.fit(X, y)
+    finally:
+        evaluator.close()
+    assert len(created) == 2
+    assert not any(os.path.exists(shared.location) for shared in created)
@@ -4,8 +4,17 @@ from collections.abc import Iterable
 import pandas as pd
 import sklearn
 import numpy as np
+import joblib
+import tpot2
 
-def cross_val_score_objective(pipeline, X, y, scorers, cv, fold=None):
+def _fold_fingerprint(data_fingerprint, train_index):
+    #identifies the training data of a fold from the fingerprint of X and y and the indexes of the fold (see tpot2.utils.node_cache.data_fingerprint)
+    if data_fingerprint is None:
+        return None
+    return joblib.hash((data_fingerprint, train_index))
+
+
+def cross_val_score_objective(pipeline, X, y, scorers, cv, fold=None, data_fingerprint=None):
     #check if scores is not iterable
     if not isinstance(scorers, Iterable): 
         scorers = [scorers]
@@ -25,10 +34,13 @@ def cross_val_score_objective(pipeline, X, y, scorers, cv, fold=None):
 
 
             start = time.time()
-            this_fold_pipeline.fit(X_train,y_train)
+            with tpot2.utils.node_cache.data_fingerprint(_fold_fingerprint(data_fingerprint, train_index)):
+                this_fold_pipeline.fit(X_train,y_train)
             duration = time.time() - start
 
+            start = time.time()
             this_fold_scores = [sklearn.metrics.get_scorer(scorer)(this_fold_pipeline, X_test, y_test) for scorer in scorers] 
+            tpot2.utils.telemetry.record_fold(fit_time=duration, score_time=time.time() - start)
             scores.append(this_fold_scores)
             del this_fold_pipeline
             del X_train
@@ -52,9 +64,12 @@ def cross_val_score_objective(pipeline, X, y, scorers, cv, fold=None):
             y_train, y_test = y[train_index], y[test_index]
 
         start = time.time()
-        this_fold_pipeline.fit(X_train,y_train)
+        with tpot2.utils.node_cache.data_fingerprint(_fold_fingerprint(data_fingerprint, train_index)):
+            this_fold_pipeline.fit(X_train,y_train)
         duration = time.time() - start
+        start = time.time()
         this_fold_scores = [sklearn.metrics.get_scorer(scorer)(this_fold_pipeline, X_test, y_test) for scorer in scorers] 
+        tpot2.utils.telemetry.record_fold(fit_time=duration, score_time=time.time() - start)
         return this_fold_scores
 
 
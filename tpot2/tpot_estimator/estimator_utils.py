@@ -1,3 +1,6 @@
+import copy
+import joblib
+import warnings
 import numpy as np
 import sklearn
 import sklearn.base
@@ -94,8 +97,8 @@ def recursive_with_defaults(config_dict, n_samples, n_features, classification,
 
 
 
-def objective_function_generator(pipeline, x,y, scorers, cv, other_objective_functions, memory=None, cross_val_predict_cv=None, subset_column=None, step=None, budget=None, generation=1,is_classification=True):
-    pipeline = pipeline.export_pipeline(memory=memory, cross_val_predict_cv=cross_val_predict_cv, subset_column=subset_column)
+def objective_function_generator(pipeline, x,y, scorers, cv, other_objective_functions, memory=None, cross_val_predict_cv=None, subset_column=None, step=None, budget=None, generation=1,is_classification=True, node_cache=None, other_objectives_step=None):
+    pipeline = pipeline.export_pipeline(memory=memory, cross_val_predict_cv=cross_val_predict_cv, subset_column=subset_column, node_cache=node_cache)
     if budget is not None and budget < 1:
         if is_classification:
             x,y = sklearn.utils.resample(x,y, stratify=y, n_samples=int(budget*len(x)), replace=False, random_state=1)
@@ -107,15 +110,24 @@ def objective_function_generator(pipeline, x,y, scorers, cv, other_objective_fun
         else:
             n_splits = cv.n_splits
 
+    data_fingerprint = None
+    if node_cache is not None and node_cache.data_fingerprint is not None:
+        data_fingerprint = joblib.hash((node_cache.data_fingerprint, budget))
+
     if len(scorers) > 0:
-        cv_obj_scores = cross_val_score_objective(sklearn.base.clone(pipeline),x,y,scorers=scorers, cv=cv , fold=step)
+        cv_obj_scores = cross_val_score_objective(sklearn.base.clone(pipeline),x,y,scorers=scorers, cv=cv , fold=step, data_fingerprint=data_fingerprint)
     else:
         cv_obj_scores = []
     
     if other_objective_functions is not None and len(other_objective_functions) >0:
-        other_scores = [obj(sklearn.base.clone(pipeline)) for obj in other_objective_functions]
-        #flatten
-        other_scores = np.array(other_scores).flatten().tolist()
+        if other_objectives_step is not None and step is not None and step != other_objectives_step:
+            #when each fold is evaluated as its own step (fold_fanout), the other objectives do not depend on the fold and are only computed on one step.
+            #they are nan on the other steps and are taken from that step by tpot2.utils.eval_utils.combine_step_scores
+            other_scores = [np.nan]*len(other_objective_functions)
+        else:
+            other_scores = [obj(sklearn.base.clone(pipeline)) for obj in other_objective_functions]
+            #flatten
+            other_scores = np.array(other_scores).flatten().tolist()
     else:
         other_scores = []
         
@@ -137,6 +149,74 @@ def val_objective_function_generator(pipeline, X_train, y_train, X_test, y_test,
     return np.concatenate([scores,other_scores])
 
 
+def send_data_to_workers(data, evaluator, scatter=True, data_transport=None, shared_data_list=None):
+    '''
+    Returns the object that should be passed to the objective functions in place of data.
+
+    Parameters
+    ----------
+    data : np.ndarray, pd.DataFrame, pd.Series
+        The data to send to the workers.
+    evaluator : tpot2.evaluators.BaseEvaluator
+        The evaluator used to scatter the data.
+    scatter : bool, default=True
+        If True and data_transport is None, the data is scattered to the workers with evaluator.scatter.
+    data_transport : str, default=None
+        - None : use scatter
+        - "memmap" or "shared_memory" : The data is written once and workers get a read-only view. See tpot2.utils.shared_data.SharedArray.
+          Data that can not be shared (e.g. object columns) falls back to scatter.
+    shared_data_list : list, default=None
+        If not None, created SharedArray handles are appended to this list so they can be closed after fitting.
+    '''
+    if data_transport is not None:
+        if data_transport not in ["memmap", "shared_memory"]:
+            raise ValueError(f"Unknown data_transport: {data_transport}. Must be None, 'memmap' or 'shared_memory'")
+        shared = tpot2.utils.shared_data.share_data(data, method=data_transport)
+        if shared is not None:
+            if shared_data_list is not None:
+                shared_data_list.append(shared)
+            return shared
+
+    if scatter:
+        return evaluator.scatter(data)
+    else:
+        return data
+
+
+def create_evaluation_cache(path, X, y, max_entries=100000, **evaluation_setup):
+    '''
+    Returns a tpot2.utils.evaluation_cache.EvaluationCache stored at path. The cache context is a fingerprint of X, y and 
+    evaluation_setup (e.g. cv and scorers), so scores are only reused by runs with the same data and the same evaluation setup.
+
+    Returns None (with a warning) if the evaluation setup can not be identified across python sessions, e.g. if it holds a lambda or a local function
+    (see tpot2.individual_representations.graph_pipeline_individual.stable_repr). Use functions defined at module level to cache such setups.
+    '''
+    setup = tpot2.individual_representations.graph_pipeline_individual.stable_repr(evaluation_setup)
+    if not tpot2.individual_representations.graph_pipeline_individual.is_persistent_repr(setup):
+        warnings.warn("evaluation_cache is disabled because the scorers, cv or other_objective_functions hold a lambda, a local function or another object that can not be identified across python sessions")
+        return None
+    context = tpot2.utils.evaluation_cache.get_data_fingerprint(X=X, y=y, setup=setup)
+    return tpot2.utils.evaluation_cache.EvaluationCache(path, context=context, max_entries=max_entries)
+
+
+def create_node_cache(node_cache, X, y):
+    '''
+    Returns the tpot2.utils.node_cache.NodeFitCache described by the node_cache parameter of the estimators: None for None or False,
+    an in-memory cache for True, a cache with an on-disk tier in the folder for a str, and a copy of the cache (that shares its entries) for a NodeFitCache.
+    The data_fingerprint of the returned cache is a hash of X and y, so each CV fold is fingerprinted from its indexes instead of its data.
+    '''
+    if node_cache is None or node_cache is False:
+        return None
+    if node_cache is True:
+        node_cache = tpot2.utils.node_cache.NodeFitCache()
+    elif isinstance(node_cache, str):
+        node_cache = tpot2.utils.node_cache.NodeFitCache(path=node_cache)
+    else:
+        node_cache = copy.copy(node_cache)
+    node_cache.data_fingerprint = joblib.hash((X, y))
+    return node_cache
+
+
 def remove_underrepresented_classes(x, y, min_count):
     if isinstance(y, (np.ndarray, pd.Series)):
         unique, counts = np.unique(y, return_counts=True)
@@ -64,6 +64,7 @@ class TPOTEstimatorSteadyState(BaseEstimator):
                         n_jobs=1,
                         memory_limit = "4GB",
                         client = None,
+                        evaluator = "dask",
 
                         crossover_probability=.2,
                         mutate_probability=.7,
@@ -85,6 +86,16 @@ class TPOTEstimatorSteadyState(BaseEstimator):
                         processes = True,
 
                         scatter = True,
+                        data_transport = None,
+                        batch_eval_time_threshold = None,
+                        max_batch_size = 10,
+                        isolate_evaluations = False,
+                        evaluation_cache = None,
+                        evaluation_cache_max_entries = 100000,
+                        runtime_model = False,
+                        runtime_skip_factor = None,
+                        node_cache = None,
+                        data_local_scheduling = False,
 
                         optuna_optimize_pareto_front = False,
                         optuna_optimize_pareto_front_trials = 100,
@@ -295,6 +306,13 @@ class TPOTEstimatorSteadyState(BaseEstimator):
         
         client : dask.distributed.Client, default=None
             A dask client to use for parallelization. If not None, this will override the n_jobs and memory_limit parameters. If None, will create a new client with num_workers=n_jobs and memory_limit=memory_limit. 
+        
+        evaluator : str or tpot2.evaluators.BaseEvaluator, default="dask"
+            The backend used to evaluate pipelines in parallel. Ignored if client is not None.
+            - "dask" : Creates a dask LocalCluster with n_jobs workers and memory_limit.
+            - "process_pool" : Uses a tpot2.evaluators.ProcessPoolEvaluator with n_jobs processes. This starts much faster than a LocalCluster and 
+              the workers inherit X and y copy-on-write (where the fork start method is available). Only runs on the local machine and does not support optuna_optimize_pareto_front.
+            - A tpot2.evaluators.BaseEvaluator instance, which is used as is and not closed at the end of fit.
 
         crossover_probability : float, default=.2
             Probability of generating a new individual by crossover between two individuals.
@@ -384,6 +402,57 @@ class TPOTEstimatorSteadyState(BaseEstimator):
         processes : bool, default=True
             If True, will use multiprocessing to parallelize the optimization process. If False, will use threading.
             True seems to perform better. However, False is required for interactive debugging.
+
+        data_transport : str, default=None
+            How X and y are sent to the dask workers.
+            - None : The data is scattered to the workers by the evaluator (if scatter is True).
+            - "memmap" : The data is written once to a temporary .npy file. Workers open a read-only memory-mapped view of it.
+            - "shared_memory" : The data is copied once into a shared memory segment. Workers attach a read-only view of it.
+            "memmap" and "shared_memory" avoid copying the data into every worker process. They require all workers to run on the same machine.
+            Data that can not be shared (e.g. DataFrames with mixed or object dtypes) falls back to scatter.
+
+        batch_eval_time_threshold : float, default=None
+            If not None, pipelines whose evaluations have been observed to take less than this many seconds are packed together into a single
+            dask task so that each task takes roughly batch_eval_time_threshold seconds. This reduces the scheduling overhead when there are many
+            very fast evaluations (e.g. small datasets). Scores, timeouts and errors are still recorded per pipeline. If None, each pipeline is evaluated in its own task.
+
+        max_batch_size : int, default=10
+            Maximum number of pipelines packed into a single task when batch_eval_time_threshold is set.
+
+        isolate_evaluations : bool, default=False
+            If True, each pipeline evaluation runs in a forked child process. When an evaluation exceeds max_eval_time_seconds, the child is killed with SIGKILL 
+            so that the CPU is freed immediately, even if it is stuck in native code (e.g. xgboost, lightgbm or libsvm fits).
+            If False, timeouts are raised inside the running thread with func_timeout, which can not interrupt native code.
+            Adds a small overhead per evaluation. Requires os.fork (not available on Windows).
+            Forking a process that runs other threads (e.g. a dask worker with several threads) can leave the child deadlocked on a lock
+            that another thread held at the time of the fork. Such a child only stops when it is killed, so max_eval_time_seconds must be set.
+            Workers with a single thread (the default LocalCluster created with processes=True) avoid the problem.
+
+        evaluation_cache : str, default=None
+            Path to a SQLite file used as a persistent cache of pipeline scores. If not None, pipelines that were already evaluated 
+            in a previous run on the same data (X, y) with the same cv, scorers and objective functions are not evaluated again.
+            Only successful evaluations are cached. If None, no cache is used.
+
+        evaluation_cache_max_entries : int, default=100000
+            Maximum number of entries kept in evaluation_cache. The least recently used entries are removed first.
+
+        runtime_model : bool or tpot2.utils.runtime_model.RuntimeModel, default=False
+            If True, an online model predicts the evaluation time of each pipeline from its methods, hyperparameters and the size of the data,
+            trained on the pipelines evaluated so far. Pipelines are then submitted longest predicted time first, so that slow pipelines start early.
+            A RuntimeModel instance can be passed to reuse what it learned in previous runs on similar data.
+
+        runtime_skip_factor : float, default=None
+            If not None (and runtime_model is used), pipelines predicted to take more than runtime_skip_factor*max_eval_time_seconds are not evaluated
+            and are marked as "TIMEOUT".
+
+        node_cache : bool, str or tpot2.utils.node_cache.NodeFitCache, default=None
+            A content-addressed cache of fitted pipeline nodes that is shared by all the evaluations running on a worker. Nodes whose subgraph, hyperparameters and fold data
+            were already fit by another pipeline (e.g. the same StandardScaler -> PCA prefix on the same fold) are taken from the cache instead of being fit again.
+            If True, an in-memory cache is used. If a str, it is the folder of an on-disk tier that is shared by the workers on a machine. If None or False, no cache is used.
+
+        data_local_scheduling : bool, default=False
+            If True, each pipeline is preferably evaluated on the dask worker that evaluated its parent, which can reuse the fitted nodes of the parent from node_cache
+            (offspring share most of their subgraph with their parents). Each worker is only preferred by its share of the evaluations, so workers are not left idle.
             
         Attributes
         ----------
@@ -407,6 +476,7 @@ class TPOTEstimatorSteadyState(BaseEstimator):
             - Validation_Pareto_Front : The full pareto front calculated on the validation set. This is calculated for all pipelines with Pareto_Front equal to 0. Unlike the Pareto_Front which only calculates the frontier and the final population, the Validation Pareto Front is calculated for all pipelines tested on the validation set.
             
         pareto_front : The same pandas dataframe as evaluated individuals, but containing only the frontier pareto front pipelines.
+                        The frontier is maintained incrementally by the evolver (see tpot2.utils.pareto_archive.ParetoArchive) as evaluations complete.
         '''
 
         # sklearn BaseEstimator must have a corresponding attribute for each parameter.
@@ -445,6 +515,7 @@ class TPOTEstimatorSteadyState(BaseEstimator):
         self.n_jobs= n_jobs
         self.memory_limit = memory_limit
         self.client = client
+        self.evaluator = evaluator
 
         self.crossover_probability = crossover_probability
         self.mutate_probability = mutate_probability
@@ -467,6 +538,16 @@ class TPOTEstimatorSteadyState(BaseEstimator):
 
 
         self.scatter = scatter
+        self.data_transport = data_transport
+        self.batch_eval_time_threshold = batch_eval_time_threshold
+        self.max_batch_size = max_batch_size
+        self.isolate_evaluations = isolate_evaluations
+        self.evaluation_cache = evaluation_cache
+        self.evaluation_cache_max_entries = evaluation_cache_max_entries
+        self.runtime_model = runtime_model
+        self.runtime_skip_factor = runtime_skip_factor
+        self.node_cache = node_cache
+        self.data_local_scheduling = data_local_scheduling
 
         self.optuna_optimize_pareto_front = optuna_optimize_pareto_front
         self.optuna_optimize_pareto_front_trials = optuna_optimize_pareto_front_trials
@@ -530,9 +611,17 @@ class TPOTEstimatorSteadyState(BaseEstimator):
 
 
     def fit(self, X, y):
-        if self.client is not None: #If user passed in a client manually
-           _client = self.client
-        else:
+        if self.optuna_optimize_pareto_front and not (self.client is not None or self.evaluator == "dask" or isinstance(self.evaluator, tpot2.evaluators.DaskEvaluator)):
+            raise ValueError("optuna_optimize_pareto_front requires a dask client or the dask evaluator")
+
+        if self.isolate_evaluations and (self.max_eval_time_seconds is None or math.isinf(self.max_eval_time_seconds)):
+            raise ValueError("isolate_evaluations requires max_eval_time_seconds to be set")
+
+        if isinstance(self.evaluator, tpot2.evaluators.BaseEvaluator): #If user passed in an evaluator manually
+            _evaluator = self.evaluator
+        elif self.client is not None: #If user passed in a client manually
+            _evaluator = tpot2.evaluators.DaskEvaluator(self.client)
+        elif self.evaluator == "dask":
 
             if self.verbose >= 4:
                 silence_logs = 30
@@ -545,7 +634,9 @@ class TPOTEstimatorSteadyState(BaseEstimator):
                     processes=self.processes,
                     silence_logs=silence_logs,
                     memory_limit=self.memory_limit)
-            _client = Client(cluster)
+            _evaluator = tpot2.evaluators.DaskEvaluator(Client(cluster), cluster=cluster)
+        else:
+            _evaluator = tpot2.evaluators.EVALUATORS[self.evaluator](n_jobs=self.n_jobs)
 
 
         if self.classification and not self.disable_label_encoder and not check_if_y_is_encoded(y):
@@ -647,6 +738,8 @@ class TPOTEstimatorSteadyState(BaseEstimator):
         else:
             self.cv_gen = sklearn.model_selection.check_cv(self.cv, y, classifier=self.classification)
         
+        node_cache = create_node_cache(self.node_cache, X, y)
+
         def objective_function(pipeline_individual, 
                                             X, 
                                             y,
@@ -657,6 +750,7 @@ class TPOTEstimatorSteadyState(BaseEstimator):
                                             memory=self.memory, 
                                             cross_val_predict_cv=self.cross_val_predict_cv, 
                                             subset_column=self.subset_column, 
+                                            node_cache=node_cache,
                                             **kwargs): 
             return objective_function_generator(
                 pipeline_individual,
@@ -669,6 +763,7 @@ class TPOTEstimatorSteadyState(BaseEstimator):
                 memory=memory, 
                 cross_val_predict_cv=cross_val_predict_cv, 
                 subset_column=subset_column,
+                node_cache=node_cache,
                 **kwargs,
             )
 
@@ -682,207 +777,225 @@ class TPOTEstimatorSteadyState(BaseEstimator):
 
 
 
-        if self.scatter:
-            X_future = _client.scatter(X)
-            y_future = _client.scatter(y)
-        else:
-            X_future = X
-            y_future = y
-
-        #If warm start and we have an evolver instance, use the existing one
-        if not(self.warm_start and self._evolver_instance is not None):
-            self._evolver_instance = self._evolver(   individual_generator=self.individual_generator_instance, 
-                                            objective_functions= [objective_function],
-                                            objective_function_weights = self.objective_function_weights,
-                                            objective_names=self.objective_names,
-                                            bigger_is_better = self.bigger_is_better,
-                                            population_size= self.population_size,
-
-                                            initial_population_size = self._initial_population_size,
-                                            n_jobs=self.n_jobs,
-                                            verbose = self.verbose,
-                                            max_time_seconds =      self.max_time_seconds ,
-                                            max_eval_time_seconds = self.max_eval_time_seconds,
+        self._shared_data = []
+        evaluation_cache = None
+        try:
+            X_future = send_data_to_workers(X, _evaluator, scatter=self.scatter, data_transport=self.data_transport, shared_data_list=self._shared_data)
+            y_future = send_data_to_workers(y, _evaluator, scatter=self.scatter, data_transport=self.data_transport, shared_data_list=self._shared_data)
+
+            if self.evaluation_cache is not None:
+                evaluation_cache = create_evaluation_cache(self.evaluation_cache, X, y, max_entries=self.evaluation_cache_max_entries,
+                                                            scorers=self._scorers, cv=self.cv_gen, other_objective_functions=self.other_objective_functions,
+                                                            cross_val_predict_cv=self.cross_val_predict_cv, subset_column=self.subset_column, classification=self.classification)
+
+            if isinstance(self.runtime_model, tpot2.utils.runtime_model.RuntimeModel):
+                runtime_model = self.runtime_model
+            elif self.runtime_model:
+                runtime_model = tpot2.utils.runtime_model.RuntimeModel(n_samples=X.shape[0], n_features=X.shape[1])
+            else:
+                runtime_model = None
+
+            #If warm start and we have an evolver instance, use the existing one
+            if not(self.warm_start and self._evolver_instance is not None):
+                self._evolver_instance = self._evolver(   individual_generator=self.individual_generator_instance, 
+                                                objective_functions= [objective_function],
+                                                objective_function_weights = self.objective_function_weights,
+                                                objective_names=self.objective_names,
+                                                bigger_is_better = self.bigger_is_better,
+                                                population_size= self.population_size,
+
+                                                initial_population_size = self._initial_population_size,
+                                                n_jobs=self.n_jobs,
+                                                verbose = self.verbose,
+                                                max_time_seconds =      self.max_time_seconds ,
+                                                max_eval_time_seconds = self.max_eval_time_seconds,
                                             
                                             
 
-                                            periodic_checkpoint_folder = self.periodic_checkpoint_folder,
+                                                periodic_checkpoint_folder = self.periodic_checkpoint_folder,
 
 
-                                            early_stop_tol = self.early_stop_tol,
-                                            early_stop= self.early_stop,
-                                            early_stop_seconds =  self.early_stop_seconds,
+                                                early_stop_tol = self.early_stop_tol,
+                                                early_stop= self.early_stop,
+                                                early_stop_seconds =  self.early_stop_seconds,
                                             
-                                            budget_range = self.budget_range,
-                                            budget_scaling = self.budget_scaling,
-                                            individuals_until_end_budget = self.individuals_until_end_budget,
+                                                budget_range = self.budget_range,
+                                                budget_scaling = self.budget_scaling,
+                                                individuals_until_end_budget = self.individuals_until_end_budget,
 
 
-                                            stepwise_steps = self.stepwise_steps,
-                                            client = _client,
-                                            objective_kwargs = {"X": X_future, "y": y_future},
-                                            survival_selector=self.survival_selector,
-                                            parent_selector=self.parent_selector,
+                                                stepwise_steps = self.stepwise_steps,
+                                                evaluator = _evaluator,
+                                                objective_kwargs = {"X": X_future, "y": y_future},
+                                                survival_selector=self.survival_selector,
+                                                parent_selector=self.parent_selector,
 
-                                            crossover_probability = self.crossover_probability,
-                                            mutate_probability = self.mutate_probability,
-                                            mutate_then_crossover_probability= self.mutate_then_crossover_probability,
-                                            crossover_then_mutate_probability= self.crossover_then_mutate_probability,
+                                                crossover_probability = self.crossover_probability,
+                                                mutate_probability = self.mutate_probability,
+                                                mutate_then_crossover_probability= self.mutate_then_crossover_probability,
+                                                crossover_then_mutate_probability= self.crossover_then_mutate_probability,
                                             
 
-                                            max_evaluated_individuals = self.max_evaluated_individuals
-                                            )
+                                                max_evaluated_individuals = self.max_evaluated_individuals,
+
+                                                batch_eval_time_threshold = self.batch_eval_time_threshold,
+                                                max_batch_size = self.max_batch_size,
+                                                isolate_evaluations = self.isolate_evaluations,
+                                                evaluation_cache = evaluation_cache,
+                                                runtime_model = runtime_model,
+                                                runtime_skip_factor = self.runtime_skip_factor,
+                                                data_local_scheduling = self.data_local_scheduling,
+                                                )
 
         
-        self._evolver_instance.optimize()
-        #self._evolver_instance.population.update_pareto_fronts(self.objective_names, self.objective_function_weights)
-        self.make_evaluated_individuals()
+            self._evolver_instance.optimize()
+            #self._evolver_instance.population.update_pareto_fronts(self.objective_names, self.objective_function_weights)
+            self.make_evaluated_individuals()
 
 
-        if self.optuna_optimize_pareto_front:
-            pareto_front_inds = self.pareto_front['Individual'].values
-            all_graphs, all_scores = tpot2.individual_representations.graph_pipeline_individual.simple_parallel_optuna(pareto_front_inds,  objective_function, self.objective_function_weights, _client, storage=self.optuna_storage, steps=self.optuna_optimize_pareto_front_trials, verbose=self.verbose, max_eval_time_seconds=self.max_eval_time_seconds, max_time_seconds=self.optuna_optimize_pareto_front_timeout, **{"X": X, "y": y})
-            all_scores = tpot2.utils.eval_utils.process_scores(all_scores, len(self.objective_function_weights))
+            if self.optuna_optimize_pareto_front:
+                pareto_front_inds = self.pareto_front['Individual'].values
+                all_graphs, all_scores = tpot2.individual_representations.graph_pipeline_individual.simple_parallel_optuna(pareto_front_inds,  objective_function, self.objective_function_weights, _evaluator.client, storage=self.optuna_storage, steps=self.optuna_optimize_pareto_front_trials, verbose=self.verbose, max_eval_time_seconds=self.max_eval_time_seconds, max_time_seconds=self.optuna_optimize_pareto_front_timeout, **{"X": X, "y": y})
+                all_scores = tpot2.utils.eval_utils.process_scores(all_scores, len(self.objective_function_weights))
             
-            if len(all_graphs) > 0:
-                df = pd.DataFrame(np.column_stack((all_graphs, all_scores,np.repeat("Optuna",len(all_graphs)))), columns=["Individual"] + self.objective_names +["Parents"])
-                for obj in self.objective_names:
-                    df[obj] = df[obj].apply(convert_to_float)
+                if len(all_graphs) > 0:
+                    df = pd.DataFrame(np.column_stack((all_graphs, all_scores,np.repeat("Optuna",len(all_graphs)))), columns=["Individual"] + self.objective_names +["Parents"])
+                    for obj in self.objective_names:
+                        df[obj] = df[obj].apply(convert_to_float)
                 
-                self.evaluated_individuals = pd.concat([self.evaluated_individuals, df], ignore_index=True)
-            else:
-                print("WARNING NO OPTUNA TRIALS COMPLETED")
-        
-        tpot2.utils.get_pareto_frontier(self.evaluated_individuals, column_names=self.objective_names, weights=self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
-
-        if validation_strategy == 'reshuffled':
-            best_pareto_front_idx = list(self.pareto_front.index)
-            best_pareto_front = list(self.pareto_front.loc[best_pareto_front_idx]['Individual'])
+                    self.evaluated_individuals = pd.concat([self.evaluated_individuals, df], ignore_index=True)
+                    #the pareto archive of the evolver does not include the optuna trials
+                    tpot2.utils.get_pareto_frontier(self.evaluated_individuals, column_names=self.objective_names, weights=self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
+                else:
+                    print("WARNING NO OPTUNA TRIALS COMPLETED")
+
+            if validation_strategy == 'reshuffled':
+                best_pareto_front_idx = list(self.pareto_front.index)
+                best_pareto_front = list(self.pareto_front.loc[best_pareto_front_idx]['Individual'])
             
-            #reshuffle rows
-            X, y = sklearn.utils.shuffle(X, y, random_state=1)
-
-            if self.scatter:
-                X_future = _client.scatter(X)
-                y_future = _client.scatter(y)
-            else:
-                X_future = X
-                y_future = y
-
-            val_objective_function_list = [lambda   ind, 
-                                                    X, 
-                                                    y, 
-                                                    is_classification=self.classification,
-                                                    scorers= self._scorers, 
-                                                    cv=self.cv_gen, 
-                                                    other_objective_functions=self.other_objective_functions, 
-                                                    memory=self.memory, 
-                                                    cross_val_predict_cv=self.cross_val_predict_cv, 
-                                                    subset_column=self.subset_column, 
-                                                    **kwargs: objective_function_generator(
-                                                                                                ind,
-                                                                                                X,
-                                                                                                y, 
-                                                                                                is_classification=is_classification,
-                                                                                                scorers= scorers, 
-                                                                                                cv=cv, 
-                                                                                                other_objective_functions=other_objective_functions,
-                                                                                                memory=memory, 
-                                                                                                cross_val_predict_cv=cross_val_predict_cv, 
-                                                                                                subset_column=subset_column,
-                                                                                                **kwargs,
-                                                                                                )]
+                #reshuffle rows
+                X, y = sklearn.utils.shuffle(X, y, random_state=1)
+
+                X_future = send_data_to_workers(X, _evaluator, scatter=self.scatter, data_transport=self.data_transport, shared_data_list=self._shared_data)
+                y_future = send_data_to_workers(y, _evaluator, scatter=self.scatter, data_transport=self.data_transport, shared_data_list=self._shared_data)
+
+                val_objective_function_list = [lambda   ind, 
+                                                        X, 
+                                                        y, 
+                                                        is_classification=self.classification,
+                                                        scorers= self._scorers, 
+                                                        cv=self.cv_gen, 
+                                                        other_objective_functions=self.other_objective_functions, 
+                                                        memory=self.memory, 
+                                                        cross_val_predict_cv=self.cross_val_predict_cv, 
+                                                        subset_column=self.subset_column, 
+                                                        **kwargs: objective_function_generator(
+                                                                                                    ind,
+                                                                                                    X,
+                                                                                                    y, 
+                                                                                                    is_classification=is_classification,
+                                                                                                    scorers= scorers, 
+                                                                                                    cv=cv, 
+                                                                                                    other_objective_functions=other_objective_functions,
+                                                                                                    memory=memory, 
+                                                                                                    cross_val_predict_cv=cross_val_predict_cv, 
+                                                                                                    subset_column=subset_column,
+                                                                                                    **kwargs,
+                                                                                                    )]
             
-            objective_kwargs = {"X": X_future, "y": y_future}
-            val_scores = tpot2.utils.eval_utils.parallel_eval_objective_list(
-                best_pareto_front,
-                val_objective_function_list, n_jobs=self.n_jobs, verbose=self.verbose, timeout=self.max_eval_time_seconds,n_expected_columns=len(self.objective_names), client=_client, **objective_kwargs)
+                objective_kwargs = {"X": X_future, "y": y_future}
+                val_scores = tpot2.utils.eval_utils.parallel_eval_objective_list(
+                    best_pareto_front,
+                    val_objective_function_list, n_jobs=self.n_jobs, verbose=self.verbose, timeout=self.max_eval_time_seconds,n_expected_columns=len(self.objective_names), evaluator=_evaluator, isolate_evaluations=self.isolate_evaluations, **objective_kwargs)
 
-            val_objective_names = ['validation_'+name for name in self.objective_names]
-            self.objective_names_for_selection = val_objective_names
-            self.evaluated_individuals.loc[best_pareto_front_idx,val_objective_names] = val_scores
+                val_objective_names = ['validation_'+name for name in self.objective_names]
+                self.objective_names_for_selection = val_objective_names
+                self.evaluated_individuals.loc[best_pareto_front_idx,val_objective_names] = val_scores
 
-            self.evaluated_individuals["Validation_Pareto_Front"] = tpot2.utils.get_pareto_front(self.evaluated_individuals, val_objective_names, self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
+                self.evaluated_individuals["Validation_Pareto_Front"] = tpot2.utils.get_pareto_front(self.evaluated_individuals, val_objective_names, self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
 
-        elif validation_strategy == 'split':
+            elif validation_strategy == 'split':
 
 
-            if self.scatter:            
-                X_future = _client.scatter(X)
-                y_future = _client.scatter(y)
-                X_val_future = _client.scatter(X_val)
-                y_val_future = _client.scatter(y_val)
-            else:
-                X_future = X
-                y_future = y
-                X_val_future = X_val
-                y_val_future = y_val
+                X_future = send_data_to_workers(X, _evaluator, scatter=self.scatter, data_transport=self.data_transport, shared_data_list=self._shared_data)
+                y_future = send_data_to_workers(y, _evaluator, scatter=self.scatter, data_transport=self.data_transport, shared_data_list=self._shared_data)
+                X_val_future = send_data_to_workers(X_val, _evaluator, scatter=self.scatter, data_transport=self.data_transport, shared_data_list=self._shared_data)
+                y_val_future = send_data_to_workers(y_val, _evaluator, scatter=self.scatter, data_transport=self.data_transport, shared_data_list=self._shared_data)
 
-            objective_kwargs = {"X": X_future, "y": y_future, "X_val" : X_val_future, "y_val":y_val_future }
+                objective_kwargs = {"X": X_future, "y": y_future, "X_val" : X_val_future, "y_val":y_val_future }
             
-            best_pareto_front_idx = list(self.pareto_front.index)
-            best_pareto_front = list(self.pareto_front.loc[best_pareto_front_idx]['Individual'])
-            val_objective_function_list = [lambda   ind, 
-                                                    X, 
-                                                    y, 
-                                                    X_val, 
-                                                    y_val, 
-                                                    scorers= self._scorers, 
-                                                    other_objective_functions=self.other_objective_functions, 
-                                                    memory=self.memory, 
-                                                    cross_val_predict_cv=self.cross_val_predict_cv, 
-                                                    subset_column=self.subset_column, 
-                                                    **kwargs: val_objective_function_generator(
-                                                        ind,
-                                                        X,
-                                                        y,
+                best_pareto_front_idx = list(self.pareto_front.index)
+                best_pareto_front = list(self.pareto_front.loc[best_pareto_front_idx]['Individual'])
+                val_objective_function_list = [lambda   ind, 
+                                                        X, 
+                                                        y, 
                                                         X_val, 
                                                         y_val, 
-                                                        scorers= scorers, 
-                                                        other_objective_functions=other_objective_functions,
-                                                        memory=memory, 
-                                                        cross_val_predict_cv=cross_val_predict_cv, 
-                                                        subset_column=subset_column,
-                                                        **kwargs,
-                                                        )]
+                                                        scorers= self._scorers, 
+                                                        other_objective_functions=self.other_objective_functions, 
+                                                        memory=self.memory, 
+                                                        cross_val_predict_cv=self.cross_val_predict_cv, 
+                                                        subset_column=self.subset_column, 
+                                                        **kwargs: val_objective_function_generator(
+                                                            ind,
+                                                            X,
+                                                            y,
+                                                            X_val, 
+                                                            y_val, 
+                                                            scorers= scorers, 
+                                                            other_objective_functions=other_objective_functions,
+                                                            memory=memory, 
+                                                            cross_val_predict_cv=cross_val_predict_cv, 
+                                                            subset_column=subset_column,
+                                                            **kwargs,
+                                                            )]
             
-            val_scores = tpot2.utils.eval_utils.parallel_eval_objective_list(
-                best_pareto_front,
-                val_objective_function_list, n_jobs=self.n_jobs, verbose=self.verbose, timeout=self.max_eval_time_seconds,n_expected_columns=len(self.objective_names),client=_client, **objective_kwargs)
-
-            val_objective_names = ['validation_'+name for name in self.objective_names]
-            self.objective_names_for_selection = val_objective_names
-            self.evaluated_individuals.loc[best_pareto_front_idx,val_objective_names] = val_scores
-            self.evaluated_individuals["Validation_Pareto_Front"] = tpot2.utils.get_pareto_front(self.evaluated_individuals, val_objective_names, self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
-        else:
-            self.objective_names_for_selection = self.objective_names
+                val_scores = tpot2.utils.eval_utils.parallel_eval_objective_list(
+                    best_pareto_front,
+                    val_objective_function_list, n_jobs=self.n_jobs, verbose=self.verbose, timeout=self.max_eval_time_seconds,n_expected_columns=len(self.objective_names),evaluator=_evaluator, isolate_evaluations=self.isolate_evaluations, **objective_kwargs)
+
+                val_objective_names = ['validation_'+name for name in self.objective_names]
+                self.objective_names_for_selection = val_objective_names
+                self.evaluated_individuals.loc[best_pareto_front_idx,val_objective_names] = val_scores
+                self.evaluated_individuals["Validation_Pareto_Front"] = tpot2.utils.get_pareto_front(self.evaluated_individuals, val_objective_names, self.objective_function_weights, invalid_values=["TIMEOUT","INVALID"])
+            else:
+                self.objective_names_for_selection = self.objective_names
 
-        val_scores = self.evaluated_individuals[~self.evaluated_individuals[self.objective_names_for_selection].isin(["TIMEOUT","INVALID"]).any(axis=1)][self.objective_names_for_selection].astype(float)                                     
-        weighted_scores = val_scores*self.objective_function_weights
+            val_scores = self.evaluated_individuals[~self.evaluated_individuals[self.objective_names_for_selection].isin(["TIMEOUT","INVALID"]).any(axis=1)][self.objective_names_for_selection].astype(float)                                     
+            weighted_scores = val_scores*self.objective_function_weights
         
-        if self.bigger_is_better:
-            best_idx = weighted_scores[self.objective_names_for_selection[0]].idxmax()
-        else:
-            best_idx = weighted_scores[self.objective_names_for_selection[0]].idxmin()
+            if self.bigger_is_better:
+                best_idx = weighted_scores[self.objective_names_for_selection[0]].idxmax()
+            else:
+                best_idx = weighted_scores[self.objective_names_for_selection[0]].idxmin()
         
-        best_individual = self.evaluated_individuals.loc[best_idx]['Individual']
-        self.selected_best_score =  self.evaluated_individuals.loc[best_idx]
+            best_individual = self.evaluated_individuals.loc[best_idx]['Individual']
+            self.selected_best_score =  self.evaluated_individuals.loc[best_idx]
         
 
-        best_individual_pipeline = best_individual.export_pipeline(memory=self.memory, cross_val_predict_cv=self.cross_val_predict_cv, subset_column=self.subset_column)
+            best_individual_pipeline = best_individual.export_pipeline(memory=self.memory, cross_val_predict_cv=self.cross_val_predict_cv, subset_column=self.subset_column)
 
-        if self.preprocessing:
-            self.fitted_pipeline_ = sklearn.pipeline.make_pipeline(sklearn.base.clone(self._preprocessing_pipeline), best_individual_pipeline )
-        else:
-            self.fitted_pipeline_ = best_individual_pipeline 
+            if self.preprocessing:
+                self.fitted_pipeline_ = sklearn.pipeline.make_pipeline(sklearn.base.clone(self._preprocessing_pipeline), best_individual_pipeline )
+            else:
+                self.fitted_pipeline_ = best_individual_pipeline 
         
-        self.fitted_pipeline_.fit(X_original,y_original) #TODO use y_original as well?
+            self.fitted_pipeline_.fit(X_original,y_original) #TODO use y_original as well?
+        finally:
+            #free the memmap folders and shared memory segments even if fit raises
+            for shared in self._shared_data:
+                shared.close()
+            self._shared_data = []
+            #caches passed in by the user keep their memory tier for later fits
+            if node_cache is not None and not isinstance(self.node_cache, tpot2.utils.node_cache.NodeFitCache):
+                node_cache.close()
+            if evaluation_cache is not None:
+                evaluation_cache.close()
 
 
-        if self.client is None: #no client was passed in
-            #close cluster and client
-            _client.close()
-            cluster.close()
+        if self.client is None and not isinstance(self.evaluator, tpot2.evaluators.BaseEvaluator): #no client or evaluator was passed in
+            #close the evaluator we created
+            _evaluator.close()
 
         return self
         
@@ -901,32 +1014,40 @@ class TPOTEstimatorSteadyState(BaseEstimator):
 
 
     @available_if(_estimator_has('predict'))
-    def predict(self, X, **predict_params):
+    def predict(self, X, chunk_size=None, memory_budget=None, **predict_params):
         check_is_fitted(self)
         #X = check_array(X)
-        preds = self.fitted_pipeline_.predict(X,**predict_params)
+        preds = tpot2.utils.inference.predict_in_chunks(self.fitted_pipeline_, X, "predict", chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
         if self.classification and self.label_encoder_:
             preds = self.label_encoder_.inverse_transform(preds)
             
         return preds
     
     @available_if(_estimator_has('predict_proba'))
-    def predict_proba(self, X, **predict_params):
+    def predict_proba(self, X, chunk_size=None, memory_budget=None, **predict_params):
         check_is_fitted(self)
         #X = check_array(X)
-        return self.fitted_pipeline_.predict_proba(X,**predict_params)
+        return tpot2.utils.inference.predict_in_chunks(self.fitted_pipeline_, X, "predict_proba", chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
     
     @available_if(_estimator_has('decision_function'))
-    def decision_function(self, X, **predict_params):
+    def decision_function(self, X, chunk_size=None, memory_budget=None, **predict_params):
         check_is_fitted(self)
         #X = check_array(X)
-        return self.fitted_pipeline_.decision_function(X,**predict_params)
+        return tpot2.utils.inference.predict_in_chunks(self.fitted_pipeline_, X, "decision_function", chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
     
     @available_if(_estimator_has('transform'))
-    def transform(self, X, **predict_params):
+    def transform(self, X, chunk_size=None, memory_budget=None, **predict_params):
         check_is_fitted(self)
         #X = check_array(X)
-        return self.fitted_pipeline_.transform(X,**predict_params)
+        return tpot2.utils.inference.predict_in_chunks(self.fitted_pipeline_, X, "transform", chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
+
+    def iter_predict(self, batches, method="predict", chunk_size=None, memory_budget=None, **predict_params):
+        '''
+        Yields the output of the given method (e.g. "predict" or "predict_proba") for each batch from an iterable of batches, for scoring data that does not fit in memory.
+        Batches are split into blocks of chunk_size rows, or of the size that fits in memory_budget bytes (see tpot2.utils.inference.iter_predict).
+        '''
+        check_is_fitted(self)
+        return tpot2.utils.inference.iter_predict(self, batches, method=method, chunk_size=chunk_size, memory_budget=memory_budget, **predict_params)
 
     @property
     def classes_(self):
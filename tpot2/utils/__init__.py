@@ -1,2 +1,10 @@
 from . import eval_utils
+from . import shared_data
+from . import evaluation_cache
+from . import runtime_model
+from . import telemetry
+from . import profiler
+from . import pareto_archive
+from . import inference
+from . import node_cache
 from .utils import *
\ No newline at end of file
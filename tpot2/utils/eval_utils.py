@@ -8,6 +8,12 @@ import warnings
 from stopit import threading_timeoutable, TimeoutException
 from tpot2.selectors import survival_select_NSGA2
 import time
+import math
+import collections
+import os
+import pickle
+import select
+import signal
 import dask
 import stopit
 from dask.diagnostics import ProgressBar
@@ -15,6 +21,9 @@ from tqdm.dask import TqdmCallback
 from dask.distributed import progress
 
 import func_timeout
+from .shared_data import resolve_shared_data
+from . import telemetry
+from tpot2.evaluators import DaskEvaluator
 
 def process_scores(scores, n):
     '''
@@ -39,18 +48,110 @@ def process_scores(scores, n):
     return scores
 
 
+class EvaluationProcessTimeout(Exception):
+    pass
+
+
+def run_in_killable_process(func, timeout=None, args=(), kwargs=None):
+    '''
+    Runs func(*args, **kwargs) in a forked child process and returns the result.
+    If the child does not finish within timeout seconds, it is killed with SIGKILL and EvaluationProcessTimeout is raised.
+    Unlike func_timeout, this also stops native code (e.g. xgboost, lightgbm or libsvm fits) and immediately frees the CPU.
+
+    os.fork is used directly rather than multiprocessing because dask worker processes are daemonic and can not start multiprocessing children.
+    Only available on platforms with os.fork.
+
+    Only the calling thread is copied into the child. If another thread held a lock (e.g. of the allocator, logging or a BLAS thread pool)
+    at the time of the fork, the child can deadlock when it tries to take that lock. Always pass a timeout when other threads may be running,
+    so that such a child is killed.
+
+    Parameters
+    ----------
+    func : callable
+        The function to run. The child inherits it (and the arguments) from the parent, so they do not need to be picklable.
+        The return value must be picklable.
+    timeout : float, default=None
+        Number of seconds after which the child is killed. If None, wait until the child finishes.
+    args : list, default=()
+        Positional arguments for func.
+    kwargs : dict, default=None
+        Keyword arguments for func.
+    '''
+    if kwargs is None:
+        kwargs = {}
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0: #child
+        os.close(read_fd)
+        try:
+            try:
+                payload = pickle.dumps((True, func(*args, **kwargs)))
+            except Exception as e:
+                try:
+                    payload = pickle.dumps((False, e))
+                except Exception:
+                    payload = pickle.dumps((False, RuntimeError(f"{type(e).__name__}: {e}")))
+            with os.fdopen(write_fd, "wb") as f:
+                f.write(payload)
+        finally:
+            os._exit(0)
+
+    #parent
+    os.close(write_fd)
+    chunks = []
+    timed_out = False
+    deadline = None if timeout is None else time.time() + timeout
+    try:
+        while True:
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                timed_out = True
+                break
+            ready, _, _ = select.select([read_fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(read_fd, 1 << 16)
+            if not chunk: #the child closed the pipe
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(read_fd)
+        if timed_out:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        os.waitpid(pid, 0)
+
+    if timed_out:
+        raise EvaluationProcessTimeout(f"Evaluation did not finish within {timeout} seconds and was killed")
+    if len(chunks) == 0:
+        raise RuntimeError("Evaluation process exited without returning a result (it may have crashed or been killed)")
+
+    success, value = pickle.loads(b"".join(chunks))
+    if not success:
+        raise value
+    return value
+
+
 def objective_nan_wrapper(  individual, 
                             objective_function,
                             verbose=0,
                             timeout=None,
+                            isolate=False,
                             **objective_kwargs):
     with warnings.catch_warnings(record=True) as w:  #catches all warnings in w so it can be supressed by verbose                
         try:
             
-            if timeout is None:
+            if isolate and hasattr(os, "fork"):
+                value, child_record = run_in_killable_process(telemetry.call_and_return_record, timeout=timeout, args=[objective_function, individual], kwargs=objective_kwargs)
+                telemetry.merge_records(telemetry.get_current_record(), child_record)
+            elif timeout is None:
                 value = objective_function(individual, **objective_kwargs)
             else:
-                value = func_timeout.func_timeout(timeout, objective_function, args=[individual], kwargs=objective_kwargs)
+                #func_timeout runs the objective in a new thread, which needs to record into this thread's telemetry record
+                value = func_timeout.func_timeout(timeout, telemetry.call_with_record, args=[telemetry.get_current_record(), objective_function, individual], kwargs=objective_kwargs)
             
             if not isinstance(value, Iterable):
                 value = [value]               
@@ -59,7 +160,7 @@ def objective_nan_wrapper(  individual,
                 
                 warnings.warn(w[0].message)
             return value
-        except func_timeout.exceptions.FunctionTimedOut:
+        except (func_timeout.exceptions.FunctionTimedOut, EvaluationProcessTimeout):
             if verbose >= 4:
                 print(f'WARNING AN INDIVIDUAL TIMED OUT: \n {individual} \n')
             return ["TIMEOUT"]
@@ -72,10 +173,272 @@ def objective_nan_wrapper(  individual,
             return ["INVALID"]
         
 
-def eval_objective_list(ind, objective_list, verbose=0,**objective_kwargs):
+def eval_objective_list(ind, objective_list, verbose=0, return_telemetry=False, **objective_kwargs):
+    '''
+    Evaluates ind with each objective function in objective_list and concatenates the scores.
+
+    If return_telemetry is True, returns (scores, record), where record is a dict with the resource usage of the evaluation
+    (see tpot2.utils.telemetry.TELEMETRY_COLUMNS): the fit and score times and per-fold durations reported by the objective functions
+    (e.g. cross_val_score_objective), the peak RSS of the process in bytes and the worker that ran the evaluation.
+    The peak RSS is only recorded if the evaluation had its process to itself: it ran isolated (in a forked child), or no other evaluation
+    ran in the same process at the same time (see tpot2.utils.telemetry.measure_peak_rss). With threaded workers, it is often missing.
+    '''
+    #data shared through shared memory or memory-mapped files is passed as a lightweight handle
+    objective_kwargs = {key: resolve_shared_data(value) for key, value in objective_kwargs.items()}
+    if not return_telemetry:
+        return np.concatenate([objective_nan_wrapper(ind, obj, verbose,**objective_kwargs) for obj in objective_list ])
+
+    with telemetry.measure_peak_rss() as measurement, telemetry.recording() as record:
+        scores = np.concatenate([objective_nan_wrapper(ind, obj, verbose,**objective_kwargs) for obj in objective_list ])
+    #isolated evaluations report the peak of their own process, the peak of this process is only used if no other evaluation ran in it at the same time
+    if measurement["Peak RSS"] is not None:
+        record["Peak RSS"] = max(record.get("Peak RSS") or 0, measurement["Peak RSS"])
+    record["Worker"] = telemetry.get_worker_name()
+    return scores, record
+
+def combine_step_scores(step_scores, final_score_strategy="mean"):
+    '''
+    Combines the scores returned by evaluating each step (e.g. CV fold) of a single individual into one list of scores.
+
+    Parameters
+    ----------
+    step_scores : list of lists
+        The scores returned for each step, in step order. Objectives that are only computed on some of the steps
+        (e.g. the other_objective_functions of the TPOT estimators with fold_fanout) are nan on the other steps
+        and are combined over the steps that computed them.
+    final_score_strategy : str, default="mean"
+        "mean": The mean of the scores of all steps
+        "last": The scores of the last step
+
+    Returns
+    -------
+    list or np.ndarray
+        ["TIMEOUT"] if any step timed out, ["INVALID"] if any step failed, otherwise the combined scores.
+    '''
+    if any("TIMEOUT" in list(s) for s in step_scores):
+        return ["TIMEOUT"]
+    if any("INVALID" in list(s) for s in step_scores):
+        return ["INVALID"]
+
+    step_scores = np.array(step_scores, dtype=float)
+    computed = ~np.isnan(step_scores)
+    partial = np.flatnonzero(computed.any(axis=0) & ~computed.all(axis=0))
+    if final_score_strategy == 'mean':
+        combined = step_scores.mean(axis=0)
+        for col in partial:
+            combined[col] = step_scores[computed[:, col], col].mean()
+    elif final_score_strategy == 'last':
+        combined = step_scores[-1].copy()
+        for col in partial:
+            combined[col] = step_scores[computed[:, col], col][-1]
+    else:
+        raise ValueError(f"Unknown final_score_strategy: {final_score_strategy}")
+    return combined
+
+
+def eval_objective_list_batch(individual_list, objective_list, verbose=0, step_kwargs_list=None, **objective_kwargs):
+    '''
+    Evaluates several individuals one after another within a single task. Used to pack fast evaluations together so that
+    the scheduling overhead is paid once per batch rather than once per individual.
+
+    Each individual is evaluated with eval_objective_list, so timeouts and exceptions are still handled per individual.
+
+    Parameters
+    ----------
+    individual_list : list
+        The individuals to evaluate.
+    objective_list : list of callables
+        The objective functions passed to eval_objective_list.
+    verbose : int, default=0
+        Passed to eval_objective_list.
+    step_kwargs_list : list of dicts, default=None
+        Extra keyword arguments for each individual (e.g. the step to evaluate). Must be the same length as individual_list.
+    objective_kwargs : dict
+        Keyword arguments passed to the objective functions of every individual.
+
+    Returns
+    -------
+    list of tuples
+        A (scores, eval_time, record) tuple for each individual, where eval_time is the number of seconds the evaluation took
+        and record is the telemetry record of the evaluation (see eval_objective_list).
+    '''
+    if step_kwargs_list is None:
+        step_kwargs_list = [{} for _ in individual_list]
+
+    results = []
+    for individual, step_kwargs in zip(individual_list, step_kwargs_list):
+        start = time.time()
+        scores, record = eval_objective_list(individual, objective_list, verbose, return_telemetry=True, **objective_kwargs, **step_kwargs)
+        results.append((scores, time.time() - start, record))
+    return results
+
+
+def get_batch_size(eval_time_history, batch_eval_time_threshold=None, max_batch_size=1):
+    '''
+    Returns the number of evaluations to pack into a single task.
+
+    If the median of the observed evaluation times is below batch_eval_time_threshold, evaluations are packed so that
+    a single task takes roughly batch_eval_time_threshold seconds. Otherwise each evaluation is its own task.
+
+    Parameters
+    ----------
+    eval_time_history : list of floats or None
+        Observed evaluation times in seconds.
+    batch_eval_time_threshold : float, default=None
+        Evaluations faster than this are batched. If None, batching is disabled.
+    max_batch_size : int, default=1
+        Maximum number of evaluations in a single task.
+    '''
+    if batch_eval_time_threshold is None or max_batch_size is None or max_batch_size <= 1:
+        return 1
+    if eval_time_history is None or len(eval_time_history) == 0:
+        return 1
+
+    eval_time = np.median(eval_time_history)
+    if eval_time >= batch_eval_time_threshold:
+        return 1
+    return int(max(1, min(max_batch_size, int(batch_eval_time_threshold / max(eval_time, 1e-6)))))
+
+
+def submit_evaluation_tasks(individual_list,
+                            objective_list,
+                            evaluator,
+                            n_jobs=1,
+                            verbose=0,
+                            timeout=None,
+                            fold_fanout_steps=None,
+                            batch_eval_time_threshold=None,
+                            max_batch_size=1,
+                            eval_time_history=None,
+                            isolate_evaluations=False,
+                            runtime_model=None,
+                            runtime_skip_factor=None,
+                            preferred_workers=None,
+                            **objective_kwargs):
+    '''
+    Submits the evaluation tasks of individual_list to evaluator without waiting for them. See parallel_eval_objective_list for the parameters.
+
+    Returns
+    -------
+    batches : list of lists
+        The (individual, step_kwargs) tasks in each submitted batch. step_kwargs is {"step": step} when fold_fanout_steps is set, otherwise {}.
+    futures : list
+        The future of each batch. Use get_batch_scores to get the scores of a batch.
+    skipped : list
+        The individuals that were not submitted because their predicted evaluation time exceeds runtime_skip_factor*timeout.
+    '''
+    if isolate_evaluations and timeout is None:
+        raise ValueError("isolate_evaluations requires a timeout, since a forked evaluation can deadlock and is only stopped by killing it")
+
+    skipped = []
+    predicted_times = None
+    if preferred_workers is not None:
+        preferred_workers = dict(zip(map(id, individual_list), preferred_workers))
+    if runtime_model is not None and len(individual_list) > 0:
+        predicted_times = runtime_model.predict(individual_list, budget=objective_kwargs.get("budget", None))
+
+    if predicted_times is not None:
+        if runtime_skip_factor is not None and timeout is not None:
+            skipped = [ind for ind, t in zip(individual_list, predicted_times) if t > runtime_skip_factor*timeout]
+            if verbose >= 4:
+                for individual in skipped:
+                    print(f'WARNING AN INDIVIDUAL WAS SKIPPED BECAUSE ITS PREDICTED EVALUATION TIME IS TOO LONG: \n {individual} \n')
+        #longest processing time first, so that slow evaluations do not end up running alone at the end
+        order = [i for i in np.argsort(-predicted_times, kind="stable") if runtime_skip_factor is None or timeout is None or predicted_times[i] <= runtime_skip_factor*timeout]
+        individual_list = [individual_list[i] for i in order]
+
+    if fold_fanout_steps is None:
+        tasks = [(individual, {}) for individual in individual_list]
+    else:
+        tasks = [(individual, {"step":step}) for individual in individual_list for step in range(fold_fanout_steps)]
+
+    batch_size = get_batch_size(eval_time_history, batch_eval_time_threshold=batch_eval_time_threshold, max_batch_size=max_batch_size)
+    #don't make batches so large that some workers get nothing to do
+    batch_size = max(1, min(batch_size, math.ceil(len(tasks) / max(1, n_jobs))))
+    if preferred_workers is None:
+        batches = [tasks[i:i+batch_size] for i in range(0, len(tasks), batch_size)]
+        batch_workers = [None for _ in batches]
+    else:
+        batches, batch_workers = group_tasks_by_worker(tasks, [preferred_workers[id(individual)] for individual, _ in tasks], batch_size, max_tasks_per_worker=math.ceil(len(tasks) / max(1, n_jobs)))
+
+    futures = []
+    for batch, worker in zip(batches, batch_workers):
+        args = (eval_objective_list_batch, [ind for ind, _ in batch],  objective_list, verbose)
+        kwargs = dict(step_kwargs_list=[step_kwargs for _, step_kwargs in batch], timeout=timeout, isolate=isolate_evaluations, **objective_kwargs)
+        if worker is None:
+            futures.append(evaluator.submit(*args, **kwargs))
+        else:
+            futures.append(evaluator.submit_to(worker, *args, **kwargs))
+    return batches, futures, skipped
+
+
+def group_tasks_by_worker(tasks, workers, batch_size, max_tasks_per_worker=None):
+    '''
+    Packs tasks into batches of up to batch_size tasks that all prefer the same worker (or no worker), ordered by their first task.
+    So that one busy lineage does not pile all its tasks onto one worker, only the first max_tasks_per_worker tasks of each worker keep their preference.
+
+    Returns
+    -------
+    batches : list of lists
+        The tasks of each batch.
+    batch_workers : list
+        The preferred worker of each batch, or None.
+    '''
+    n_tasks = collections.Counter()
+    open_batches = {}
+    batches = []
+    batch_workers = []
+    for task, worker in zip(tasks, workers):
+        if worker is not None:
+            n_tasks[worker] += 1
+            if max_tasks_per_worker is not None and n_tasks[worker] > max_tasks_per_worker:
+                worker = None
+        if worker not in open_batches or len(batches[open_batches[worker]]) >= batch_size:
+            open_batches[worker] = len(batches)
+            batches.append([])
+            batch_workers.append(worker)
+        batches[open_batches[worker]].append(task)
+    return batches, batch_workers
+
+
+def get_batch_scores(batch, future, verbose=0, eval_time_history=None, runtime_model=None, budget=None):
+    '''
+    Returns a (scores, record) tuple for each task in batch, where record is the telemetry record of the evaluation (None if the task did not finish).
+    If the future is not done, it is cancelled and all tasks are marked as "TIMEOUT".
+    If the future was cancelled or raised an exception, all tasks are marked as "INVALID".
+    If eval_time_history is not None, the evaluation times of the tasks that did not time out are appended to it.
+    If runtime_model is not None, the evaluation time of each task is added to it.
+    '''
+    if not future.done():
+        future.cancel()
+        if verbose >= 4:
+            for individual, _ in batch:
+                print(f'WARNING AN INDIVIDUAL TIMED OUT (Fallback): \n {individual} \n')
+        return [(["TIMEOUT"], None) for _ in batch]
+    elif future.cancelled():
+        if verbose == 4:
+            for individual, _ in batch:
+                print(f'WARNING THIS INDIVIDUAL WAS CANCELED BY DASK (likely memory issue) \n {individual}')
+        return [(["INVALID"], None) for _ in batch]
+    elif future.exception():
+        if verbose == 4:
+            for individual, _ in batch:
+                print(f'WARNING THIS INDIVIDUAL CAUSED AND EXCEPTION (Future) \n {individual} \n {future.exception()} \n')
+        if verbose >= 5:
+            trace = "".join(traceback.format_exception(future.exception()))
+            for individual, _ in batch:
+                print(f'WARNING THIS INDIVIDUAL CAUSED AND EXCEPTION (Future) \n {individual} \n {future.exception()} \n {trace}')
+        return [(["INVALID"], None) for _ in batch]
+
+    batch_scores = []
+    for (individual, _), (scores, eval_time, record) in zip(batch, future.result()):
+        batch_scores.append((scores, record))
+        if eval_time_history is not None and "TIMEOUT" not in list(scores):
+            eval_time_history.append(eval_time)
+        if runtime_model is not None:
+            runtime_model.add(individual, eval_time, budget=budget)
+    return batch_scores
 
-    scores = np.concatenate([objective_nan_wrapper(ind, obj, verbose,**objective_kwargs) for obj in objective_list ])
-    return scores
 
 def parallel_eval_objective_list(individual_list,
                                 objective_list,
@@ -85,7 +448,48 @@ def parallel_eval_objective_list(individual_list,
                                 n_expected_columns=None,
                                 client=None,
                                 parallel_timeout=None,
+                                fold_fanout_steps=None,
+                                final_score_strategy="mean",
+                                batch_eval_time_threshold=None,
+                                max_batch_size=1,
+                                eval_time_history=None,
+                                evaluator=None,
+                                isolate_evaluations=False,
+                                runtime_model=None,
+                                runtime_skip_factor=None,
+                                return_telemetry=False,
+                                preferred_workers=None,
                                 **objective_kwargs):
+    '''
+    Evaluates each individual in individual_list with the objectives in objective_list on the dask client.
+
+    If fold_fanout_steps is an int, each (individual, step) pair is submitted as its own task with step passed to the objective functions
+    (for the TPOT estimators, step is the CV fold to evaluate). The step scores of each individual are then gathered
+    and combined with final_score_strategy. Each step is given the full timeout. If any step times out or fails, the individual is
+    marked as "TIMEOUT" or "INVALID" respectively.
+
+    If batch_eval_time_threshold is set, evaluations that are observed to take less than batch_eval_time_threshold seconds 
+    (see get_batch_size) are packed into tasks of up to max_batch_size evaluations. Batches are never made so large that workers are left idle.
+    Scores are still returned per individual. eval_time_history is a list (or deque) of observed evaluation times
+    that is used to pick the batch size and is extended with the evaluation times of this call.
+
+    The tasks are run on evaluator (a tpot2.evaluators.BaseEvaluator). If evaluator is None, a DaskEvaluator is used with client,
+    or with the current dask client if client is also None.
+
+    If isolate_evaluations is True, each evaluation runs in a forked child process that is killed when it exceeds timeout (see run_in_killable_process).
+    Since a child forked from a multithreaded worker can deadlock, timeout is required with isolate_evaluations.
+
+    If runtime_model (a tpot2.utils.runtime_model.RuntimeModel) is given, individuals are submitted in order of decreasing predicted evaluation time
+    (longest processing time first), which shortens the time until the last evaluation finishes. The model is updated with the observed evaluation times.
+    If runtime_skip_factor is also set, individuals predicted to take more than runtime_skip_factor*timeout seconds are not submitted and are marked as "TIMEOUT".
+
+    If return_telemetry is True, returns (scores, records), where records holds the telemetry record of each individual (see eval_objective_list),
+    or None for individuals whose evaluation did not finish. With fold_fanout_steps, the records of the steps are merged.
+
+    If preferred_workers is given (one worker address or None per individual, e.g. from tpot2.utils.telemetry.get_lineage_workers), the tasks of each individual
+    are submitted with a loose restriction to its worker (see BaseEvaluator.submit_to), so that they can reuse what that worker has cached (e.g. with node_cache).
+    Each worker is preferred by at most its share (len(tasks)/n_jobs) of the tasks, the rest go to any worker. Batches only hold tasks with the same preferred worker.
+    '''
 
     #offspring_scores = Parallel(n_jobs=n_jobs)(delayed(eval_objective_list)(ind,  objective_list, verbose, timeout=timeout)  for ind in individual_list )
     
@@ -94,48 +498,45 @@ def parallel_eval_objective_list(individual_list,
     #     offspring_scores = list(dask.compute( *delayed_values,
     #                             num_workers=n_jobs))
     # del delayed_values
-    if client is None:
-        client = dask.distributed.get_client()
-    futures = [client.submit(eval_objective_list, ind,  objective_list, verbose, timeout=timeout,**objective_kwargs)  for ind in individual_list]
+    if evaluator is None:
+        if client is None:
+            client = dask.distributed.get_client()
+        evaluator = DaskEvaluator(client)
+
+    individual_list = list(individual_list)
+    batches, futures, _ = submit_evaluation_tasks(individual_list, objective_list, evaluator, n_jobs=n_jobs, verbose=verbose, timeout=timeout, 
+                                                fold_fanout_steps=fold_fanout_steps, batch_eval_time_threshold=batch_eval_time_threshold, max_batch_size=max_batch_size,
+                                                eval_time_history=eval_time_history, isolate_evaluations=isolate_evaluations, 
+                                                runtime_model=runtime_model, runtime_skip_factor=runtime_skip_factor, preferred_workers=preferred_workers, **objective_kwargs)
     
-    if verbose >= 6:
+    if verbose >= 6 and isinstance(evaluator, DaskEvaluator):
         dask.distributed.progress(futures, notebook=False)
     
-    try: 
-        if parallel_timeout is not None and np.isinf(parallel_timeout):
-            parallel_timeout = None
-        dask.distributed.wait(futures, timeout=parallel_timeout)
-    except dask.distributed.TimeoutError:
+    if parallel_timeout is not None and np.isinf(parallel_timeout):
+        parallel_timeout = None
+    if not evaluator.wait(futures, timeout=parallel_timeout):
         print("terminating parallel evaluation due to timeout")
-        pass
-    except dask.distributed.CancelledError:
-        print("dask.distributed.CancelledError")
     
-    offspring_scores = []
-    # todo optimize this
-    for individual, future in zip(individual_list, futures):
-        if not future.done():
-            future.cancel()
-            offspring_scores.append(["TIMEOUT"])
-            if verbose >= 4:
-                print(f'WARNING AN INDIVIDUAL TIMED OUT (Fallback): \n {individual} \n')
-        elif future.exception():
-            offspring_scores.append(["INVALID"])
-            if verbose == 4:
-                print(f'WARNING THIS INDIVIDUAL CAUSED AND EXCEPTION (Dask Future) \n {individual} \n {future.exception()} \n')
-            if verbose >= 5:
-                print(f'WARNING THIS INDIVIDUAL CAUSED AND EXCEPTION (Dask Future) \n {individual} \n {future.exception()} \n {future.traceback()}')
-        elif future.cancelled():
-            offspring_scores.append(["INVALID"])
-            if verbose == 4:
-                print(f'WARNING THIS INDIVIDUAL WAS CANCELED BY DASK (likely memory issue) \n {individual}')
+    #tasks may have been reordered or skipped, so match the scores back to the individuals
+    task_results = {}
+    for batch, future in zip(batches, futures):
+        batch_results = get_batch_scores(batch, future, verbose=verbose, eval_time_history=eval_time_history, runtime_model=runtime_model, budget=objective_kwargs.get("budget", None))
+        for (individual, step_kwargs), result in zip(batch, batch_results):
+            task_results[(id(individual), step_kwargs.get("step", None))] = result
 
-        else:
-            offspring_scores.append(future.result())
+    steps = [None] if fold_fanout_steps is None else range(fold_fanout_steps)
+    results = [task_results.get((id(individual), step), (["TIMEOUT"], None)) for individual in individual_list for step in steps]
+    offspring_scores = [scores for scores, _ in results]
+    records = [record for _, record in results]
             
+    if fold_fanout_steps is not None:
+        offspring_scores = [combine_step_scores(offspring_scores[i:i+fold_fanout_steps], final_score_strategy=final_score_strategy) for i in range(0, len(offspring_scores), fold_fanout_steps)]
+        records = [telemetry.combine_records(records[i:i+fold_fanout_steps]) for i in range(0, len(records), fold_fanout_steps)]
 
     if n_expected_columns is not None:
         offspring_scores = process_scores(offspring_scores, n_expected_columns)
+    if return_telemetry:
+        return offspring_scores, records
     return offspring_scores
 
 
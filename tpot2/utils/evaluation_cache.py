@@ -0,0 +1,168 @@
+import json
+import time
+import sqlite3
+import joblib
+import numpy as np
+
+
+def get_data_fingerprint(**kwargs):
+    '''
+    Returns a hash of the keyword arguments (e.g. X, y, cv and scorers) that is the same across python sessions.
+    Used as the context of an EvaluationCache so that cached scores are only reused when the data and the evaluation setup are the same.
+    '''
+    return joblib.hash(kwargs)
+
+
+def apply_evaluation_cache(population, cache, individuals, objective_names, budget=None, verbose=0):
+    '''
+    Fills in the scores (and the "Budget" and "Completed Timestamp" columns) of the individuals that are found in cache.
+
+    Parameters
+    ----------
+    population : tpot2.Population
+        The population that holds the individuals.
+    cache : EvaluationCache
+        The cache to look the individuals up in.
+    individuals : list
+        The individuals to look up.
+    objective_names : list of str
+        The columns the cached scores are written to. Cached scores with a different number of objectives are ignored.
+    budget : float, default=None
+        The budget the individuals are evaluated with.
+    verbose : int, default=0
+        If at least 4, prints the number of cache hits.
+
+    Returns
+    -------
+    remaining : list
+        The individuals that were not found in the cache and still need to be evaluated.
+    hit_individuals : list
+        The individuals that were found in the cache.
+    hit_scores : list
+        The cached scores of each of hit_individuals.
+    '''
+    cached_scores = cache.get(individuals, budget=budget)
+    hits = [i for i, scores in enumerate(cached_scores) if scores is not None and len(scores) == len(objective_names)]
+    if len(hits) == 0:
+        return individuals, [], []
+
+    hit_individuals = [individuals[i] for i in hits]
+    hit_scores = [cached_scores[i] for i in hits]
+    population.update_column(hit_individuals, column_names=objective_names, data=hit_scores)
+    if budget is not None:
+        population.update_column(hit_individuals, column_names="Budget", data=budget)
+    population.update_column(hit_individuals, column_names="Completed Timestamp", data=time.time())
+
+    if verbose >= 4:
+        print(f"Loaded {len(hits)} evaluations from the evaluation cache")
+
+    hits = set(hits)
+    remaining = [ind for i, ind in enumerate(individuals) if i not in hits]
+    return remaining, hit_individuals, hit_scores
+
+
+class EvaluationCache():
+    '''
+    An on-disk cache of evaluation scores that persists between runs. Stored in a SQLite database.
+
+    Scores are keyed by the stable key of the individual (see GraphKey.stable_key), the context (e.g. a fingerprint of the data and the CV/scorer setup,
+    see get_data_fingerprint) and the budget. Only scores that are all numeric are stored; "TIMEOUT" and "INVALID" results are always re-evaluated.
+
+    Parameters
+    ----------
+    path : str
+        Path to the SQLite database file. Created if it does not exist. Several runs (with different contexts) can share the same file.
+    context : str, default=""
+        Identifies the data and the evaluation setup. Scores stored with one context are never returned for another.
+    max_entries : int, default=100000
+        Maximum number of entries kept in the database. When exceeded, the least recently used entries are removed.
+    '''
+    def __init__(self, path, context="", max_entries=100000):
+        self.path = path
+        self.context = context
+        self.max_entries = max_entries
+        self._connection = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS evaluations (key TEXT PRIMARY KEY, scores TEXT NOT NULL, last_access REAL NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS evaluations_last_access ON evaluations (last_access)")
+            self._connection.commit()
+        return self._connection
+
+    def _key(self, individual, budget=None):
+        stable_key = individual.unique_id().stable_key()
+        if stable_key is None:
+            return None
+        return f"{stable_key}|{self.context}|{budget}"
+
+    def get(self, individuals, budget=None):
+        '''
+        Returns a list with the cached scores of each individual, or None for individuals that are not in the cache.
+        Individuals without a stable key (e.g. with a lambda hyperparameter) are never found.
+        '''
+        keys = [self._key(ind, budget) for ind in individuals]
+        lookup_keys = [key for key in keys if key is not None]
+        found = {}
+        #sqlite limits the number of parameters in a single query
+        for i in range(0, len(lookup_keys), 500):
+            chunk = lookup_keys[i:i+500]
+            rows = self.connection.execute(f"SELECT key, scores FROM evaluations WHERE key IN ({','.join('?'*len(chunk))})", chunk).fetchall()
+            found.update({key: json.loads(scores) for key, scores in rows})
+
+        if len(found) > 0:
+            now = time.time()
+            self.connection.executemany("UPDATE evaluations SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+            self.connection.commit()
+
+        return [found.get(key) for key in keys]
+
+    def put(self, individuals, scores, budget=None):
+        '''
+        Stores the scores of each individual. Scores that are not all numeric (e.g. "TIMEOUT" or "INVALID") and individuals without a stable key are skipped.
+        '''
+        now = time.time()
+        rows = []
+        for ind, ind_scores in zip(individuals, scores):
+            key = self._key(ind, budget)
+            if key is None:
+                continue
+            try:
+                ind_scores = [float(s) for s in ind_scores]
+            except (TypeError, ValueError):
+                continue
+            if any(np.isnan(ind_scores)):
+                continue
+            rows.append((key, json.dumps(ind_scores), now))
+
+        if len(rows) == 0:
+            return
+
+        self.connection.executemany("INSERT OR REPLACE INTO evaluations (key, scores, last_access) VALUES (?, ?, ?)", rows)
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        '''
+        Removes the least recently used entries until there are at most max_entries.
+        '''
+        if self.max_entries is None:
+            return
+        n_entries = self.connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+        if n_entries > self.max_entries:
+            self.connection.execute("DELETE FROM evaluations WHERE key IN (SELECT key FROM evaluations ORDER BY last_access ASC LIMIT ?)", (n_entries - self.max_entries,))
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
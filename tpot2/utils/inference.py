@@ -0,0 +1,113 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+#number of rows used to measure the memory used per row when only a memory budget is given
+PROBE_ROWS = 1024
+
+
+def _num_rows(X):
+    return X.shape[0] if hasattr(X, "shape") else len(X)
+
+
+def _rows(X, start, stop):
+    if isinstance(X, (pd.DataFrame, pd.Series)):
+        return X.iloc[start:stop]
+    return X[start:stop]
+
+
+def _concatenate(outputs):
+    if len(outputs) == 1:
+        return outputs[0]
+    if isinstance(outputs[0], (pd.DataFrame, pd.Series)):
+        return pd.concat(outputs)
+    if sparse.issparse(outputs[0]):
+        return sparse.vstack(outputs, format="csr")
+    return np.concatenate(outputs, axis=0)
+
+
+def _traced_call(function, X):
+    #returns the output of function(X) and the peak memory allocated during the call
+    was_tracing = tracemalloc.is_tracing()
+    if was_tracing:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+    else:
+        tracemalloc.start()
+        start = 0
+    try:
+        output = function(X)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return output, peak - start
+
+
+def _predict_chunks(function, X, chunk_size=None, memory_budget=None):
+    '''
+    Calls function on consecutive row blocks of X and returns the list of outputs and the chunk size used.
+    If only memory_budget is given, the first PROBE_ROWS rows are run with tracemalloc to measure the bytes allocated per row,
+    and the chunk size is the number of rows that fit in memory_budget.
+    '''
+    n_rows = _num_rows(X)
+    outputs = []
+    start = 0
+    if chunk_size is None:
+        probe = min(n_rows, PROBE_ROWS)
+        output, peak = _traced_call(function, _rows(X, 0, probe))
+        outputs.append(output)
+        start = probe
+        chunk_size = max(1, int(memory_budget // max(1, peak / max(1, probe))))
+
+    for chunk_start in range(start, n_rows, chunk_size):
+        outputs.append(function(_rows(X, chunk_start, chunk_start+chunk_size)))
+    return outputs, chunk_size
+
+
+def predict_in_chunks(estimator, X, method="predict", chunk_size=None, memory_budget=None, **predict_params):
+    '''
+    Calls the given method of a fitted estimator on row blocks of X and concatenates the outputs, so that the intermediate outputs
+    of a pipeline are only held for one block at a time.
+
+    Parameters
+    ----------
+    estimator : estimator
+        A fitted estimator, e.g. a GraphPipeline, a sklearn Pipeline or a fitted TPOTEstimator.
+    X : array-like, sparse matrix or pandas DataFrame
+        The rows to predict.
+    method : str, default="predict"
+        The method of the estimator to call, e.g. "predict", "predict_proba", "decision_function" or "transform".
+    chunk_size : int, default=None
+        The number of rows per block.
+    memory_budget : int, default=None
+        The approximate number of bytes a block may allocate. Used to choose the chunk size if chunk_size is None.
+        The bytes allocated per row are measured on the first block.
+    predict_params : dict
+        Passed to the method for each block.
+
+    Returns
+    -------
+    The outputs of the method for all rows of X. If neither chunk_size nor memory_budget is given, the method is called once on X.
+    '''
+    function = lambda X_chunk: getattr(estimator, method)(X_chunk, **predict_params)
+    if chunk_size is None and memory_budget is None:
+        return function(X)
+    outputs, _ = _predict_chunks(function, X, chunk_size=chunk_size, memory_budget=memory_budget)
+    return _concatenate(outputs)
+
+
+def iter_predict(estimator, batches, method="predict", chunk_size=None, memory_budget=None, **predict_params):
+    '''
+    Generator version of predict_in_chunks for data that does not fit in memory. Yields the output of the method for each batch from an iterable of batches
+    (e.g. chunks read with pandas.read_csv(chunksize=...)). Batches larger than chunk_size rows, or than memory_budget allows, are also split into blocks.
+    With a memory_budget, the chunk size is measured on the first batch and reused for the others.
+    '''
+    function = lambda X_chunk: getattr(estimator, method)(X_chunk, **predict_params)
+    for batch in batches:
+        if chunk_size is None and memory_budget is None:
+            yield function(batch)
+        else:
+            outputs, chunk_size = _predict_chunks(function, batch, chunk_size=chunk_size, memory_budget=memory_budget)
+            yield _concatenate(outputs)
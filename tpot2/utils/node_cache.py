@@ -0,0 +1,232 @@
+import os
+import uuid
+import pickle
+import threading
+import contextlib
+import collections
+import joblib
+import tpot2
+
+
+#memory tiers of the node caches used in this process, keyed by the id of the cache.
+#NodeFitCache objects only pickle their settings, so every copy of a cache that is sent to a worker (e.g. with each evaluation) shares one memory tier per worker process.
+#Only the most recently used few are kept, so that long lived workers do not hold on to the tiers of old runs.
+_memory_tiers = collections.OrderedDict()
+_memory_tiers_lock = threading.Lock()
+_MAX_MEMORY_TIERS = 2
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def data_fingerprint(fingerprint):
+    '''
+    Context manager that makes fingerprint the fingerprint of the data that GraphPipelines are fit on in this thread (e.g. one CV fold),
+    so that fit_sklearn_digraph does not hash the data itself for every pipeline.
+    '''
+    previous = get_data_fingerprint()
+    _local.fingerprint = fingerprint
+    try:
+        yield fingerprint
+    finally:
+        _local.fingerprint = previous
+
+
+def get_data_fingerprint():
+    '''
+    Returns the fingerprint set with data_fingerprint in this thread, or None.
+    '''
+    return getattr(_local, "fingerprint", None)
+
+
+class _MemoryTier():
+    #least recently used cache of pickled entries, limited by the total number of bytes
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.n_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        #total size of the disk tier as seen by this process, None until the folder is first scanned
+        self.disk_bytes = None
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, entry):
+        if len(entry) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.n_bytes -= len(self.entries.pop(key))
+            self.entries[key] = entry
+            self.n_bytes += len(entry)
+            while self.n_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.n_bytes -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.n_bytes = 0
+
+
+def node_key(instance, child_keys=None, data_fingerprint=None, **fit_settings):
+    '''
+    Returns the content address of a node of a graph: a hash of the type and hyperparameters of its estimator, the settings it is fit with
+    (e.g. the subset indexes or the cross_val_predict_cv of inner classifiers), and either the keys of its ordered children or, for leaves, the fingerprint of the data.
+    Since the keys of the children are hashed recursively, the key covers the whole subgraph below the node.
+    '''
+    return joblib.hash((type(instance).__module__, type(instance).__qualname__, instance.get_params(deep=True), fit_settings, child_keys, data_fingerprint))
+
+
+class NodeFitCache():
+    '''
+    A content-addressed cache of the fitted estimators and fit outputs of the nodes of GraphPipelines, so that identical subgraphs fit on the
+    same data (e.g. the same StandardScaler -> PCA prefix on the same fold in different pipelines) are only fit once.
+    Entries are keyed by node_key, so an entry is only reused for the same subgraph, hyperparameters, data and subsets.
+
+    Entries are kept in an in-memory least recently used tier, and optionally in an on-disk tier in path.
+    The memory tier is shared by all copies of the cache in a process (e.g. all the evaluations running on a dask worker).
+    The disk tier can be shared by all the processes on a machine. Entries are pickled, so every hit returns new copies of the estimator and output.
+    Each process counts the bytes it writes to the disk tier and only scans the folder to evict files once its count exceeds max_disk_bytes.
+
+    Parameters
+    ----------
+    max_memory_bytes : int, default=1e9
+        The maximum total size of the pickled entries in the memory tier of each process. Entries larger than this are not kept in memory.
+    path : str, default=None
+        Folder of the disk tier. Created if it does not exist. If None, there is no disk tier.
+    max_disk_bytes : int, default=1e10
+        The maximum total size of the files in path. When exceeded, the least recently used files are removed.
+    data_fingerprint : str, default=None
+        A fingerprint of the training data (e.g. from joblib.hash), used by the TPOT estimators to fingerprint each CV fold without hashing its data.
+    '''
+    def __init__(self, max_memory_bytes=1e9, path=None, max_disk_bytes=1e10, data_fingerprint=None):
+        self.max_memory_bytes = max_memory_bytes
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self.data_fingerprint = data_fingerprint
+        self.cache_id = uuid.uuid4().hex
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    @property
+    def memory(self):
+        with _memory_tiers_lock:
+            if self.cache_id not in _memory_tiers:
+                _memory_tiers[self.cache_id] = _MemoryTier(self.max_memory_bytes)
+                while len(_memory_tiers) > _MAX_MEMORY_TIERS:
+                    _memory_tiers.popitem(last=False)
+            _memory_tiers.move_to_end(self.cache_id)
+            return _memory_tiers[self.cache_id]
+
+    def close(self):
+        '''
+        Releases the memory tier of this process. The disk tier is kept.
+        '''
+        with _memory_tiers_lock:
+            _memory_tiers.pop(self.cache_id, None)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.pkl")
+
+    def get(self, key):
+        '''
+        Returns a (fitted estimator, fit output) tuple for key, or None if it is not in the cache.
+        '''
+        memory = self.memory
+        entry = memory.get(key)
+        if entry is not None:
+            memory.hits += 1
+            return pickle.loads(entry)
+
+        if self.path is not None:
+            try:
+                with open(self._file(key), "rb") as f:
+                    entry = f.read()
+                os.utime(self._file(key))
+            except OSError:
+                entry = None
+            if entry is not None:
+                memory.disk_hits += 1
+                memory.put(key, entry)
+                return pickle.loads(entry)
+
+        memory.misses += 1
+        return None
+
+    def put(self, key, instance, output=None):
+        '''
+        Stores the fitted estimator of a node and its fit output (None for nodes whose output is not used, e.g. the root).
+        Outputs that are larger than both tiers are not pickled.
+        '''
+        max_bytes = self.max_memory_bytes if self.path is None else max(self.max_memory_bytes, self.max_disk_bytes)
+        if output is not None and tpot2.graphsklearn._nbytes(output) > max_bytes:
+            return
+        entry = pickle.dumps((instance, output), protocol=pickle.HIGHEST_PROTOCOL)
+        memory = self.memory
+        memory.put(key, entry)
+        if self.path is None or len(entry) > self.max_disk_bytes:
+            return
+
+        #write to a temporary file first so that other processes never read a partial entry
+        temporary = os.path.join(self.path, f"{key}.{uuid.uuid4().hex}.tmp")
+        with open(temporary, "wb") as f:
+            f.write(entry)
+        os.replace(temporary, self._file(key))
+
+        if memory.disk_bytes is None or memory.disk_bytes + len(entry) > self.max_disk_bytes:
+            self.evict()
+        else:
+            memory.disk_bytes += len(entry)
+
+    def evict(self):
+        '''
+        Removes the least recently used files of the disk tier until their total size is at most max_disk_bytes.
+        '''
+        if self.path is None:
+            return
+        files = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, file in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+            total -= size
+        self.memory.disk_bytes = total
+
+    def stats(self):
+        '''
+        Returns the number of memory hits, disk hits and misses, and the bytes held by the memory tier, in this process.
+        '''
+        memory = self.memory
+        return {"hits": memory.hits, "disk_hits": memory.disk_hits, "misses": memory.misses, "memory_bytes": memory.n_bytes}
+
+    def clear(self):
+        '''
+        Removes all the entries of the memory tier of this process and of the disk tier.
+        '''
+        memory = self.memory
+        memory.clear()
+        if self.path is not None:
+            for entry in os.scandir(self.path):
+                if entry.name.endswith(".pkl"):
+                    os.remove(entry.path)
+            memory.disk_bytes = 0
@@ -0,0 +1,147 @@
+import numpy as np
+import tpot2
+
+
+def _same(item, other):
+    return item is other or item == other
+
+
+class ParetoArchive():
+    '''
+    Incrementally maintained set of the nondominated items (e.g. individuals) evaluated so far.
+
+    Each add compares the new scores with the current front only: the item is rejected if a member dominates it or has the same scores
+    (as in tpot2.utils.is_pareto_efficient, the first of equal points is kept), and the members it dominates are evicted. Scores that are not numeric (e.g. "INVALID" or "TIMEOUT") or contain nan are ignored.
+    Like tpot2.utils.get_pareto_frontier, only items evaluated with the largest budget seen so far are kept.
+    The crowding distances of the members are recomputed lazily when they are read after the front changed.
+
+    Parameters
+    ----------
+    weights : list of floats
+        The weight of each objective. Scores are multiplied by the weights, and bigger is better.
+    '''
+    def __init__(self, weights):
+        self.weights = np.asarray(weights, dtype=float)
+        self.budget = None
+        self._items = []
+        self._scores = np.empty((0, len(self.weights)))
+        self._crowding = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return any(_same(item, member) for member in self._items)
+
+    @property
+    def items(self):
+        return list(self._items)
+
+    @property
+    def scores(self):
+        '''
+        The (unweighted) scores of the members, one row per member.
+        '''
+        return self._scores.copy()
+
+    @property
+    def crowding(self):
+        '''
+        The crowding distance of each member within the front (see tpot2.selectors.crowding_distance).
+        '''
+        if self._crowding is None:
+            self._crowding = tpot2.selectors.crowding_distance(self._scores*self.weights)
+        return self._crowding
+
+    def clear(self):
+        self._items = []
+        self._scores = np.empty((0, len(self.weights)))
+        self._crowding = None
+
+    def _to_scores(self, scores):
+        try:
+            scores = np.asarray(scores, dtype=float).reshape(-1)
+        except (TypeError, ValueError):
+            return None
+        if len(scores) != len(self.weights) or np.isnan(scores).any():
+            return None
+        return scores
+
+    def _check_budget(self, budget):
+        #returns False if items with this budget are not part of the front
+        if budget is None or (isinstance(budget, float) and np.isnan(budget)):
+            return self.budget is None
+        if self.budget is not None and budget < self.budget:
+            return False
+        if self.budget is None or budget > self.budget:
+            self.clear()
+            self.budget = budget
+        return True
+
+    def add(self, item, scores, budget=None):
+        '''
+        Adds item with scores to the archive if no member dominates it or has the same scores, and evicts the members it dominates.
+        If item is already a member, its scores are replaced. Returns True if item is a member afterwards.
+        '''
+        scores = self._to_scores(scores)
+        if scores is None or not self._check_budget(budget):
+            return False
+
+        keep = np.array([not _same(member, item) for member in self._items], dtype=bool)
+        weighted = scores*self.weights
+        members = self._scores*self.weights
+        if ((members >= weighted).all(axis=1) & keep).any():
+            if not keep.all(): #the old scores of item were on the front, but the new ones are not
+                self._items = [member for member, k in zip(self._items, keep) if k]
+                self._scores = self._scores[keep]
+                self._crowding = None
+            return False
+
+        keep &= ~((weighted >= members).all(axis=1) & (weighted > members).any(axis=1))
+        self._items = [member for member, k in zip(self._items, keep) if k] + [item]
+        self._scores = np.vstack([self._scores[keep], scores])
+        self._crowding = None
+        return True
+
+    def extend(self, items, scores, budgets=None):
+        '''
+        Adds many items at once with one nondominated sort, e.g. to rebuild the archive from an evaluation history.
+        '''
+        if budgets is None:
+            budgets = [None]*len(items)
+        rows = []
+        for item, item_scores, budget in zip(items, scores, budgets):
+            item_scores = self._to_scores(item_scores)
+            if item_scores is not None:
+                rows.append((item, item_scores, budget))
+
+        budgets = [budget for _, _, budget in rows if budget is not None and not (isinstance(budget, float) and np.isnan(budget))]
+        if len(budgets) > 0:
+            rows = [row for row in rows if row[2] is not None and row[2] == max(budgets)]
+            if not self._check_budget(max(budgets)):
+                return
+        elif self.budget is not None:
+            return
+        if len(rows) == 0:
+            return
+
+        replaced = np.array([any(_same(member, item) for item, _, _ in rows) for member in self._items], dtype=bool)
+        items = [member for member, r in zip(self._items, replaced) if not r] + [item for item, _, _ in rows]
+        scores = np.vstack([self._scores[~replaced]] + [row[1].reshape(1, -1) for row in rows])
+        front = tpot2.selectors.nondominated_ranks(scores*self.weights) == 0
+        #keep only the first of equal points
+        _, first = np.unique(scores[front], axis=0, return_index=True)
+        front[np.flatnonzero(front)[np.setdiff1d(np.arange(front.sum()), first)]] = False
+        self._items = [item for item, on_front in zip(items, front) if on_front]
+        self._scores = scores[front]
+        self._crowding = None
+
+    def best_scores(self):
+        '''
+        Returns the best (unweighted) score of each objective among the members, which is also the best among all items added.
+        Returns nan for each objective if the archive is empty.
+        '''
+        if len(self._items) == 0:
+            return np.full(len(self.weights), np.nan)
+        best = np.argmax(self._scores*np.sign(self.weights), axis=0)
+        return self._scores[best, np.arange(len(self.weights))]
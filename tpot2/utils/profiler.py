@@ -0,0 +1,157 @@
+import time
+import cProfile
+import pstats
+import threading
+import contextlib
+import functools
+import collections
+import pandas as pd
+
+#phases of a generation timed by GenerationProfiler, in the order of the columns of GenerationProfiler.to_dataframe()
+PHASES = ["Selection", "Variation", "Dedupe", "Bookkeeping", "Checkpoint", "Evaluation"]
+
+#the profiler of the evolver that is currently running optimize(), if any
+_active_profiler = None
+
+
+class GenerationProfiler():
+    '''
+    Measures how much wall time each phase of each generation of an evolver takes.
+
+    Phases are timed with the phase context manager. Phases can be nested, in which case the time of the inner phase
+    is only counted for the inner phase (e.g. Dedupe checks during Variation are counted as Dedupe, not Variation).
+    Only the thread that called activate() is timed, so evaluations running in worker threads are not mixed in.
+
+    Parameters
+    ----------
+    profile_generations : int or list of ints, default=None
+        Generations for which a full cProfile capture is also made. The captures are stored in profiles as pstats.Stats objects.
+    '''
+    def __init__(self, profile_generations=None):
+        if isinstance(profile_generations, int):
+            profile_generations = [profile_generations]
+        self.profile_generations = set(profile_generations) if profile_generations is not None else set()
+
+        self.times = collections.defaultdict(lambda: collections.defaultdict(float))
+        self.profiles = {}
+        self.generation = None
+        self._generation_start = None
+        self._stack = []
+        self._thread = None
+        self._cprofile = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["times"] = {generation: dict(times) for generation, times in self.times.items()}
+        state["profiles"] = {}
+        state["_cprofile"] = None
+        state["_thread"] = None
+        return state
+
+    def __setstate__(self, state):
+        times = state.pop("times")
+        self.__dict__.update(state)
+        self.times = collections.defaultdict(lambda: collections.defaultdict(float))
+        for generation, generation_times in times.items():
+            self.times[generation].update(generation_times)
+
+    def activate(self):
+        '''
+        Makes this the profiler used by the module level phase() context manager.
+        '''
+        global _active_profiler
+        _active_profiler = self
+        self._thread = threading.get_ident()
+
+    def deactivate(self):
+        global _active_profiler
+        self.end_generation()
+        if _active_profiler is self:
+            _active_profiler = None
+
+    def start_generation(self, generation):
+        '''
+        Starts timing generation. Ends the previous generation, if any.
+        '''
+        self.end_generation()
+        self.generation = generation
+        self._generation_start = time.time()
+        if generation in self.profile_generations:
+            self._cprofile = cProfile.Profile()
+            try:
+                self._cprofile.enable()
+            except ValueError: #another profiler is already running
+                self._cprofile = None
+
+    def end_generation(self):
+        if self.generation is None:
+            return
+        self.times[self.generation]["Total"] += time.time() - self._generation_start
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self.profiles[self.generation] = pstats.Stats(self._cprofile)
+            self._cprofile = None
+        self.generation = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''
+        Context manager that adds the time spent in its block to phase name of the current generation.
+        '''
+        if self.generation is None or threading.get_ident() != self._thread:
+            yield
+            return
+
+        self._stack.append(0.0)
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            nested = self._stack.pop()
+            self.times[self.generation][name] += elapsed - nested
+            if len(self._stack) > 0:
+                self._stack[-1] += elapsed
+
+    def to_dataframe(self):
+        '''
+        Returns a DataFrame with one row per generation and the seconds spent in each phase.
+        Other is the time of the generation that was not spent in any of the phases.
+        '''
+        columns = PHASES + ["Other", "Total"]
+        rows = []
+        for generation in sorted(self.times.keys()):
+            times = self.times[generation]
+            row = {phase: times.get(phase, 0.0) for phase in PHASES}
+            row["Total"] = times.get("Total", 0.0)
+            row["Other"] = max(0.0, row["Total"] - sum(row[phase] for phase in PHASES))
+            rows.append(row)
+        df = pd.DataFrame(rows, columns=columns, index=pd.Index(sorted(self.times.keys()), name="Generation"))
+        return df
+
+
+@contextlib.contextmanager
+def phase(name):
+    '''
+    Times the block as phase name of the active GenerationProfiler. Does nothing if no profiler is active.
+    '''
+    if _active_profiler is None:
+        yield
+        return
+    with _active_profiler.phase(name):
+        yield
+
+
+def timed(name):
+    '''
+    Decorator that times every call of the decorated function as phase name of the active GenerationProfiler.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_profiler is None:
+                return func(*args, **kwargs)
+            with _active_profiler.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
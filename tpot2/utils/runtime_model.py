@@ -0,0 +1,131 @@
+import math
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.linear_model import Ridge
+
+
+def get_individual_features(individual):
+    '''
+    Returns a dictionary of features that describe how expensive an individual is to evaluate: the number of nodes,
+    the number of nodes of each method class and the (log scaled) numeric hyperparameters of each method class.
+    Nested individuals are included recursively. Individuals without a graph attribute have no features.
+    '''
+    features = {}
+    graph = getattr(individual, "graph", None)
+    if graph is None:
+        return features
+
+    features["n_nodes"] = len(graph.nodes)
+    for node in graph.nodes:
+        method_class = getattr(node, "method_class", None)
+        if method_class is None:
+            continue
+
+        if hasattr(method_class, "graph"): #nested pipeline
+            for key, value in get_individual_features(method_class).items():
+                features[key] = features.get(key, 0) + value
+            continue
+
+        name = getattr(method_class, "__name__", str(method_class))
+        features[f"n_{name}"] = features.get(f"n_{name}", 0) + 1
+        hyperparameters = getattr(node, "hyperparameters", None) or {}
+        for param, value in hyperparameters.items():
+            if isinstance(value, (bool, np.bool_)):
+                value = float(value)
+            if isinstance(value, (int, float, np.number)) and math.isfinite(value):
+                key = f"{name}__{param}"
+                features[key] = features.get(key, 0) + math.copysign(math.log1p(abs(value)), value)
+
+    return features
+
+
+class RuntimeModel():
+    '''
+    Online model that predicts how long an individual will take to evaluate.
+
+    A ridge regression on the log of the evaluation time is fit on the features of the individuals that have been evaluated so far
+    (see get_individual_features) and on the size of the data. The model is refit lazily when predict is called after new observations were added.
+
+    Parameters
+    ----------
+    n_samples : int, default=None
+        Number of samples in the data. Scaled by the budget of each evaluation when the budget is given. If None, it is not used as a feature.
+    n_features : int, default=None
+        Number of features in the data. If None, it is not used as a feature.
+    min_observations : int, default=10
+        predict returns None until at least this many evaluation times have been observed.
+    max_observations : int, default=5000
+        Only the most recent max_observations evaluation times are used to fit the model.
+    alpha : float, default=1.0
+        Regularization strength of the ridge regression.
+    '''
+    def __init__(self, n_samples=None, n_features=None, min_observations=10, max_observations=5000, alpha=1.0):
+        self.n_samples = n_samples
+        self.n_features = n_features
+        self.min_observations = min_observations
+        self.max_observations = max_observations
+        self.alpha = alpha
+
+        self._observed_features = []
+        self._observed_log_times = []
+        self._n_observed = 0
+        self._n_fitted = 0
+        self._vectorizer = None
+        self._model = None
+
+    def get_features(self, individual, budget=None):
+        features = get_individual_features(individual)
+        if self.n_samples is not None:
+            n_samples = self.n_samples if budget is None else self.n_samples*budget
+            features["log_n_samples"] = math.log1p(n_samples)
+        if self.n_features is not None:
+            features["log_n_features"] = math.log1p(self.n_features)
+        return features
+
+    def add(self, individual, eval_time, budget=None):
+        '''
+        Records that evaluating individual (with the given budget) took eval_time seconds.
+        '''
+        if eval_time is None or not np.isfinite(eval_time) or eval_time < 0:
+            return
+
+        self._observed_features.append(self.get_features(individual, budget=budget))
+        self._observed_log_times.append(math.log(eval_time + 1e-3))
+        self._n_observed += 1
+        if len(self._observed_log_times) > self.max_observations:
+            self._observed_features = self._observed_features[-self.max_observations:]
+            self._observed_log_times = self._observed_log_times[-self.max_observations:]
+
+    def update_from_history(self, evaluated_individuals):
+        '''
+        Adds the evaluation times recorded in an evaluated_individuals DataFrame (Completed Timestamp - Submitted Timestamp).
+        Rows without both timestamps are skipped.
+        '''
+        if not all(column in evaluated_individuals.columns for column in ["Individual", "Submitted Timestamp", "Completed Timestamp"]):
+            return
+
+        history = evaluated_individuals[evaluated_individuals["Submitted Timestamp"].notnull() & evaluated_individuals["Completed Timestamp"].notnull()]
+        for _, row in history.iterrows():
+            budget = row["Budget"] if "Budget" in history.columns and pd.notnull(row["Budget"]) else None
+            self.add(row["Individual"], row["Completed Timestamp"] - row["Submitted Timestamp"], budget=budget)
+
+    def predict(self, individuals, budget=None):
+        '''
+        Returns an array with the predicted evaluation time in seconds of each individual,
+        or None if fewer than min_observations evaluation times have been observed.
+        '''
+        if len(self._observed_log_times) < self.min_observations:
+            return None
+
+        if self._model is None or self._n_fitted != self._n_observed:
+            self._vectorizer = DictVectorizer()
+            X = self._vectorizer.fit_transform(self._observed_features)
+            self._model = Ridge(alpha=self.alpha).fit(X, self._observed_log_times)
+            self._n_fitted = self._n_observed
+
+        X = self._vectorizer.transform([self.get_features(individual, budget=budget) for individual in individuals])
+        return np.exp(self._model.predict(X))
+
+    def __len__(self):
+        return len(self._observed_log_times)
@@ -0,0 +1,190 @@
+import os
+import uuid
+import shutil
+import tempfile
+import threading
+import collections
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+
+#views of shared data that were already attached in this process, keyed by (method, location)
+#Only the most recent few are kept so that long lived workers do not hold on to data from old runs.
+_attached_views = collections.OrderedDict()
+_MAX_ATTACHED_VIEWS = 8
+_attach_lock = threading.Lock()
+
+
+def _attach_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) #python >= 3.13
+    except TypeError:
+        pass
+    #Before python 3.13, attaching also registers the segment with the resource tracker. Children of the creating process share its tracker,
+    #where the segment is already registered by the creator, and unregistering the attach would remove that registration. Processes with their own
+    #tracker would unlink the segment when they exit. So, as with track=False, attaches are not registered at all and only the creator tracks the segment.
+    with _attach_lock:
+        register = shared_memory.resource_tracker.register
+        shared_memory.resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            shared_memory.resource_tracker.register = register
+
+
+class SharedDataHandle():
+    '''
+    Base class for lightweight handles that are passed to the objective functions in place of the data.
+    resolve_shared_data() calls get() on the worker to obtain the data.
+    '''
+    def get(self):
+        raise NotImplementedError
+
+
+class SharedArray(SharedDataHandle):
+    '''
+    A lightweight, picklable handle to a numpy array (or a single dtype pandas DataFrame/Series) that is written once to either
+    a shared memory segment or a memory-mapped .npy file. Pickling the handle only sends its location, shape and dtype.
+    Workers call get() to obtain a zero-copy, read-only view of the data.
+
+    Parameters
+    ----------
+    data : np.ndarray, pd.DataFrame or pd.Series
+        The data to share. Must have a single, non-object dtype. See can_share().
+    method : str, default="memmap"
+        - "memmap" : The data is saved to a .npy file in folder and opened with np.load(mmap_mode='r').
+        - "shared_memory" : The data is copied into a multiprocessing.shared_memory.SharedMemory segment.
+    folder : str, default=None
+        Folder to write the .npy file to when method="memmap". If None, a temporary folder is created and removed by close().
+    '''
+    def __init__(self, data, method="memmap", folder=None):
+        if method not in ["memmap", "shared_memory"]:
+            raise ValueError(f"Unknown data transport method: {method}. Must be 'memmap' or 'shared_memory'")
+
+        self.method = method
+        self.kind = "ndarray"
+        self.columns = None
+        self.index = None
+        self.name = None
+        if isinstance(data, pd.DataFrame):
+            self.kind = "DataFrame"
+            self.columns = data.columns
+            self.index = data.index
+            array = data.to_numpy()
+        elif isinstance(data, pd.Series):
+            self.kind = "Series"
+            self.name = data.name
+            self.index = data.index
+            array = data.to_numpy()
+        else:
+            array = np.asarray(data)
+
+        array = np.ascontiguousarray(array)
+        self.shape = array.shape
+        self.dtype = array.dtype
+
+        self._owner = True
+        self._shm = None
+        self._created_folder = None
+
+        if method == "memmap":
+            if folder is None:
+                folder = tempfile.mkdtemp(prefix="tpot2_shared_")
+                self._created_folder = folder
+            self.location = os.path.join(folder, f"{uuid.uuid4().hex}.npy")
+            np.save(self.location, array)
+        else:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1,array.nbytes))
+            self.location = self._shm.name
+            np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)[...] = array
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_owner"] = False
+        state["_shm"] = None
+        state["_created_folder"] = None
+        return state
+
+    def get(self):
+        '''
+        Returns a read-only view of the shared data. The view is cached so repeated calls in the same process do not reattach the data.
+        '''
+        cache_key = (self.method, self.location)
+        if cache_key in _attached_views:
+            _attached_views.move_to_end(cache_key)
+            array = _attached_views[cache_key][0]
+        else:
+            if self.method == "memmap":
+                array = np.load(self.location, mmap_mode='r')
+                shm = None
+            else:
+                shm = self._shm if self._shm is not None else _attach_shared_memory(self.location)
+                array = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+                array.flags.writeable = False
+
+            _attached_views[cache_key] = (array, shm)
+            while len(_attached_views) > _MAX_ATTACHED_VIEWS:
+                _attached_views.popitem(last=False)
+
+        if self.kind == "DataFrame":
+            return pd.DataFrame(array, columns=self.columns, index=self.index, copy=False)
+        elif self.kind == "Series":
+            return pd.Series(array, index=self.index, name=self.name, copy=False)
+        return array
+
+    def close(self):
+        '''
+        Releases the shared data. Only has an effect in the process that created it.
+        '''
+        _attached_views.pop((self.method, self.location), None)
+        if not self._owner:
+            return
+        if self.method == "memmap":
+            if self._created_folder is not None:
+                shutil.rmtree(self._created_folder, ignore_errors=True)
+            elif os.path.exists(self.location):
+                os.remove(self.location)
+        elif self._shm is not None:
+            self._shm.close()
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = None
+
+
+def can_share(data):
+    '''
+    Returns True if data can be stored in a SharedArray. The data must be a numpy array, a pandas Series, or a pandas DataFrame with a single dtype,
+    and the dtype can not be object.
+    '''
+    if isinstance(data, pd.DataFrame):
+        dtypes = set(data.dtypes)
+        if len(dtypes) != 1:
+            return False
+        dtype = dtypes.pop()
+    elif isinstance(data, (pd.Series, np.ndarray)):
+        dtype = data.dtype
+    else:
+        return False
+
+    return isinstance(dtype, np.dtype) and dtype != object
+
+
+def share_data(data, method="memmap", folder=None):
+    '''
+    Returns a SharedArray for data, or None if the data can not be shared (see can_share).
+    '''
+    if not can_share(data):
+        return None
+    return SharedArray(data, method=method, folder=folder)
+
+
+def resolve_shared_data(value):
+    '''
+    Returns the data behind a SharedDataHandle (e.g. a SharedArray), or value unchanged if it is not a handle.
+    '''
+    if isinstance(value, SharedDataHandle):
+        return value.get()
+    return value
@@ -0,0 +1,234 @@
+import os
+import socket
+import threading
+import contextlib
+import numpy as np
+import pandas as pd
+
+#columns of Population.evaluated_individuals that hold the resource usage of each evaluation
+TELEMETRY_COLUMNS = ["Fit Time", "Score Time", "Fold Durations", "Peak RSS", "Worker"]
+
+_local = threading.local()
+
+#the measurements of the evaluations running in this process, see measure_peak_rss
+_peak_rss_lock = threading.Lock()
+_active_peak_rss_measurements = []
+
+
+def get_current_record():
+    '''
+    Returns the telemetry record of the evaluation running in this thread, or None if no evaluation is being recorded.
+    '''
+    return getattr(_local, "record", None)
+
+
+@contextlib.contextmanager
+def recording(record=None):
+    '''
+    Context manager that makes record (a new dict if None) the telemetry record of this thread.
+    Objective functions add to it with record_fold.
+    '''
+    previous = get_current_record()
+    if record is None:
+        record = {}
+    _local.record = record
+    try:
+        yield record
+    finally:
+        _local.record = previous
+
+
+def call_with_record(record, func, *args, **kwargs):
+    '''
+    Calls func(*args, **kwargs) with record as the telemetry record. Used to carry the record into the threads started by func_timeout.
+    '''
+    with recording(record):
+        return func(*args, **kwargs)
+
+
+def call_and_return_record(func, *args, **kwargs):
+    '''
+    Calls func(*args, **kwargs) with a new telemetry record and returns (value, record). Used in forked child processes,
+    whose records (including their own peak RSS) are sent back to the parent.
+    '''
+    reset_peak_rss()
+    with recording() as record:
+        value = func(*args, **kwargs)
+    record["Peak RSS"] = get_peak_rss()
+    return value, record
+
+
+def record_fold(fit_time, score_time):
+    '''
+    Adds the duration of fitting and scoring one fold to the telemetry record of this thread, if any.
+    '''
+    record = get_current_record()
+    if record is None:
+        return
+    record["Fit Time"] = record.get("Fit Time", 0) + fit_time
+    record["Score Time"] = record.get("Score Time", 0) + score_time
+    record.setdefault("Fold Durations", []).append(fit_time + score_time)
+
+
+def merge_records(record, other):
+    '''
+    Merges the telemetry record other into record. Times are summed, fold durations are concatenated,
+    the largest peak RSS is kept and distinct workers are joined with commas.
+    '''
+    if record is None or other is None:
+        return record
+    for key, value in other.items():
+        if value is None:
+            continue
+        if key not in record or record[key] is None:
+            record[key] = list(value) if isinstance(value, (list, tuple)) else value
+        elif key == "Peak RSS":
+            record[key] = max(record[key], value)
+        elif key == "Worker":
+            workers = record[key].split(",")
+            if value not in workers:
+                record[key] = ",".join(workers + [value])
+        elif isinstance(value, (list, tuple)):
+            record[key] = list(record[key]) + list(value)
+        else:
+            record[key] = record[key] + value
+    return record
+
+
+def combine_records(records):
+    '''
+    Returns a new record that merges all records that are not None, or None if they are all None.
+    '''
+    combined = None
+    for record in records:
+        if record is None:
+            continue
+        if combined is None:
+            combined = {}
+        merge_records(combined, record)
+    return combined
+
+
+def reset_peak_rss():
+    '''
+    Resets the peak resident set size of this process so that get_peak_rss measures the peak from now on. Only supported on Linux.
+    Returns True if the peak was reset.
+    '''
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss():
+    '''
+    Returns the peak resident set size of this process in bytes (since the last reset_peak_rss on Linux), or None if it is not available.
+    '''
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+@contextlib.contextmanager
+def measure_peak_rss():
+    '''
+    Context manager that measures the peak resident set size of this process while the block runs. Yields a dict whose "Peak RSS"
+    is set on exit to the peak in bytes, or to None if it is not available.
+
+    The peak is kept per process, so it can only be attributed to the block if no other measured block (e.g. another evaluation
+    in a threaded dask worker, or in a cluster with processes=False) runs in this process at the same time. Otherwise "Peak RSS" is None.
+    '''
+    measurement = {"Peak RSS": None, "overlapped": False}
+    with _peak_rss_lock:
+        for other in _active_peak_rss_measurements:
+            other["overlapped"] = True
+        measurement["overlapped"] = len(_active_peak_rss_measurements) > 0
+        _active_peak_rss_measurements.append(measurement)
+        if not measurement["overlapped"]:
+            reset_peak_rss()
+    try:
+        yield measurement
+    finally:
+        with _peak_rss_lock:
+            _active_peak_rss_measurements.remove(measurement)
+            if not measurement["overlapped"]:
+                measurement["Peak RSS"] = get_peak_rss()
+
+
+def get_worker_name():
+    '''
+    Returns the address of the dask worker running this code, or hostname:pid outside of dask workers.
+    '''
+    try:
+        import distributed
+        return distributed.get_worker().address
+    except (ImportError, ValueError):
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def update_population_telemetry(population, individuals, records, merge=False):
+    '''
+    Writes the telemetry record of each individual to the TELEMETRY_COLUMNS of population.evaluated_individuals.
+    Records that are None (e.g. evaluations that timed out on the client) are skipped.
+    If merge is True, the records are merged with the values already in the columns (see merge_records), e.g. when an individual is evaluated one CV fold at a time.
+    '''
+    for column in TELEMETRY_COLUMNS:
+        population.history.add_column(column, numeric=column not in ["Fold Durations", "Worker"])
+
+    for individual, record in zip(individuals, records):
+        if record is None:
+            continue
+        if merge:
+            existing = {column: value for column, value in zip(TELEMETRY_COLUMNS, population.get_column(individual, column_names=TELEMETRY_COLUMNS)[0]) if not (np.isscalar(value) and pd.isnull(value))}
+            record = merge_records(existing, record)
+        for column in TELEMETRY_COLUMNS:
+            value = record.get(column, None)
+            if value is None:
+                continue
+            population.update_column(individual, column_names=column, data=tuple(value) if isinstance(value, list) else value)
+
+
+def _first_worker(value):
+    #evaluations split into steps may have run on several workers, joined with commas
+    if isinstance(value, str) and len(value) > 0:
+        return value.split(",")[0]
+    return None
+
+
+def get_lineage_workers(population, individuals):
+    '''
+    Returns the worker to prefer for the evaluation of each individual, from the Worker column of population.evaluated_individuals:
+    the worker that already evaluated part of the individual (e.g. its previous CV folds), otherwise the worker that evaluated its first parent
+    (from the Parents column) with a recorded worker, otherwise None.
+    Children of mutation and crossover share most of their subgraph with their parents, so that worker may hold their fitted nodes in its cache.
+    '''
+    individuals = list(individuals)
+    history = population.history
+    if len(individuals) == 0 or "Worker" not in history.columns:
+        return [None for _ in individuals]
+
+    columns = population.get_column(individuals, column_names=["Worker", "Parents"], to_numpy=False)
+    workers = []
+    for own_worker, parent_keys in zip(columns["Worker"], columns["Parents"]):
+        worker = _first_worker(own_worker)
+        if worker is None and isinstance(parent_keys, tuple):
+            parent_keys = [key for key in parent_keys if key in history]
+            if len(parent_keys) > 0:
+                parent_workers = [_first_worker(value) for value in history.get(history.get_ids(parent_keys), "Worker")]
+                worker = next((parent_worker for parent_worker in parent_workers if parent_worker is not None), None)
+        workers.append(worker)
+    return workers
@@ -112,14 +112,11 @@ def get_pareto_front(df, column_names, weights, invalid_values=["TIMEOUT","INVAL
     indexes = dftmp[~dftmp[column_names].isna().any(axis=1)].index.values
     weighted_scores = df.loc[indexes][column_names].to_numpy()  * weights
 
-    pareto_fronts = tpot2.selectors.nondominated_sorting(weighted_scores)
+    ranks = tpot2.selectors.nondominated_ranks(weighted_scores)
 
     df = pd.DataFrame(index=df.index,columns=["Pareto_Front"], data=[])
     
     df["Pareto_Front"] = np.nan
-
-    for i, front in enumerate(pareto_fronts):
-        for index in front:
-            df.loc[indexes[index], "Pareto_Front"] = i+1
+    df.loc[indexes, "Pareto_Front"] = ranks + 1
 
     return df["Pareto_Front"]
\ No newline at end of file